@@ -1,8 +1,6 @@
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-import core.routing
+from channels.routing import ProtocolTypeRouter
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
@@ -11,9 +9,9 @@ from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 django_asgi_app = get_asgi_application()
 django_asgi_app = ASGIStaticFilesHandler(django_asgi_app)
 
+import core.routing  # after get_asgi_application(): it imports models
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    "websocket": AuthMiddlewareStack(
-        URLRouter(core.routing.websocket_urlpatterns)
-    ),
+    "websocket": core.routing.websocket_application,
 })
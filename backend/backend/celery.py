@@ -19,4 +19,18 @@ app.conf.beat_schedule = {
         "task": "core.tasks.reset_monthly_credits_spend_on_gigs",
         "schedule": crontab(minute=0, hour=0, day_of_month=1),  # 1st day of month at 00:00
     },
+    "send-chat-digests": {
+        "task": "core.tasks.send_chat_digests",
+        "schedule": crontab(minute="*/15"),
+    },
+    "send-hourly-job-alert-digests": {
+        "task": "core.tasks.send_job_alert_digests",
+        "schedule": crontab(minute=0),
+        "args": ("hourly",),
+    },
+    "send-daily-job-alert-digests": {
+        "task": "core.tasks.send_job_alert_digests",
+        "schedule": crontab(minute=0, hour=8),
+        "args": ("daily",),
+    },
 }
@@ -134,6 +134,11 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "Asia/Dhaka"  # or your timezone
 CELERY_ENABLE_UTC = False
 
+# Geocoding (see core/geocoding.py). Requests only read stored coordinates;
+# the geocoder itself runs inside Celery tasks.
+GEOCODER_BACKEND = os.getenv("GEOCODER_BACKEND", "core.geocoding.NominatimGeocoder")
+GEOCODER_USER_AGENT = os.getenv("GEOCODER_USER_AGENT", "tutormove")
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -157,6 +162,15 @@ DEFAULT_FROM_EMAIL = os.getenv("FROM_EMAIL", EMAIL_HOST_USER)
 FROM_EMAIL = DEFAULT_FROM_EMAIL 
 FRONTEND_SITE_URL = os.getenv("FRONTEND_SITE_URL", "http://localhost:3000")
 INTERNAL_API_BASE_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+# New-job emails (see core.utils.schedule_job_emails): the top tutors are
+# released first in batches of these sizes, JOB_EMAIL_DELAY seconds apart,
+# then everybody left goes out together. Each task sends at most
+# JOB_EMAIL_CHUNK_SIZE messages over one SMTP connection.
+# An unset or empty variable means the default.
+JOB_EMAIL_BATCHES = [int(n) for n in (os.getenv("JOB_EMAIL_BATCHES") or "1,2,3,4").split(",")]
+JOB_EMAIL_DELAY = int(os.getenv("JOB_EMAIL_DELAY") or 20 * 60)
+JOB_EMAIL_CHUNK_SIZE = int(os.getenv("JOB_EMAIL_CHUNK_SIZE") or 100)
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -4,6 +4,4 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
-        # core.signals module does not exist, commenting out to avoid error
-        # import core.signals
-        pass
+        import core.signals  # noqa: F401
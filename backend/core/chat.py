@@ -0,0 +1,272 @@
+"""
+Database side of the chat websocket (core.consumers.ChatConsumer).
+
+Functions here are synchronous and keep the number of queries per chat
+event fixed; the consumer calls them through sync_to_async.
+"""
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Q, Subquery
+from django.utils import timezone
+
+from core import counters
+from core.models import ContactUnlock, Conversation, ConversationParticipant, Message, MessageRead
+from core.utils_encryption import decrypt_many, encrypt_text
+
+
+def persist_message(sender_id, conversation_id, content, unlocked_ids=None):
+    """
+    Store a chat message sent by `sender_id`.
+
+    One query reads every participant and whether they and the sender have
+    a contact unlock in either direction. If the caller already holds the ids of
+    the sender's unlocked contacts in `unlocked_ids`, it reads membership
+    only. A single transaction then writes the message and its 'sent'
+    MessageRead rows, moves the conversation's last-message pointer and
+    bumps the recipients' unread counters.
+
+    Returns ``(message, recipient_ids, locked_ids)``. ``message`` is None
+    when nothing was stored: either the sender is not in the conversation
+    (``recipient_ids`` is then empty too) or some recipients have not been
+    unlocked (they are listed in ``locked_ids``).
+    """
+    participants = ConversationParticipant.objects.filter(conversation_id=conversation_id)
+    if unlocked_ids is None:
+        participants = list(
+            participants.annotate(unlocked=Exists(ContactUnlock.objects.filter(
+                Q(unlocker_id=sender_id, target_id=OuterRef("user_id")) |
+                Q(unlocker_id=OuterRef("user_id"), target_id=sender_id)
+            )))
+            .values_list("user_id", "unlocked")
+        )
+    else:
+        participants = [
+            (user_id, user_id in unlocked_ids)
+            for user_id in participants.values_list("user_id", flat=True)
+        ]
+    if not any(user_id == sender_id for user_id, _ in participants):
+        return None, [], []
+
+    recipient_ids = [user_id for user_id, _ in participants if user_id != sender_id]
+    locked_ids = [user_id for user_id, unlocked in participants if user_id != sender_id and not unlocked]
+    if locked_ids:
+        return None, recipient_ids, locked_ids
+
+    with transaction.atomic():
+        message = Message.objects.create(
+            sender_id=sender_id,
+            conversation_id=conversation_id,
+            content=encrypt_text(content),
+        )
+        MessageRead.objects.bulk_create(
+            MessageRead(message=message, user_id=user_id, status='sent') for user_id in recipient_ids
+        )
+        Conversation.objects.filter(pk=conversation_id).update(
+            last_message=message, last_message_at=message.timestamp
+        )
+        ConversationParticipant.objects.filter(
+            conversation_id=conversation_id, user_id__in=recipient_ids
+        ).update(unread_count=F("unread_count") + 1)
+        transaction.on_commit(lambda: counters.incr_unread_totals(recipient_ids))
+    return message, recipient_ids, []
+
+
+def mark_read(user_id, conversation_id):
+    """
+    Mark everything in the conversation as seen by `user_id` and reset their
+    unread counter. Returns ``{sender_id: [message_id, ...]}`` for the
+    messages this call moved to 'seen' (empty when nothing was unread, in
+    which case only the participant row is touched), or None if the user
+    is not a participant.
+    """
+    participant = ConversationParticipant.objects.filter(user_id=user_id, conversation_id=conversation_id)
+    unread = participant.values_list("unread_count", flat=True).first()
+    if unread is None:
+        return None
+
+    reset = {
+        "unread_count": 0,
+        "last_read_message_id": Subquery(
+            Conversation.objects.filter(pk=conversation_id).values("last_message_id")[:1]
+        ),
+    }
+    if not unread:
+        participant.update(**reset)
+        return {}
+
+    newly_read = {}
+    with transaction.atomic():
+        rows = list(
+            MessageRead.objects.filter(user_id=user_id, message__conversation_id=conversation_id)
+            .exclude(status='seen')
+            .values_list("pk", "message_id", "message__sender_id")
+        )
+        # A concurrent read of the same conversation may report some of these
+        # ids too; a repeated 'seen' status is harmless to clients.
+        MessageRead.objects.filter(pk__in=[pk for pk, _, _ in rows]).exclude(status='seen').update(
+            status='seen', read_at=timezone.now()
+        )
+        participant.update(**reset)
+        transaction.on_commit(lambda: counters.reset_unread_total(user_id))
+
+    for _, message_id, sender_id in rows:
+        newly_read.setdefault(sender_id, []).append(message_id)
+    return newly_read
+
+
+def unread_summary(user_id):
+    """{conversation_id: unread count} for conversations with unread messages, and the total."""
+    counts = dict(
+        ConversationParticipant.objects.filter(user_id=user_id, unread_count__gt=0)
+        .values_list("conversation_id", "unread_count")
+    )
+    return counts, counters.unread_total(user_id)
+
+
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 100
+INBOX_PAGE_SIZE = 30
+
+
+def clamp_limit(value):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return HISTORY_PAGE_SIZE
+    return max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+
+
+def _visible_messages(user_id, conversation_id):
+    # Joining the participant row keeps other people's conversations empty
+    return Message.objects.filter(
+        conversation_id=conversation_id,
+        conversation__participants__user_id=user_id,
+    ).select_related("sender")
+
+
+def message_history(user_id, conversation_id, before_id=None, limit=HISTORY_PAGE_SIZE):
+    """
+    Up to `limit` messages older than `before_id` (the newest ones when it
+    is None), oldest first, plus whether more remain before them. Walks the
+    (conversation, timestamp, id) index backwards in a single query.
+    """
+    messages = _visible_messages(user_id, conversation_id)
+    if before_id is not None:
+        anchor = Subquery(Message.objects.filter(pk=before_id, conversation_id=conversation_id).values("timestamp")[:1])
+        messages = messages.filter(Q(timestamp__lt=anchor) | Q(timestamp=anchor, id__lt=before_id))
+
+    page = list(messages.order_by("-timestamp", "-id")[:limit + 1])
+    has_more = len(page) > limit
+    return page[:limit][::-1], has_more
+
+
+def messages_since(user_id, conversation_id, after_id, limit=MAX_HISTORY_PAGE_SIZE):
+    """
+    Up to `limit` messages newer than `after_id`, oldest first, plus whether
+    more follow. Lets a reconnecting client catch up on what it missed.
+    """
+    anchor = Subquery(Message.objects.filter(pk=after_id, conversation_id=conversation_id).values("timestamp")[:1])
+    page = list(
+        _visible_messages(user_id, conversation_id)
+        .filter(Q(timestamp__gt=anchor) | Q(timestamp=anchor, id__gt=after_id))
+        .order_by("timestamp", "id")[:limit + 1]
+    )
+    return page[:limit], len(page) > limit
+
+
+def serialize_messages(messages, viewer_id, statuses=None, contents=None, sender=None):
+    """
+    Websocket payloads for `messages` as seen by `viewer_id`.
+
+    For the viewer's own messages the status is the other participant's
+    MessageRead status. Participants and read statuses are loaded with one
+    query each (none when `statuses` already maps message id -> status)
+    and all contents are decrypted in one pass, unless `contents` already
+    holds the plaintexts. Messages need `sender` loaded, unless the
+    `sender` argument (anything with ``id`` and ``username``) is given for
+    all of them.
+    """
+    own_ids = [m.id for m in messages if m.sender_id == viewer_id]
+
+    if statuses is None:
+        statuses = {}
+        if own_ids:
+            # The status shown is the first other participant's, as in 1:1 chats
+            other_by_conversation = {}
+            for conversation_id, user_id in (
+                ConversationParticipant.objects
+                .filter(conversation_id__in={m.conversation_id for m in messages})
+                .exclude(user_id=viewer_id)
+                .order_by("id")
+                .values_list("conversation_id", "user_id")
+            ):
+                other_by_conversation.setdefault(conversation_id, user_id)
+
+            conversation_by_message = {m.id: m.conversation_id for m in messages}
+            for message_id, user_id, status in MessageRead.objects.filter(
+                message_id__in=own_ids, user_id__in=set(other_by_conversation.values())
+            ).values_list("message_id", "user_id", "status"):
+                if other_by_conversation.get(conversation_by_message[message_id]) == user_id:
+                    statuses[message_id] = status
+
+    if contents is None:
+        contents = decrypt_many([m.content for m in messages])
+    own_ids = set(own_ids)
+    payloads = []
+    for msg, content in zip(messages, contents):
+        status = statuses.get(msg.id) if msg.id in own_ids else None
+        msg_sender = sender or msg.sender
+        payloads.append({
+            "id": msg.id,
+            "conversation_id": msg.conversation_id,
+            "sender": {"id": msg_sender.id, "username": msg_sender.username},
+            "content": content,
+            "timestamp": msg.timestamp.isoformat(),
+            "is_system": msg.is_system,
+            "attachment": msg.attachment.url if msg.attachment else None,
+            "is_read": status == "seen",
+            "status": status,
+        })
+    return payloads
+
+
+def inbox(user_id, offset=0, limit=INBOX_PAGE_SIZE):
+    """
+    One page of the user's conversations, most recent activity first, plus
+    whether more follow. Costs two queries however many threads there are:
+    the participant rows with their conversation, last message and its
+    sender, and one prefetch of every participant.
+    """
+    rows = list(
+        ConversationParticipant.objects.filter(user_id=user_id)
+        .select_related("conversation__last_message__sender")
+        .prefetch_related(Prefetch(
+            "conversation__participants",
+            queryset=ConversationParticipant.objects.select_related("user").order_by("id"),
+        ))
+        .order_by(F("conversation__last_message_at").desc(nulls_last=True), "-conversation_id")
+        [offset:offset + limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    last_messages = [row.conversation.last_message for row in rows]
+    contents = decrypt_many([m.content if m else "" for m in last_messages])
+
+    result = []
+    for row, last_msg, content in zip(rows, last_messages, contents):
+        result.append({
+            "id": row.conversation_id,
+            "participants": [
+                {"user__id": p.user_id, "user__username": p.user.username}
+                for p in row.conversation.participants.all()
+            ],
+            "has_unread": row.unread_count > 0,
+            "unread_count": row.unread_count,
+            "last_message": {
+                "content": content,
+                "timestamp": last_msg.timestamp.isoformat() if last_msg else None,
+                "sender_id": last_msg.sender_id if last_msg else None,
+                "sender_username": last_msg.sender.username if last_msg else None,
+            },
+        })
+    return result, has_more
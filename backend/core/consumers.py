@@ -1,25 +1,15 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from asgiref.sync import sync_to_async
-from django.utils import timezone
+
+from core.chat import serialize_messages
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        # Extract token from query string
-        query_string = self.scope["query_string"].decode()
-        token = None
-        for part in query_string.split("&"):
-            if part.startswith("token="):
-                token = part.split("=")[1]
-                break
-
-        if not token:
-            await self.close()
-            return
-
-        user = await self.get_user_from_token(token)
-        if not user or user.is_anonymous:
+        # scope["user"] is set by core.middleware.JWTAuthMiddleware
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated:
             await self.close()
             return
 
@@ -29,32 +19,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         # Join group
         await self.channel_layer.group_add(self.group_name, self.channel_name)
+        # Contact unlocks are never revoked, so load them once; new ones
+        # arrive as contact.unlocked events (see core.signals)
+        self.unlocked_ids = await self.get_unlocked_ids()
         await self.accept()
+        await self.presence_touch()
         print(f"User {self.user_id} connected")
 
-    @sync_to_async
-    def get_user_from_token(self, token):
-        from rest_framework_simplejwt.tokens import UntypedToken
-        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-        from django.contrib.auth.models import AnonymousUser
-        from django.contrib.auth import get_user_model
-        from jwt import decode as jwt_decode
-        from django.conf import settings
-
-        User = get_user_model()
-        try:
-            UntypedToken(token)  # validate token
-            payload = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id = payload.get("user_id")
-            user = User.objects.get(id=user_id)
-            return user
-        except (InvalidToken, TokenError, User.DoesNotExist, Exception) as e:
-            print(f"Token validation error: {e}")
-            return AnonymousUser()
-
     async def disconnect(self, close_code):
         if hasattr(self, "group_name"):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await self.presence_leave()
             print(f"User {getattr(self, 'user_id', 'unknown')} disconnected with code {close_code}")
 
     async def receive(self, text_data):
@@ -74,9 +49,17 @@ class ChatConsumer(AsyncWebsocketConsumer):
         elif msg_type == "chat.start_conversation":
             await self.handle_start_conversation(data)
         elif msg_type == "chat.get_conversations":
-            await self.handle_get_conversations()
+            await self.handle_get_conversations(data)
         elif msg_type == "chat.get_messages":
             await self.handle_get_messages(data)
+        elif msg_type == "chat.get_messages_since":
+            await self.handle_get_messages_since(data)
+        elif msg_type == "chat.unread_summary":
+            await self.handle_unread_summary()
+        elif msg_type == "chat.heartbeat":
+            await self.presence_touch()
+        elif msg_type == "chat.presence":
+            await self.handle_presence(data)
         else:
             # Unknown message type - optionally log or ignore
             pass
@@ -84,29 +67,38 @@ class ChatConsumer(AsyncWebsocketConsumer):
     # Handlers for different message types
 
     async def handle_chat_message(self, data):
-        msg = await self.save_message(data)
-        other_ids = await self.get_other_participant_ids(msg.conversation.id, self.user_id)
-
-        # Check unlock status for each recipient
-        for receiver_id in other_ids:
-            unlocked = await self.is_contact_unlocked(self.user_id, receiver_id)
-            if not unlocked:
-                await self.send(text_data=json.dumps({
-                    "type": "chat.unlock",
-                    "student_id": self.user_id,
-                    "tutor_id": receiver_id,
-                    "message": "Unlock contact to send messages."
-                }))
-                return  # block sending message
-
-        serialized_msg = await self.serialize_message(msg)
-
-        # Send message to all participants except sender
+        content = data.get("content", "")
+        msg, other_ids, locked_ids = await self.save_message(data.get("conversation_id"), content)
+
+        # Block sending until every recipient's contact is unlocked
+        if locked_ids:
+            await self.send(text_data=json.dumps({
+                "type": "chat.unlock",
+                "student_id": self.user_id,
+                "tutor_id": locked_ids[0],
+                "message": "Unlock contact to send messages."
+            }))
+            return
+        if msg is None:
+            return  # not a participant of this conversation
+
+        # Sender, status and plaintext of a new message are all known here,
+        # so serializing it needs no queries and no decryption
+        serialized_msg = serialize_messages(
+            [msg], self.user_id, statuses={msg.id: "sent"} if other_ids else {},
+            contents=[content], sender=self.user,
+        )[0]
+
+        # Send message to all connected participants except sender; the
+        # others get it in their next chat digest
+        online_ids = await self.get_online(other_ids)
         for pid in other_ids:
-            await self.channel_layer.group_send(
-                f"user_{pid}",
-                {"type": "chat.message", "message": serialized_msg},
-            )
+            if pid in online_ids:
+                await self.channel_layer.group_send(
+                    f"user_{pid}",
+                    {"type": "chat.message", "message": serialized_msg},
+                )
+        await self.defer_digest([pid for pid in other_ids if pid not in online_ids])
 
         # Send message back to sender
         await self.send(text_data=json.dumps({
@@ -132,11 +124,18 @@ class ChatConsumer(AsyncWebsocketConsumer):
             return
 
         # Mark messages as seen for current user in conversation
-        await self.mark_as_read(conversation_id)
+        newly_read = await self.mark_as_read(conversation_id)
+        if newly_read is None:
+            return
 
-        # Notify other participants about read
+        # Notify connected participants about the read. Offline ones are not
+        # queued: the 'seen' statuses are stored and come with their next
+        # chat.messages / chat.messages_since page
         participants = await self.get_other_participant_ids(conversation_id, self.user_id)
+        online_ids = await self.get_online(set(participants) | set(newly_read))
         for pid in participants:
+            if pid not in online_ids:
+                continue
             await self.channel_layer.group_send(
                 f"user_{pid}",
                 {
@@ -146,19 +145,39 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 },
             )
 
-        # Notify message senders about status update 'seen'
-        newly_read_message_ids = await self.get_newly_read_message_ids(conversation_id, self.user_id)
-        for message_id in newly_read_message_ids:
-            msg = await self.get_message(message_id)
-            if msg:
-                await self.channel_layer.group_send(
-                    f"user_{msg.sender.id}",
-                    {
-                        "type": "chat.message_status",
-                        "message_id": message_id,
-                        "status": "seen",
-                    },
-                )
+        # One 'seen' status update per sender, for the messages this read changed
+        for sender_id, message_ids in newly_read.items():
+            if sender_id not in online_ids:
+                continue
+            await self.channel_layer.group_send(
+                f"user_{sender_id}",
+                {
+                    "type": "chat.message_status",
+                    "conversation_id": conversation_id,
+                    "message_ids": message_ids,
+                    "status": "seen",
+                },
+            )
+
+    async def handle_presence(self, data):
+        """{user_ids: [...]} -> which of them (at most 100) are connected."""
+        try:
+            user_ids = [int(user_id) for user_id in data.get("user_ids") or []][:100]
+        except (TypeError, ValueError):
+            return
+        online_ids = await self.get_online(user_ids)
+        await self.send(text_data=json.dumps({
+            "type": "chat.presence",
+            "online": [user_id for user_id in user_ids if user_id in online_ids],
+        }))
+
+    async def handle_unread_summary(self):
+        counts, total = await self.get_unread_summary()
+        await self.send(text_data=json.dumps({
+            "type": "chat.unread_summary",
+            "conversations": counts,
+            "total": total,
+        }))
 
     async def handle_chat_delivered(self, data):
         message_id = data.get("message_id")
@@ -178,8 +197,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         if not other_user_id:
             return
 
-        unlocked = await self.is_contact_unlocked(self.user_id, int(other_user_id))
-        if not unlocked:
+        if int(other_user_id) not in self.unlocked_ids:
             await self.send(text_data=json.dumps({
                 "type": "chat.unlock",
                 "student_id": self.user_id,
@@ -194,21 +212,59 @@ class ChatConsumer(AsyncWebsocketConsumer):
             "conversation": conv_data
         }))
 
-    async def handle_get_conversations(self):
-        conversations = await self.get_user_conversations()
+    async def handle_get_conversations(self, data):
+        """Inbox page: {offset?, limit?} -> most recently active conversations first."""
+        from core.chat import INBOX_PAGE_SIZE
+
+        try:
+            offset = max(int(data.get("offset") or 0), 0)
+            limit = min(max(int(data.get("limit") or INBOX_PAGE_SIZE), 1), 100)
+        except (TypeError, ValueError):
+            return
+        conversations, has_more = await self.get_user_conversations(offset, limit)
         await self.send(text_data=json.dumps({
             "type": "chat.conversations",
-            "conversations": conversations
+            "conversations": conversations,
+            "offset": offset,
+            "has_more": has_more,
         }))
 
     async def handle_get_messages(self, data):
+        """History page: {conversation_id, before_id?, limit?} -> newest-first pages, oldest first inside."""
         conversation_id = data.get("conversation_id")
         if not conversation_id:
             return
-        messages = await self.get_conversation_messages(conversation_id)
+        try:
+            before_id = int(data["before_id"]) if data.get("before_id") is not None else None
+        except (TypeError, ValueError):
+            return
+        messages, has_more = await self.get_conversation_messages_sync(
+            conversation_id, before_id, data.get("limit")
+        )
         await self.send(text_data=json.dumps({
             "type": "chat.messages",
-            "messages": messages
+            "conversation_id": conversation_id,
+            "before_id": before_id,
+            "messages": await self.serialize_messages(messages),
+            "has_more": has_more,
+        }))
+
+    async def handle_get_messages_since(self, data):
+        """Catch-up after a reconnect: {conversation_id, after_id, limit?}."""
+        conversation_id = data.get("conversation_id")
+        try:
+            after_id = int(data.get("after_id"))
+        except (TypeError, ValueError):
+            return
+        if not conversation_id:
+            return
+        messages, has_more = await self.get_messages_since_sync(conversation_id, after_id, data.get("limit"))
+        await self.send(text_data=json.dumps({
+            "type": "chat.messages_since",
+            "conversation_id": conversation_id,
+            "after_id": after_id,
+            "messages": await self.serialize_messages(messages),
+            "has_more": has_more,
         }))
 
     # Channel layer event handlers
@@ -233,40 +289,37 @@ class ChatConsumer(AsyncWebsocketConsumer):
             "reader_id": event["reader_id"]
         }))
 
+    async def notification_new(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "notification.new",
+            "notification": event["notification"],
+        }))
+
+    async def notification_refresh(self, event):
+        await self.send(text_data=json.dumps({"type": "notification.refresh"}))
+
+    async def contact_unlocked(self, event):
+        self.unlocked_ids.add(event["user_id"])
+        await self.send(text_data=json.dumps({
+            "type": "contact.unlocked",
+            "user_id": event["user_id"],
+        }))
+
     async def chat_message_status(self, event):
         await self.send(text_data=json.dumps({
             "type": "chat.message_status",
-            "message_id": event["message_id"],
+            "conversation_id": event["conversation_id"],
+            "message_ids": event["message_ids"],
             "status": event["status"]
         }))
 
     # --------- DB operations ---------
 
     @sync_to_async
-    def save_message(self, data):
-        from core.models import User, Conversation, Message, ConversationParticipant, MessageRead
-        from core.utils_encryption import encrypt_text
-
-        sender = User.objects.get(id=self.user_id)
-        conversation = Conversation.objects.get(id=data["conversation_id"])
-
-        # Encrypt content before saving
-        raw_content = data.get("content", "")
-        encrypted_content = encrypt_text(raw_content)
-
-        msg = Message.objects.create(
-            sender=sender,
-            conversation=conversation,
-            content=encrypted_content,
-            timestamp=timezone.now(),
-        )
-
-        # Create MessageRead entries with status 'sent' for all participants except sender
-        participant_ids = ConversationParticipant.objects.filter(conversation=conversation).exclude(user=sender).values_list('user_id', flat=True)
-        for uid in participant_ids:
-            MessageRead.objects.create(message=msg, user_id=uid, status='sent')
+    def save_message(self, conversation_id, content):
+        from core.chat import persist_message
 
-        return msg
+        return persist_message(self.user_id, conversation_id, content, unlocked_ids=self.unlocked_ids)
 
     @sync_to_async
     def get_other_participant_ids(self, conversation_id, exclude_user_id):
@@ -279,44 +332,33 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
     @sync_to_async
     def mark_as_read(self, conversation_id):
-        from core.models import MessageRead, Message, ConversationParticipant
+        from core.chat import mark_read
+        return mark_read(self.user_id, conversation_id)
 
-        # Mark all unread MessageRead entries as 'seen' for this user in this conversation
-        unread_reads = MessageRead.objects.filter(
-            user_id=self.user_id,
-            message__conversation_id=conversation_id
-        ).exclude(status='seen')
-
-        unread_reads.update(status='seen', read_at=timezone.now())
+    @sync_to_async
+    def presence_touch(self):
+        from core import presence
+        presence.touch(self.user_id, self.channel_name)
 
-        # Update participant's last_read_message pointer
-        latest_msg = Message.objects.filter(conversation_id=conversation_id).order_by("-timestamp").first()
-        if latest_msg:
-            participant = ConversationParticipant.objects.filter(user_id=self.user_id, conversation_id=conversation_id).first()
-            if participant:
-                participant.last_read_message = latest_msg
-                participant.save()
+    @sync_to_async
+    def presence_leave(self):
+        from core import presence
+        presence.leave(self.user_id, self.channel_name)
 
     @sync_to_async
-    def get_newly_read_message_ids(self, conversation_id, user_id):
-        from core.models import MessageRead
+    def get_online(self, user_ids):
+        from core import presence
+        return presence.online(user_ids)
 
-        # Return message IDs that are now seen by user
-        return list(
-            MessageRead.objects.filter(
-                user_id=user_id,
-                message__conversation_id=conversation_id,
-                status='seen'
-            ).values_list('message_id', flat=True)
-        )
+    @sync_to_async
+    def defer_digest(self, user_ids):
+        from core import presence
+        presence.defer_digest(user_ids)
 
     @sync_to_async
-    def get_message(self, message_id):
-        from core.models import Message
-        try:
-            return Message.objects.select_related("sender", "conversation").get(id=message_id)
-        except Message.DoesNotExist:
-            return None
+    def get_unread_summary(self):
+        from core.chat import unread_summary
+        return unread_summary(self.user_id)
 
     @sync_to_async
     def search_users(self, keyword):
@@ -355,89 +397,26 @@ class ChatConsumer(AsyncWebsocketConsumer):
         }
 
     @sync_to_async
-    def get_user_conversations(self):
-        from core.models import ConversationParticipant, Message
-
-        result = []
-        cps = ConversationParticipant.objects.select_related("conversation").filter(user_id=self.user_id)
-
-        for p in cps:
-            conv = p.conversation
-            last_read = p.last_read_message
-
-            last_msg = Message.objects.filter(conversation=conv).order_by("-timestamp").first()
-
-            has_unread = False
-            if last_msg and (not last_read or last_msg.timestamp > last_read.timestamp) and last_msg.sender_id != self.user_id:
-                has_unread = True
-
-            last_message_data = {
-                "content": last_msg.content if last_msg else "",
-                "timestamp": last_msg.timestamp.isoformat() if last_msg else None,
-                "sender_id": last_msg.sender.id if last_msg else None,
-                "sender_username": last_msg.sender.username if last_msg else None,
-            }
-
-            result.append({
-                "id": conv.id,
-                "participants": list(conv.participants.all().values("user__id", "user__username")),
-                "has_unread": has_unread,
-                "last_message": last_message_data,
-            })
-
-        return result
+    def get_user_conversations(self, offset, limit):
+        from core.chat import inbox
+        return inbox(self.user_id, offset, limit)
 
     @sync_to_async
-    def get_conversation_messages_sync(self, conversation_id):
-        from core.models import Message
-        return list(
-            Message.objects.filter(conversation_id=conversation_id).select_related("sender", "conversation").order_by("timestamp")
-        )
-
-    async def get_conversation_messages(self, conversation_id):
-        messages = await self.get_conversation_messages_sync(conversation_id)
-        results = []
-        for m in messages:
-            serialized = await self.serialize_message(m)
-            results.append(serialized)
-        return results
-
-    async def serialize_message(self, msg):
-        from core.models import MessageRead
-        from asgiref.sync import sync_to_async
-        from core.utils_encryption import decrypt_text
+    def get_conversation_messages_sync(self, conversation_id, before_id=None, limit=None):
+        from core.chat import clamp_limit, message_history
+        return message_history(self.user_id, conversation_id, before_id, clamp_limit(limit))
 
-        status = None
-        is_read = False
-
-        if msg.sender.id == self.user_id:
-            other_user_ids = await sync_to_async(
-                lambda: list(msg.conversation.participants.exclude(user_id=self.user_id).values_list('user_id', flat=True))
-            )()
-
-            if other_user_ids:
-                try:
-                    mr = await sync_to_async(msg.reads.get)(user_id=other_user_ids[0])
-                    status = mr.status
-                    is_read = (status == 'seen')
-                except MessageRead.DoesNotExist:
-                    status = None
-                    is_read = False
+    @sync_to_async
+    def get_messages_since_sync(self, conversation_id, after_id, limit=None):
+        from core.chat import clamp_limit, messages_since
+        return messages_since(self.user_id, conversation_id, after_id, clamp_limit(limit))
 
-        # Decrypt content
-        decrypted_content = decrypt_text(msg.content)
+    async def serialize_messages(self, messages):
+        from core.utils_encryption import decrypt_many_async
 
-        return {
-            "id": msg.id,
-            "conversation_id": msg.conversation.id,
-            "sender": {"id": msg.sender.id, "username": msg.sender.username},
-            "content": decrypted_content,
-            "timestamp": msg.timestamp.isoformat(),
-            "is_system": getattr(msg, "is_system", False),
-            "attachment": msg.attachment.url if getattr(msg, "attachment", None) else None,
-            "is_read": is_read,
-            "status": status,
-        }
+        # Decrypt in the crypto pool, not in the thread shared by ORM calls
+        contents = await decrypt_many_async([m.content for m in messages])
+        return await sync_to_async(serialize_messages)(messages, self.user_id, contents=contents)
 
     @sync_to_async
     def mark_message_delivered(self, message_id, user_id):
@@ -451,11 +430,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
             pass
 
     @sync_to_async
-    def is_contact_unlocked(self, user1_id, user2_id):
+    def get_unlocked_ids(self):
         from core.models import ContactUnlock
         from django.db.models import Q
 
-        return ContactUnlock.objects.filter(
-            Q(unlocker_id=user1_id, target_id=user2_id) |
-            Q(unlocker_id=user2_id, target_id=user1_id)
-        ).exists()
+        pairs = ContactUnlock.objects.filter(
+            Q(unlocker_id=self.user_id) | Q(target_id=self.user_id)
+        ).values_list("unlocker_id", "target_id")
+        return {target_id if unlocker_id == self.user_id else unlocker_id for unlocker_id, target_id in pairs}
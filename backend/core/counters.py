@@ -0,0 +1,75 @@
+"""
+Per-user unread badges kept in the cache.
+
+Chat: ``ConversationParticipant.unread_count`` is the source of truth. The
+sum over a user's conversations is cached so the badge costs one cache
+read: new messages ``incr()`` it when it is cached, reading a conversation
+drops it, and a missing value is rebuilt with one aggregate query.
+
+Notifications: the number of unread ``Notification`` rows, maintained the
+same way (bumped on create, dropped when notifications are marked read,
+changed or deleted, rebuilt with one COUNT on a miss).
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+CACHE_TIMEOUT = 10 * 60
+
+
+def _key(user_id):
+    return f"chat:unread-total:{user_id}"
+
+
+def unread_total(user_id):
+    total = cache.get(_key(user_id))
+    if total is None:
+        from core.models import ConversationParticipant
+
+        total = (
+            ConversationParticipant.objects.filter(user_id=user_id)
+            .aggregate(total=Sum("unread_count"))["total"] or 0
+        )
+        # add() so a value bumped meanwhile by incr_unread_totals() is kept
+        cache.add(_key(user_id), total, timeout=CACHE_TIMEOUT)
+    return total
+
+
+def incr_unread_totals(user_ids):
+    for user_id in user_ids:
+        try:
+            cache.incr(_key(user_id))
+        except ValueError:  # not cached, rebuilt on the next read
+            pass
+
+
+def reset_unread_total(user_id):
+    cache.delete(_key(user_id))
+
+
+def _notifications_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def unread_notifications(user_id):
+    count = cache.get(_notifications_key(user_id))
+    if count is None:
+        from core.models import Notification
+
+        count = Notification.objects.filter(to_user_id=user_id, is_read=False).count()
+        cache.add(_notifications_key(user_id), count, timeout=CACHE_TIMEOUT)
+    return count
+
+
+def incr_unread_notifications(user_ids):
+    """Count one new unread notification per occurrence of a user id."""
+    for user_id, n in Counter(user_ids).items():
+        try:
+            cache.incr(_notifications_key(user_id), n)
+        except ValueError:  # not cached, rebuilt on the next read
+            pass
+
+
+def reset_unread_notifications(user_id):
+    cache.delete(_notifications_key(user_id))
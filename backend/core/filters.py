@@ -0,0 +1,40 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .geo import bounding_box_q, haversine_expression
+
+
+class GeoRadiusFilter(BaseFilterBackend):
+    """
+    Restrict a queryset to rows within `radius_km` of `lat`/`lng` query params,
+    nearest first. The bounding box runs on the indexed latitude/longitude
+    columns, so the exact haversine distance is only evaluated for candidates.
+    The result stays a QuerySet, so pagination and other filters still apply.
+    """
+    default_radius_km = 20
+    max_radius_km = 500
+
+    def filter_queryset(self, request, queryset, view):
+        lat = request.query_params.get('lat')
+        lng = request.query_params.get('lng')
+        if not (lat and lng):
+            return queryset
+
+        try:
+            lat = float(lat)
+            lng = float(lng)
+            radius_km = float(request.query_params.get('radius_km', self.default_radius_km))
+        except ValueError:
+            raise ValidationError({"detail": "lat, lng and radius_km must be numbers."})
+
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius_km <= 0:
+            raise ValidationError({"detail": "Invalid coordinates or radius."})
+        radius_km = min(radius_km, self.max_radius_km)
+
+        return (
+            queryset
+            .filter(bounding_box_q(lat, lng, radius_km))
+            .annotate(distance_km=haversine_expression(lat, lng))
+            .filter(distance_km__lte=radius_km)
+            .order_by('distance_km', 'pk')
+        )
@@ -0,0 +1,130 @@
+"""
+Great-circle distance helpers shared by the geo-aware views.
+
+Distances can be computed in the database (``haversine_expression``) or in
+bulk for rows already in memory (``haversine_many`` / ``nearest``). The bulk
+helpers use NumPy when it is installed and fall back to plain Python.
+"""
+import heapq
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """
+    Calculate the great-circle distance between two points
+    on the Earth specified by longitude and latitude in decimal degrees.
+    Returns distance in kilometers.
+    """
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
+
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+
+    return EARTH_RADIUS_KM * c
+
+
+def haversine_many(lat, lng, lats, lngs):
+    """
+    Distances in km from (lat, lng) to every (lats[i], lngs[i]).
+    Points with a missing coordinate get ``inf`` so they rank last.
+    Returns a NumPy array when NumPy is available, otherwise a list.
+    """
+    if np is not None:
+        lat2 = np.radians(np.asarray(lats, dtype=float))
+        lng2 = np.radians(np.asarray(lngs, dtype=float))
+        lat1, lng1 = math.radians(lat), math.radians(lng)
+        a = (
+            np.sin((lat2 - lat1) / 2) ** 2
+            + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+        )
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        distances[np.isnan(distances)] = np.inf
+        return distances
+
+    return [
+        haversine(lng, lat, p_lng, p_lat) if p_lat is not None and p_lng is not None else math.inf
+        for p_lat, p_lng in zip(lats, lngs)
+    ]
+
+
+def nearest(distances, k=None, priority=None):
+    """
+    Indices of the `k` best entries ordered by (priority, distance, index),
+    all of them when `k` is None. Only the top `k` are sorted, so asking for
+    one page of a large candidate list stays cheap.
+    """
+    n = len(distances)
+    k = n if k is None else max(0, min(k, n))
+    if k == 0:
+        return []
+
+    if np is not None:
+        keys = np.zeros(n, dtype=[("priority", float), ("distance", float), ("index", int)])
+        keys["priority"] = 0 if priority is None else priority
+        keys["distance"] = distances
+        keys["index"] = np.arange(n)
+        if k < n:
+            top = np.argpartition(keys, k - 1, order=("priority", "distance", "index"))[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(keys[top], order=("priority", "distance", "index"))]
+        return top.tolist()
+
+    if priority is None:
+        return heapq.nsmallest(k, range(n), key=lambda i: (distances[i], i))
+    return heapq.nsmallest(k, range(n), key=lambda i: (priority[i], distances[i], i))
+
+
+def bounding_box_q(lat, lng, radius_km, lat_field="latitude", lng_field="longitude"):
+    """
+    Q object selecting rows inside the lat/lng box that encloses the circle
+    of `radius_km` around (lat, lng). It is a cheap superset of the circle
+    that can use an index on the coordinate columns; callers refine the
+    candidates with an exact haversine distance.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = lat - lat_delta, lat + lat_delta
+
+    # Near the poles the circle covers every longitude.
+    if min_lat <= -90 or max_lat >= 90:
+        return Q(**{f"{lat_field}__gte": max(min_lat, -90), f"{lat_field}__lte": min(max_lat, 90)})
+
+    lng_delta = math.degrees(math.asin(min(1.0, math.sin(lat_delta * math.pi / 180) / math.cos(math.radians(lat)))))
+    min_lng, max_lng = lng - lng_delta, lng + lng_delta
+
+    lat_q = Q(**{f"{lat_field}__gte": min_lat, f"{lat_field}__lte": max_lat})
+    if min_lng < -180:
+        lng_q = Q(**{f"{lng_field}__gte": min_lng + 360}) | Q(**{f"{lng_field}__lte": max_lng})
+    elif max_lng > 180:
+        lng_q = Q(**{f"{lng_field}__gte": min_lng}) | Q(**{f"{lng_field}__lte": max_lng - 360})
+    else:
+        lng_q = Q(**{f"{lng_field}__gte": min_lng, f"{lng_field}__lte": max_lng})
+    return lat_q & lng_q
+
+
+def haversine_expression(lat, lng, lat_field="latitude", lng_field="longitude"):
+    """Database expression for the distance in km from (lat, lng) to each row."""
+    lat1 = Radians(Value(lat, output_field=FloatField()))
+    lng1 = Radians(Value(lng, output_field=FloatField()))
+    lat2 = Radians(F(lat_field))
+    lng2 = Radians(F(lng_field))
+
+    a = (
+        Power(Sin((lat2 - lat1) / 2), 2)
+        + Cos(lat1) * Cos(lat2) * Power(Sin((lng2 - lng1) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM, output_field=FloatField()) * ASin(Sqrt(a))
@@ -0,0 +1,133 @@
+"""
+Persisted geocoding for user and job locations.
+
+Requests never talk to a geocoding service directly. Coordinates are looked
+up in the ``GeocodedLocation`` store, which Celery tasks fill in the
+background through the geocoder configured by ``settings.GEOCODER_BACKEND``.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+from geopy.exc import GeocoderServiceError
+from geopy.geocoders import Nominatim
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEOCODER_BACKEND = "core.geocoding.NominatimGeocoder"
+
+# Sentinel for lookup_coordinates: no lookup for this location has been stored yet
+NOT_STORED = object()
+
+# A location typed into search is queued for geocoding at most once per window
+SEARCH_GEOCODE_DEDUPE_SECONDS = 600
+
+
+def normalize_location(value):
+    """Canonical key for a free-text location ("  Dhaka ,BD" -> "dhaka, bd")."""
+    if not value:
+        return ""
+    parts = [" ".join(part.split()) for part in value.lower().split(",")]
+    return ", ".join(part for part in parts if part)
+
+
+class NominatimGeocoder:
+    """Geocoder backed by the public Nominatim (OpenStreetMap) service."""
+
+    def __init__(self):
+        self.client = Nominatim(
+            user_agent=getattr(settings, "GEOCODER_USER_AGENT", "tutormove"),
+            timeout=getattr(settings, "GEOCODER_TIMEOUT", 5),
+        )
+
+    def geocode(self, query):
+        try:
+            loc = self.client.geocode(query)
+        except GeocoderServiceError as e:
+            logger.warning(f"Geocoding failed for {query!r}: {e}")
+            raise
+        if not loc:
+            return None
+        return loc.latitude, loc.longitude
+
+
+class StaticGeocoder:
+    """
+    Local stand-in geocoder for tests and offline development.
+    Resolves names from ``settings.GEOCODER_STATIC_LOCATIONS``
+    (a dict of normalized location -> (latitude, longitude)).
+    """
+
+    def geocode(self, query):
+        locations = getattr(settings, "GEOCODER_STATIC_LOCATIONS", {})
+        coords = locations.get(normalize_location(query))
+        return tuple(coords) if coords else None
+
+
+def get_geocoder():
+    backend = getattr(settings, "GEOCODER_BACKEND", DEFAULT_GEOCODER_BACKEND)
+    return import_string(backend)()
+
+
+def lookup_coordinates(location, default=None):
+    """
+    Return stored (latitude, longitude) for a location string, None for a
+    stored failed lookup, or `default` when nothing is stored yet.
+    Database only - safe to call inside a request.
+    """
+    from core.models import GeocodedLocation
+
+    query = normalize_location(location)
+    if not query:
+        return None
+    row = GeocodedLocation.objects.filter(query=query).values_list("latitude", "longitude").first()
+    if not row:
+        return default
+    if row[0] is None:
+        return None
+    return row
+
+
+def queue_search_geocode(location):
+    """
+    Geocode a searched location in the background, once per query per
+    SEARCH_GEOCODE_DEDUPE_SECONDS however many searches repeat it.
+    Callers should only queue locations with no stored lookup.
+    """
+    from core.tasks import geocode_search_location
+
+    query = normalize_location(location)
+    if not query:
+        return
+    key = f"geocode:search:{hashlib.md5(query.encode()).hexdigest()}"
+    if cache.add(key, 1, timeout=SEARCH_GEOCODE_DEDUPE_SECONDS):
+        transaction.on_commit(lambda: geocode_search_location.delay(query))
+
+
+def geocode_location(location):
+    """
+    Resolve a location through the store, calling the geocoder on a miss.
+    Failed lookups are stored too (with empty coordinates) so unknown
+    places are not retried on every save. Meant for background tasks.
+    """
+    from core.models import GeocodedLocation
+
+    query = normalize_location(location)
+    if not query:
+        return None
+
+    entry = GeocodedLocation.objects.filter(query=query).first()
+    if entry is None:
+        coords = get_geocoder().geocode(query)
+        latitude, longitude = coords if coords else (None, None)
+        entry, _ = GeocodedLocation.objects.update_or_create(
+            query=query,
+            defaults={"latitude": latitude, "longitude": longitude},
+        )
+
+    if entry.latitude is None:
+        return None
+    return entry.latitude, entry.longitude
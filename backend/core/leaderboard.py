@@ -0,0 +1,150 @@
+"""
+Per-subject tutor leaderboard used to gate first-hour job unlocks.
+
+A tutor's score for a subject is the sum of ``used_credits`` over their gigs
+with that subject (what ``GigViewSet.boost`` spends). Scores live in one
+Redis sorted set per gig subject, so the top tutors for a job's subjects are
+a ZUNIONSTORE + ZREVRANGE instead of an aggregation over every gig.
+Without django-redis (or when Redis is unreachable) the same ranking is
+computed from the database.
+"""
+import logging
+
+from django.db.models import Q, Sum
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+TOP_TUTORS = 10
+KEY_PREFIX = "leaderboard:gig-subject:"
+BUILT_KEY = "leaderboard:built"
+BUILD_LOCK_KEY = "leaderboard:building"
+BUILD_LOCK_TIMEOUT = 60
+
+
+def _redis():
+    from django_redis import get_redis_connection
+
+    try:
+        return get_redis_connection("default")
+    except NotImplementedError:  # cache backend is not django-redis
+        return None
+
+
+def _key(subject):
+    return f"{KEY_PREFIX}{subject}"
+
+
+def _scores_from_db(subjects, tutor_id=None):
+    """{(subject, tutor_id): total used_credits} for tutors' gigs in `subjects`."""
+    from core.models import Gig
+
+    gigs = Gig.objects.filter(subject__in=subjects, tutor__user_type="tutor")
+    if tutor_id is not None:
+        gigs = gigs.filter(tutor_id=tutor_id)
+    rows = gigs.values("subject", "tutor_id").annotate(points=Sum("used_credits"))
+    return {(row["subject"], row["tutor_id"]): row["points"] or 0 for row in rows}
+
+
+def top_tutors_from_db(subjects, limit=TOP_TUTORS):
+    from core.models import User
+
+    subjects = list(subjects)
+    return list(
+        User.objects.filter(user_type="tutor", gigs__subject__in=subjects)
+        .distinct()
+        .annotate(total_points_spent=Sum("gigs__used_credits", filter=Q(gigs__subject__in=subjects)))
+        .order_by("-total_points_spent")
+        .values_list("id", flat=True)[:limit]
+    )
+
+
+def rebuild():
+    """
+    Rebuild every subject set from the database (e.g. after the monthly
+    reset). Returns False if Redis failed; the sets then count as unbuilt and
+    top_tutors() retries the rebuild on its next call.
+    """
+    from core.models import Gig
+
+    conn = _redis()
+    if conn is None:
+        return False
+    subjects = set(Gig.objects.values_list("subject", flat=True).distinct())
+    scores = _scores_from_db(subjects)
+
+    try:
+        pipe = conn.pipeline()
+        for key in conn.scan_iter(match=f"{KEY_PREFIX}*"):
+            pipe.delete(key)
+        for (subject, tutor_id), points in scores.items():
+            pipe.zadd(_key(subject), {tutor_id: points})
+        pipe.set(BUILT_KEY, 1)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Leaderboard rebuild failed: {e}")
+        try:  # stale sets must not count as built; the next top_tutors() retries
+            conn.delete(BUILT_KEY)
+        except RedisError:
+            pass
+        return False
+    return True
+
+
+def refresh_tutor(tutor_id, subjects):
+    """Re-score one tutor in the given subjects after their gigs changed."""
+    conn = _redis()
+    if conn is None:
+        return
+    subjects = [subject for subject in set(subjects) if subject]
+    scores = _scores_from_db(subjects, tutor_id=tutor_id)
+    try:
+        pipe = conn.pipeline()
+        for subject in subjects:
+            if (subject, tutor_id) in scores:
+                pipe.zadd(_key(subject), {tutor_id: scores[(subject, tutor_id)]})
+            else:
+                pipe.zrem(_key(subject), tutor_id)
+        pipe.execute()
+    except RedisError as e:
+        # The next rebuild() corrects the set
+        logger.warning(f"Leaderboard update failed for tutor {tutor_id}: {e}")
+
+
+def top_tutors(subjects, limit=TOP_TUTORS):
+    """
+    Ids of the `limit` tutors who spent most on gigs in `subjects`. If the
+    sets are not built yet, one caller rebuilds them (under BUILD_LOCK_KEY)
+    and everybody else ranks from the database meanwhile.
+    """
+    subjects = sorted(set(subjects))
+    if not subjects:
+        return []
+
+    conn = _redis()
+    if conn is not None:
+        try:
+            if not conn.exists(BUILT_KEY):
+                if not conn.set(BUILD_LOCK_KEY, 1, nx=True, ex=BUILD_LOCK_TIMEOUT):
+                    return top_tutors_from_db(subjects, limit)
+                try:
+                    built = rebuild()
+                finally:
+                    conn.delete(BUILD_LOCK_KEY)
+                if not built:
+                    return top_tutors_from_db(subjects, limit)
+            keys = [_key(subject) for subject in subjects]
+            if len(keys) == 1:
+                members = conn.zrevrange(keys[0], 0, limit - 1)
+            else:
+                tmp = f"leaderboard:tmp:{'|'.join(subjects)}"
+                pipe = conn.pipeline()
+                pipe.zunionstore(tmp, keys)
+                pipe.zrevrange(tmp, 0, limit - 1)
+                pipe.delete(tmp)
+                members = pipe.execute()[1]
+            return [int(member) for member in members]
+        except RedisError as e:
+            logger.warning(f"Leaderboard unavailable, using database: {e}")
+
+    return top_tutors_from_db(subjects, limit)
@@ -0,0 +1,10 @@
+"""
+Cache and channel layer settings that need no Redis, for the test suite and
+the benchmark commands (use with override_settings).
+"""
+
+# The default cache is django-redis; this is a process-local in-memory one.
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "core-local"}}
+
+# Channels groups within one process, for driving ChatConsumer directly.
+IN_MEMORY_LAYER = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
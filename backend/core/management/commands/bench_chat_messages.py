@@ -0,0 +1,95 @@
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.local_backends import IN_MEMORY_LAYER, LOCMEM_CACHE
+from core.models import ContactUnlock, Conversation, ConversationParticipant
+from core.routing import websocket_application
+
+User = get_user_model()
+
+
+class QueryCounter(logging.Handler):
+    """Counts SQL statements from every thread (the consumer runs its DB work off the event loop)."""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+class Command(BaseCommand):
+    help = "Measure chat.message throughput through ChatConsumer with the in-memory channel layer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=300)
+        parser.add_argument("--participants", type=int, default=2, help="Conversation size, sender included")
+
+    def handle(self, *args, **options):
+        users = [
+            User.objects.create_user(username=f"bench_chat_{i}", password=None, user_type="tutor" if i else "student")
+            for i in range(max(options["participants"], 2))
+        ]
+        conversation = Conversation.objects.create()
+        try:
+            ConversationParticipant.objects.bulk_create(
+                ConversationParticipant(conversation=conversation, user=user) for user in users
+            )
+            ContactUnlock.objects.bulk_create(
+                ContactUnlock(unlocker=users[0], target=user) for user in users[1:]
+            )
+            tokens = {user.id: str(AccessToken.for_user(user)) for user in users}
+            counter = QueryCounter()
+            db_logger = logging.getLogger("django.db.backends")
+            level = db_logger.level
+            db_logger.addHandler(counter)
+            db_logger.setLevel(logging.DEBUG)
+            try:
+                # DEBUG makes Django log every query it runs
+                with override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER, CACHES=LOCMEM_CACHE, DEBUG=True):
+                    elapsed, query_count = async_to_sync(self.run)(tokens, conversation.id, options["messages"], counter)
+            finally:
+                db_logger.removeHandler(counter)
+                db_logger.setLevel(level)
+        finally:
+            # Participants, messages and unlocks go with these rows
+            conversation.delete()
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+        count = options["messages"]
+        self.stdout.write(f"participants={len(users)} messages={count}")
+        self.stdout.write(f"{count / elapsed:.0f} msg/s, {elapsed / count * 1000:.2f} ms/msg")
+        self.stdout.write(f"{query_count / count:.1f} queries/msg")
+
+    async def run(self, tokens, conversation_id, count, counter):
+        application = websocket_application
+        communicators = []
+        for user_id, token in tokens.items():
+            communicator = WebsocketCommunicator(application, f"/ws/chat/{user_id}/?token={token}")
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise RuntimeError(f"Could not connect user {user_id}")
+            communicators.append(communicator)
+        sender, recipients = communicators[0], communicators[1:]
+
+        queries_before = counter.count
+        start = time.perf_counter()
+        for i in range(count):
+            await sender.send_json_to({"type": "chat.message", "conversation_id": conversation_id, "content": f"message {i}"})
+            await sender.receive_json_from(timeout=5)
+            for recipient in recipients:
+                await recipient.receive_json_from(timeout=5)
+        elapsed = time.perf_counter() - start
+        query_count = counter.count - queries_before
+
+        for communicator in communicators:
+            await communicator.disconnect()
+        return elapsed, query_count
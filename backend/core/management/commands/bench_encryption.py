@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from cryptography.fernet import Fernet
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.utils_encryption import _fernet_key, decrypt_many, decrypt_many_async, decrypt_text, encrypt_many, encrypt_text
+
+
+class Command(BaseCommand):
+    help = "Compare per-message cost of chat encryption: a cipher per call vs the cached cipher and bulk APIs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=5000)
+        parser.add_argument("--length", type=int, default=120, help="Characters per message")
+
+    def handle(self, *args, **options):
+        texts = [f"{i:06d} " + "x" * max(options["length"] - 7, 0) for i in range(options["messages"])]
+
+        def per_call_cipher_encrypt():
+            # What get_cipher_suite() used to do on every call
+            return [Fernet(_fernet_key(settings.SECRET_KEY)).encrypt(t.encode()).decode() for t in texts]
+
+        tokens = per_call_cipher_encrypt()
+
+        def per_call_cipher_decrypt():
+            return [Fernet(_fernet_key(settings.SECRET_KEY)).decrypt(t.encode()).decode() for t in tokens]
+
+        runs = [
+            ("encrypt, new cipher per call", per_call_cipher_encrypt),
+            ("encrypt_text (cached cipher)", lambda: [encrypt_text(t) for t in texts]),
+            ("encrypt_many", lambda: encrypt_many(texts)),
+            ("decrypt, new cipher per call", per_call_cipher_decrypt),
+            ("decrypt_text (cached cipher)", lambda: [decrypt_text(t) for t in tokens]),
+            ("decrypt_many", lambda: decrypt_many(tokens)),
+            ("decrypt_many_async", lambda: asyncio.run(decrypt_many_async(tokens))),
+        ]
+        for label, run in runs:
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{label:32} {elapsed * 1e6 / len(texts):8.1f} us/message")
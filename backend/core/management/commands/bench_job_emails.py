@@ -0,0 +1,53 @@
+import time
+
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.tasks import send_job_email, send_job_email_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare job email throughput: one task and SMTP connection per recipient vs "
+        "send_job_email_batch over one connection. Uses the locmem backend unless --smtp-port "
+        "points at a local SMTP stand-in (e.g. python -m aiosmtpd -n -l localhost:8025)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipients", type=int, default=2000)
+        parser.add_argument("--smtp-host", default="localhost")
+        parser.add_argument("--smtp-port", type=int, help="Send through SMTP on this port instead of locmem")
+
+    def handle(self, *args, **options):
+        recipients = [
+            {
+                "email": f"tutor{i}@example.com",
+                "html_content": "<p>New job posted matching your subjects.</p>" * 20,
+                "text_content": "New job posted matching your subjects.",
+            }
+            for i in range(options["recipients"])
+        ]
+        if options["smtp_port"]:
+            backend = {
+                "EMAIL_BACKEND": "django.core.mail.backends.smtp.EmailBackend",
+                "EMAIL_HOST": options["smtp_host"],
+                "EMAIL_PORT": options["smtp_port"],
+                "EMAIL_USE_TLS": False,
+                "EMAIL_HOST_USER": "",
+                "EMAIL_HOST_PASSWORD": "",
+            }
+        else:
+            backend = {"EMAIL_BACKEND": "django.core.mail.backends.locmem.EmailBackend"}
+
+        runs = [
+            ("send_job_email per recipient", lambda: [send_job_email(**r) for r in recipients]),
+            ("send_job_email_batch", lambda: send_job_email_batch(recipients)),
+        ]
+        with override_settings(**backend):
+            for label, run in runs:
+                mail.outbox = []
+                started = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{label:30} {len(recipients) / elapsed:8.0f} msg/s")
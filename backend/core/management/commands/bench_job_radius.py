@@ -0,0 +1,79 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.geo import bounding_box_q, haversine, haversine_expression
+from core.models import Job
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare the in-Python job radius scan with the database radius filter on synthetic jobs (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jobs", type=int, default=100_000)
+        parser.add_argument("--radius-km", type=float, default=20)
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        lat, lng = 23.8103, 90.4125
+        radius_km = options["radius_km"]
+        page_size = options["page_size"]
+
+        try:
+            with transaction.atomic():
+                student = User.objects.create_user(username="bench_job_radius", password=None, user_type="student")
+                Job.objects.bulk_create(
+                    (
+                        Job(
+                            student=student,
+                            location="Bench",
+                            latitude=rng.uniform(20.5, 26.5),
+                            longitude=rng.uniform(88.0, 92.7),
+                        )
+                        for _ in range(options["jobs"])
+                    ),
+                    batch_size=5000,
+                )
+
+                start = time.perf_counter()
+                matches = []
+                for job in Job.objects.all():
+                    if job.latitude is not None and job.longitude is not None:
+                        distance = haversine(lng, lat, job.longitude, job.latitude)
+                        if distance <= radius_km:
+                            job._distance = distance
+                            matches.append(job)
+                matches.sort(key=lambda j: j._distance)
+                legacy_count, legacy_page = len(matches), [j.pk for j in matches[:page_size]]
+                legacy_ms = (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                queryset = (
+                    Job.objects.filter(bounding_box_q(lat, lng, radius_km))
+                    .annotate(distance_km=haversine_expression(lat, lng))
+                    .filter(distance_km__lte=radius_km)
+                    .order_by("distance_km", "pk")
+                )
+                db_count = queryset.count()
+                db_page = list(queryset.values_list("pk", flat=True)[:page_size])
+                db_ms = (time.perf_counter() - start) * 1000
+
+                self.stdout.write(f"jobs={options['jobs']} radius_km={radius_km} matches={db_count}")
+                self.stdout.write(f"python scan: {legacy_ms:.1f} ms")
+                self.stdout.write(f"db filter:   {db_ms:.1f} ms (count + first page)")
+                if (legacy_count, legacy_page) != (db_count, db_page):
+                    self.stdout.write(self.style.WARNING("Result mismatch between the two strategies"))
+                raise Rollback
+        except Rollback:
+            pass
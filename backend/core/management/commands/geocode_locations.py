@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from core.models import Job, User
+from core.tasks import geocode_job_location, geocode_user_location
+
+class Command(BaseCommand):
+    help = "Queue geocoding for users and jobs whose location has no stored coordinates"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sync", action="store_true", help="Geocode in this process instead of queueing Celery tasks")
+
+    def handle(self, *args, **options):
+        for model, task, label in (
+            (User, geocode_user_location, "users"),
+            (Job, geocode_job_location, "jobs"),
+        ):
+            ids = (
+                model.objects.exclude(location__isnull=True).exclude(location="")
+                .filter(latitude__isnull=True)
+                .values_list("id", flat=True)
+            )
+
+            count = 0
+            for pk in ids.iterator():
+                if options["sync"]:
+                    task(pk)
+                else:
+                    task.delay(pk)
+                count += 1
+
+            self.stdout.write(self.style.SUCCESS(f"{'Geocoded' if options['sync'] else 'Queued'} {count} {label}"))
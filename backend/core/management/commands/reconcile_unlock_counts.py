@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Job, JobUnlock
+
+
+class Command(BaseCommand):
+    help = "Repair Job.unlock_count where it drifted from the number of JobUnlock rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report drifted jobs without fixing them")
+
+    def handle(self, *args, **options):
+        counts = (
+            JobUnlock.objects.filter(job=OuterRef("pk"))
+            .values("job").annotate(n=Count("id")).values("n")
+        )
+        drifted = (
+            Job.objects.annotate(actual=Coalesce(Subquery(counts), 0))
+            .exclude(unlock_count=F("actual"))
+            .values_list("id", "unlock_count", "actual")
+        )
+
+        fixed = 0
+        for job_id, stored, actual in drifted.iterator():
+            self.stdout.write(f"Job {job_id}: unlock_count {stored} -> {actual}")
+            if not options["dry_run"]:
+                # Recount at write time so unlocks made meanwhile are not lost
+                Job.objects.filter(id=job_id).update(
+                    unlock_count=Coalesce(Subquery(counts), 0)
+                )
+            fixed += 1
+
+        verb = "Found" if options["dry_run"] else "Reconciled"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {fixed} jobs"))
@@ -0,0 +1,75 @@
+"""
+JWT authentication for websocket connections.
+
+Clients connect with ``?token=<access token>``. The token is validated on
+every connect, and the identity it maps to (id, username, user_type) is
+cached under the token's ``jti`` for at most ``IDENTITY_CACHE_TIMEOUT``
+seconds, so a burst of reconnects with the same token costs no database
+queries. A user who is deactivated can therefore still open new websockets
+for up to that long; after it the row (and ``is_active``) is read again.
+``scope["user"]`` is a ``WebSocketUser`` on success and ``AnonymousUser``
+otherwise.
+"""
+import logging
+import time
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "ws:identity:"
+IDENTITY_CACHE_TIMEOUT = 60
+
+
+class WebSocketUser:
+    """The part of a User that websocket handlers need, without the row."""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username, user_type):
+        self.id = id
+        self.username = username
+        self.user_type = user_type
+
+    @property
+    def pk(self):
+        return self.id
+
+
+@database_sync_to_async
+def get_identity(raw_token):
+    try:
+        token = AccessToken(raw_token)
+    except TokenError as e:
+        logger.info(f"Rejected websocket token: {e}")
+        return None
+
+    key = f"{CACHE_PREFIX}{token[api_settings.JTI_CLAIM]}"
+    identity = cache.get(key)
+    if identity is None:
+        identity = (
+            get_user_model().objects.filter(pk=token[api_settings.USER_ID_CLAIM], is_active=True)
+            .values("id", "username", "user_type").first()
+        )
+        if identity is None:
+            return None
+        expires_in = max(int(token["exp"] - time.time()), 1)
+        cache.set(key, identity, timeout=min(expires_in, IDENTITY_CACHE_TIMEOUT))
+    return WebSocketUser(**identity)
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get("query_string", b"").decode()).get("token", [None])[0]
+        user = await get_identity(token) if token else None
+        scope = dict(scope, user=user or AnonymousUser())
+        return await super().__call__(scope, receive, send)
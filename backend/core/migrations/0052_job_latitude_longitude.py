@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0051_user_latitude_longitude_geocodedlocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['latitude', 'longitude'], name='job_lat_lng_idx'),
+        ),
+    ]
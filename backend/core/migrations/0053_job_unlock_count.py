@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unlock_count(apps, schema_editor):
+    Job = apps.get_model('core', 'Job')
+    JobUnlock = apps.get_model('core', 'JobUnlock')
+    counts = (
+        JobUnlock.objects.filter(job=OuterRef('pk'))
+        .values('job').annotate(n=Count('id')).values('n')
+    )
+    Job.objects.update(unlock_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0052_job_latitude_longitude'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='unlock_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unlock_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0053_job_unlock_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='top_tutor_ids',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0054_job_top_tutor_ids'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'timestamp', 'id'], name='message_conv_ts_id_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:36
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_last_message(apps, schema_editor):
+    Conversation = apps.get_model('core', 'Conversation')
+    Message = apps.get_model('core', 'Message')
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-timestamp', '-id')
+    Conversation.objects.update(
+        last_message=Subquery(latest.values('pk')[:1]),
+        last_message_at=Subquery(latest.values('timestamp')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0055_message_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-17 20:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_count(apps, schema_editor):
+    ConversationParticipant = apps.get_model('core', 'ConversationParticipant')
+    MessageRead = apps.get_model('core', 'MessageRead')
+    counts = (
+        MessageRead.objects.filter(
+            user=OuterRef('user'), message__conversation=OuterRef('conversation')
+        ).exclude(status='seen')
+        .values('user').annotate(n=Count('id')).values('n')
+    )
+    ConversationParticipant.objects.update(unread_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0056_conversation_last_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0057_conversationparticipant_unread_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersettings',
+            name='job_alert_frequency',
+            field=models.CharField(choices=[('instant', 'Instant'), ('hourly', 'Hourly digest'), ('daily', 'Daily digest')], default='instant', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='usersettings',
+            name='last_job_digest_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
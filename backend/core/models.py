@@ -1,6 +1,6 @@
 # backend/core/models.py
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.db.models import F
 from django.utils import timezone
 import re
@@ -31,6 +31,9 @@ class User(AbstractUser):
     verification_requested = models.BooleanField(default=False) # Reverted: Original duplicate field
     is_premium = models.BooleanField(default=False) # Reverted: Original duplicate field
     location = models.CharField(max_length=255, blank=True, null=True, help_text="e.g., City, Country or Region")
+    # Filled in the background from `location` (see core.tasks.geocode_user_location)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
     education = models.CharField(max_length=255, blank=True, null=True)
     experience = models.CharField(max_length=255, blank=True, null=True)
@@ -53,6 +56,16 @@ class User(AbstractUser):
             return self.premium_expires >= timezone.now()
         return False
 
+class GeocodedLocation(models.Model):
+    """Geocoding results keyed by normalized location string (see core.geocoding)."""
+    query = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.query} ({self.latitude}, {self.longitude})"
+
 class ContactUnlock(models.Model):
     unlocker = models.ForeignKey(User, on_delete=models.CASCADE, related_name="contacts_unlocked")
     target = models.ForeignKey(User, on_delete=models.CASCADE, related_name="unlocked_by")
@@ -253,6 +266,9 @@ class Job(models.Model):
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs_posted')
 
     location = models.CharField(max_length=255, default='Unknown')
+    # Filled in the background from `location` (see core.tasks.geocode_job_location)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
     phone = models.CharField(max_length=30, default='N/A')
     description = models.TextField(default='')
 
@@ -308,9 +324,21 @@ class Job(models.Model):
         related_name="assigned_jobs"
     )
 
+    # Number of JobUnlock rows; bumped inside the unlock transaction
+    # (see reconcile_unlock_counts for repairs)
+    unlock_count = models.PositiveIntegerField(default=0)
+    # Tutors allowed to unlock during the first hour, fixed when the job is posted
+    top_tutor_ids = models.JSONField(null=True, blank=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter for geo-radius search (core.filters.GeoRadiusFilter)
+            models.Index(fields=['latitude', 'longitude'], name='job_lat_lng_idx'),
+        ]
+
     def __str__(self):
         return f"Job {self.id} by {self.student.username} - {self.service_type}"
 
@@ -405,6 +433,16 @@ class Application(models.Model):
     def __str__(self):
         return f"Application by {self.teacher.username} for {self.job.title}"
 
+class NotificationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create sends no post_save, so count and push these here
+        from core.signals import notifications_created
+
+        created = super().bulk_create(objs, *args, **kwargs)
+        transaction.on_commit(lambda: notifications_created(created), using=self.db)
+        return created
+
+
 class Notification(models.Model):
     from_user = models.ForeignKey(
         User,
@@ -422,11 +460,16 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = NotificationQuerySet.as_manager()
+
     def __str__(self):
         return f'From {self.from_user} to {self.to_user} - {self.message[:30]}'
 
 class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
+    # Newest message, kept current by core.chat.persist_message for the inbox
+    last_message = models.ForeignKey("Message", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    last_message_at = models.DateTimeField(null=True, blank=True, db_index=True)
 
     def __str__(self):
         return f"Conversation {self.id}"
@@ -437,6 +480,8 @@ class ConversationParticipant(models.Model):
     user = models.ForeignKey(User, related_name='conversations', on_delete=models.CASCADE)
     joined_at = models.DateTimeField(auto_now_add=True)
     last_read_message = models.ForeignKey("Message", null=True, blank=True, on_delete=models.SET_NULL)
+    # Messages from others not yet read by this user (see core.chat)
+    unread_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         unique_together = ('conversation', 'user')
@@ -454,6 +499,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Keyset pagination of a conversation's history (core.chat.message_history)
+            models.Index(fields=['conversation', 'timestamp', 'id'], name='message_conv_ts_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.content[:30]}"
@@ -485,6 +534,15 @@ class UserSettings(models.Model):
     is_premium = models.BooleanField(default=False)
     premium_expires = models.DateTimeField(null=True, blank=True)
     job_notifications = models.BooleanField(default=True)
+    JOB_ALERT_FREQUENCY_CHOICES = [
+        ('instant', 'Instant'),
+        ('hourly', 'Hourly digest'),
+        ('daily', 'Daily digest'),
+    ]
+    # Digest subscribers get no per-job email; core.tasks.send_job_alert_digests
+    # mails them the jobs posted since last_job_digest_at instead
+    job_alert_frequency = models.CharField(max_length=10, choices=JOB_ALERT_FREQUENCY_CHOICES, default='instant')
+    last_job_digest_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Settings for {self.user.username}"
@@ -0,0 +1,134 @@
+"""
+Which users currently have a chat websocket open.
+
+Every ChatConsumer connection stamps its channel name under its user on
+connect and on each ``chat.heartbeat`` (sent by the client every
+``HEARTBEAT_INTERVAL`` seconds) and removes it on disconnect. A connection
+whose stamp is older than ``TTL`` counts as gone, so a crashed worker does
+not leave its users online. With django-redis each user is one sorted set
+(channel name -> last seen); other cache backends (tests, local runs) keep
+the same map as a plain cache value. If Redis is unreachable everybody is
+treated as online, i.e. events are sent as if there were no registry.
+
+Chat events are not pushed to offline users. New messages are queued with
+``defer_digest`` and ``core.tasks.send_chat_digests`` turns their unread
+counters into one notification each. Read receipts are not queued: the
+"seen" status is stored on MessageRead, so a sender who was offline sees it
+in the statuses of the next history page or catch-up they load.
+"""
+import logging
+import time
+
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+TTL = 90
+HEARTBEAT_INTERVAL = 30
+KEY_PREFIX = "presence:user:"
+DIGEST_KEY = "presence:digest-pending"
+
+
+def _redis():
+    from django_redis import get_redis_connection
+
+    try:
+        return get_redis_connection("default")
+    except NotImplementedError:  # cache backend is not django-redis
+        return None
+
+
+def _key(user_id):
+    return f"{KEY_PREFIX}{user_id}"
+
+
+def _live(stamps, now):
+    return {channel: seen for channel, seen in stamps.items() if seen > now - TTL}
+
+
+def touch(user_id, channel_name):
+    """Register or refresh one connection of `user_id`."""
+    now = time.time()
+    conn = _redis()
+    if conn is None:
+        stamps = _live(cache.get(_key(user_id)) or {}, now)
+        stamps[channel_name] = now
+        cache.set(_key(user_id), stamps, timeout=TTL)
+        return
+    try:
+        pipe = conn.pipeline()
+        pipe.zadd(_key(user_id), {channel_name: now})
+        pipe.zremrangebyscore(_key(user_id), "-inf", now - TTL)
+        pipe.expire(_key(user_id), TTL)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Presence update failed for user {user_id}: {e}")
+
+
+def leave(user_id, channel_name):
+    conn = _redis()
+    if conn is None:
+        stamps = cache.get(_key(user_id)) or {}
+        stamps.pop(channel_name, None)
+        cache.set(_key(user_id), stamps, timeout=TTL)
+        return
+    try:
+        conn.zrem(_key(user_id), channel_name)
+    except RedisError as e:
+        logger.warning(f"Presence update failed for user {user_id}: {e}")
+
+
+def online(user_ids):
+    """The subset of `user_ids` with at least one live connection."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return set()
+
+    now = time.time()
+    conn = _redis()
+    if conn is None:
+        stamps = cache.get_many([_key(user_id) for user_id in user_ids])
+        return {user_id for user_id in user_ids if _live(stamps.get(_key(user_id)) or {}, now)}
+    try:
+        pipe = conn.pipeline()
+        for user_id in user_ids:
+            pipe.zcount(_key(user_id), now - TTL, "+inf")
+        counts = pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Presence unavailable, treating everyone as online: {e}")
+        return set(user_ids)
+    return {user_id for user_id, count in zip(user_ids, counts) if count}
+
+
+def defer_digest(user_ids):
+    """Queue offline users for the next chat digest."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    conn = _redis()
+    if conn is None:
+        cache.set(DIGEST_KEY, (cache.get(DIGEST_KEY) or set()) | set(user_ids), timeout=None)
+        return
+    try:
+        conn.sadd(DIGEST_KEY, *user_ids)
+    except RedisError as e:
+        logger.warning(f"Could not queue chat digest for users {user_ids}: {e}")
+
+
+def pop_digest_users():
+    """Take every queued user id off the digest queue."""
+    conn = _redis()
+    if conn is None:
+        user_ids = cache.get(DIGEST_KEY) or set()
+        cache.delete(DIGEST_KEY)
+        return user_ids
+    try:
+        pipe = conn.pipeline()  # MULTI: nothing queued in between is lost
+        pipe.smembers(DIGEST_KEY)
+        pipe.delete(DIGEST_KEY)
+        members, _ = pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Could not read the chat digest queue: {e}")
+        return set()
+    return {int(member) for member in members}
@@ -0,0 +1,226 @@
+"""
+Unlock pricing: configuration table and price engine.
+
+``UnlockPricingTier``, ``CountryGroup`` and ``CountryGroupPoint`` rarely
+change but are read on every unlock and price preview. They are loaded into
+a ``PricingTable`` that lives in the shared cache under the current version
+(a token at ``VERSION_KEY``) and is memoized in each process together with
+that version, so pricing a job costs one small cache read and no queries.
+Saving or deleting any of those rows writes a new version (see
+core.signals), which every process notices on its next read.
+"""
+import math
+from bisect import bisect_right
+from datetime import timedelta
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.utils import timezone
+
+DEFAULT_POINTS = 100  # used when no tier / country group is configured
+
+CACHE_KEY = "pricing:table:v1"
+VERSION_KEY = "pricing:table:version"
+CACHE_TIMEOUT = 60 * 60
+
+_local = {"table": None, "version": None}
+
+
+class PricingTable:
+    def __init__(self, tiers, country_points):
+        # tiers: (min_rate, max_rate or None, points) sorted by min_rate
+        self.tiers = sorted(tiers, key=lambda tier: tier[0])
+        self.min_rates = [tier[0] for tier in self.tiers]
+        self.country_points = country_points
+
+    @classmethod
+    def from_db(cls):
+        from core.models import CountryGroup, CountryGroupPoint, UnlockPricingTier
+
+        tiers = [
+            (float(min_rate), float(max_rate) if max_rate is not None else None, points)
+            for min_rate, max_rate, points in UnlockPricingTier.objects.values_list("min_rate", "max_rate", "points")
+        ]
+        group_points = dict(CountryGroupPoint.objects.values_list("group", "points"))
+        country_points = {
+            name: group_points[group]
+            for name, group in CountryGroup.objects.values_list("name", "group")
+            if group in group_points
+        }
+        return cls(tiers, country_points)
+
+    def base_points_for_hourly(self, hourly_rate):
+        """
+        Points of the tier whose [min_rate, max_rate] contains the rate.
+        Out of range rates clamp to the lowest or highest tier.
+        Tiers are expected not to overlap.
+        """
+        if not self.tiers:
+            return DEFAULT_POINTS
+
+        index = bisect_right(self.min_rates, hourly_rate) - 1
+        if index >= 0:
+            _, max_rate, points = self.tiers[index]
+            if max_rate is None or hourly_rate <= max_rate:
+                return points
+
+        lowest, highest = self.tiers[0], self.tiers[-1]
+        if hourly_rate < lowest[0]:
+            return lowest[2]
+        if highest[1] and hourly_rate > highest[1]:
+            return highest[2]
+        return lowest[2]
+
+    def points_for_country(self, country):
+        return self.country_points.get(country, DEFAULT_POINTS)
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:  # first use, or evicted: any new token just forces a reload
+        cache.add(VERSION_KEY, uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_pricing_table():
+    version = _current_version()
+    if _local["table"] is not None and _local["version"] == version:
+        return _local["table"]
+
+    key = f"{CACHE_KEY}:{version}"
+    table = cache.get(key)
+    if table is None:
+        table = PricingTable.from_db()
+        cache.set(key, table, timeout=CACHE_TIMEOUT)
+
+    _local["table"] = table
+    _local["version"] = version
+    return table
+
+
+def invalidate_pricing_table():
+    cache.set(VERSION_KEY, uuid4().hex, timeout=None)
+
+
+# --- Unlock price engine ---
+#
+# price = base points for the job (hourly tier, or country group without a budget)
+#         * 1.1 per unlock (max 10 unlocks)
+#         * 0.95 per 5 idle hours once a job has waited 36h with no unlocks
+#         floored at 20% of base.
+
+BID_INCREASE = 1.1
+MAX_BID_UNLOCKS = 10
+DECAY_FACTOR = 0.95
+DECAY_GRACE = timedelta(hours=36)
+DECAY_BLOCK = timedelta(hours=5)
+FLOOR_RATIO = 0.20
+
+
+def normalize_hourly_rate(job):
+    """Convert any job budget type (Per Hour, Per Day, Per Week, etc.) to hourly."""
+    total_hours = job.total_hours or 1
+    budget = float(job.budget or 0)
+
+    if job.budget_type == "Per Hour":
+        return budget
+    return budget / total_hours
+
+
+def base_points(job, table=None):
+    table = table or get_pricing_table()
+    if job.budget and job.total_hours:
+        return table.base_points_for_hourly(normalize_hourly_rate(job))
+    return table.points_for_country(job.country)
+
+
+def _decay_step(price):
+    return int(price * DECAY_FACTOR)
+
+
+def decay(price, blocks, floor):
+    """
+    Apply ``price = int(price * 0.95)`` `blocks` times, stopping once the
+    result can no longer beat `floor`. The truncation compounds, so the
+    steps are replayed, but only up to the closed-form number needed to
+    fall from `price` to `floor` (about 34 at a 20% floor) instead of once
+    per block.
+    """
+    if blocks <= 0 or price <= floor:
+        return price
+    # Without truncation price * 0.95**k < floor + 1 for this k (one extra
+    # step of margin for float error), and truncation only lowers it further.
+    needed = math.floor(math.log((floor + 1) / price) / math.log(DECAY_FACTOR)) + 2
+    for _ in range(min(blocks, needed)):
+        price = _decay_step(price)
+        if price <= floor:
+            break
+    return price
+
+
+def dynamic_price(base, unlock_count, created_at, now=None, next_unlock=False):
+    """
+    Price for a job with `unlock_count` unlocks so far; `next_unlock` prices
+    the attempt after that one (used by the preview's future price).
+    """
+    price = base
+
+    # 1. Increment per unlock (10% each, cap at 10)
+    effective_unlocks = min(unlock_count + (1 if next_unlock else 0), MAX_BID_UNLOCKS)
+    if effective_unlocks > 0:
+        price = int(price * (BID_INCREASE ** effective_unlocks))
+
+    # 2. Floor = 20% of base
+    floor = int(base * FLOOR_RATIO)
+
+    # 3. Decay if idle for 36h without unlocks
+    if unlock_count == 0 and created_at:
+        idle_time = (now or timezone.now()) - created_at
+        if idle_time > DECAY_GRACE:
+            price = decay(price, int((idle_time - DECAY_GRACE) // DECAY_BLOCK), floor)
+
+    return max(price, floor)
+
+
+def unlock_points(job, unlock_count, now=None, table=None):
+    """Points a tutor pays to unlock `job` now."""
+    return max(dynamic_price(base_points(job, table), unlock_count, job.created_at, now), 1)
+
+
+def next_unlock_points(job, unlock_count, now=None, table=None):
+    """Points the unlock after the current one will cost."""
+    return dynamic_price(base_points(job, table), unlock_count, job.created_at, now, next_unlock=True)
+
+
+def quote(jobs, tutor=None, now=None):
+    """
+    Unlock prices for many jobs at once: {job_id: {"unlocked", "points_needed",
+    "future_points_needed"}}. Costs one query, for the tutor's own unlocks.
+    """
+    from core.models import JobUnlock
+
+    jobs = list(jobs)
+    if not jobs:
+        return {}
+
+    unlocked_ids = set()
+    if tutor is not None and tutor.is_authenticated:
+        unlocked_ids = set(
+            JobUnlock.objects.filter(tutor=tutor, job_id__in=[job.pk for job in jobs])
+            .values_list("job_id", flat=True)
+        )
+
+    now = now or timezone.now()
+    table = get_pricing_table()
+    quotes = {}
+    for job in jobs:
+        if job.pk in unlocked_ids:
+            quotes[job.pk] = {"unlocked": True, "points_needed": 0, "future_points_needed": 0}
+            continue
+        quotes[job.pk] = {
+            "unlocked": False,
+            "points_needed": unlock_points(job, job.unlock_count, now, table),
+            "future_points_needed": next_unlock_points(job, job.unlock_count, now, table),
+        }
+    return quotes
@@ -0,0 +1,54 @@
+"""
+Push events to a user's open websockets from synchronous code (views,
+signals, tasks). Every ChatConsumer connection joins ``user_<id>``; the
+event's ``type`` picks the consumer handler, e.g. "contact.unlocked" runs
+``ChatConsumer.contact_unlocked``.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    return f"user_{user_id}"
+
+
+def send_to_user(user_id, event):
+    """Best effort: a missing or unreachable channel layer only logs."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(user_group(user_id), event)
+    except Exception as e:
+        logger.warning(f"Realtime push to user {user_id} failed: {e}")
+
+
+def push_notifications(notifications):
+    """
+    Send each notification to its recipient as notification.new, if they are
+    connected. Rows bulk-inserted on a backend that returns no primary keys
+    (MySQL) can't be marked read or matched against the unread list, so
+    their recipients get one notification.refresh to refetch instead.
+    """
+    from core import presence
+    from core.serializers import NotificationSerializer
+
+    notifications = list(notifications)
+    online = presence.online({notification.to_user_id for notification in notifications})
+    refresh = set()
+    for notification in notifications:
+        if notification.to_user_id not in online:
+            continue
+        if notification.pk is None:
+            refresh.add(notification.to_user_id)
+            continue
+        send_to_user(notification.to_user_id, {
+            "type": "notification.new",
+            "notification": dict(NotificationSerializer(notification).data),
+        })
+    for user_id in refresh:
+        send_to_user(user_id, {"type": "notification.refresh"})
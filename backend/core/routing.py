@@ -1,6 +1,11 @@
+from channels.routing import URLRouter
 from django.urls import re_path
 from . import consumers
+from .middleware import JWTAuthMiddleware
 
 websocket_urlpatterns = [
     re_path(r"ws/chat/(?P<user_id>\d+)/$", consumers.ChatConsumer.as_asgi()),
 ]
+
+# Websocket routes behind token auth (?token=<access token>)
+websocket_application = JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
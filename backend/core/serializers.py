@@ -1,9 +1,11 @@
 # backend/core/serializers.py
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db.models import prefetch_related_objects
 from django.contrib.auth.tokens import default_token_generator
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from . import pricing
 from .models import (
     ContactUnlock, User, Gig, Credit, Job, Application, Notification,
     UserSettings, Review, Subject, EscrowPayment, AbuseReport,
@@ -63,6 +65,28 @@ class ContactUnlockSerializer(serializers.ModelSerializer):
         validated_data['unlocker'] = user
         return super().create(validated_data)
 
+class UserListSerializer(serializers.ListSerializer):
+    """
+    Serializes a page of users with a fixed number of queries: the
+    requester's unlocked contacts are read once for the whole page and the
+    many-to-many fields are prefetched together.
+    """
+
+    def to_representation(self, data):
+        users = list(data.all() if hasattr(data, 'all') else data)
+
+        self.child.unlocked_ids = None
+        request = self.context.get("request")
+        if request and request.user.is_authenticated:
+            self.child.unlocked_ids = set(
+                ContactUnlock.objects.filter(unlocker=request.user, target__in=users)
+                .values_list("target_id", flat=True)
+            ) if users else set()
+
+        prefetch_related_objects(users, "groups", "user_permissions")
+        return super().to_representation(users)
+
+
 class UserSerializer(serializers.ModelSerializer):
     unlocked = serializers.SerializerMethodField()  # <-- Add this
 
@@ -70,10 +94,15 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = '__all__'
         extra_fields = ['average_rating', 'review_count']
+        list_serializer_class = UserListSerializer
 
     def get_unlocked(self, obj):
         request = self.context.get("request")
         if request and request.user.is_authenticated:
+            # Filled in by UserListSerializer when serializing a page
+            unlocked_ids = getattr(self, "unlocked_ids", None)
+            if unlocked_ids is not None:
+                return obj.pk in unlocked_ids
             # Check if the current user unlocked this tutor
             return ContactUnlock.objects.filter(unlocker=request.user, target=obj).exists()
         # For anonymous users, just return False
@@ -249,6 +278,18 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 # === JOB SERIALIZER ===
 
+class JobListSerializer(serializers.ListSerializer):
+    """Prices a whole page of jobs for the requesting tutor in one pass."""
+
+    def to_representation(self, data):
+        jobs = list(data.all() if hasattr(data, 'all') else data)
+        self.child.unlock_quotes = None
+        request = self.context.get('request')
+        if request and request.user.is_authenticated and request.user.user_type == 'tutor':
+            self.child.unlock_quotes = pricing.quote(jobs, request.user)
+        return super().to_representation(jobs)
+
+
 class JobSerializer(serializers.ModelSerializer):
     subjects = serializers.ListField(
         child=serializers.CharField(),
@@ -262,21 +303,42 @@ class JobSerializer(serializers.ModelSerializer):
     )
     can_unlock = serializers.SerializerMethodField(read_only=True)
     applicants_count = serializers.SerializerMethodField()
+    unlock_quote = serializers.SerializerMethodField()
     review = ReviewSerializer(read_only=True)
 
     class Meta:
         model = Job
+        list_serializer_class = JobListSerializer
         fields = [
-            'id', 'student', 'student_id', 'description', 'location', 'country',
+            'id', 'student', 'student_id', 'description', 'location', 'latitude', 'longitude', 'country',
             'service_type', 'education_level', 'gender_preference', 'budget',
             'budget_type', 'phone', 'mode', 'distance', 'languages',
             'subjects', 'subject_details', 'total_hours', 'status', 'assigned_tutor',
-            'created_at', 'updated_at', 'can_unlock', 'applicants_count', 'review'
+            'created_at', 'updated_at', 'can_unlock', 'applicants_count', 'unlock_quote', 'review'
         ]
-        read_only_fields = ['id', 'student', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'student', 'latitude', 'longitude', 'created_at', 'updated_at']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything the serializer reads in a fixed number of queries."""
+        return (
+            queryset
+            .select_related('student', 'review')
+            .prefetch_related('subjects')
+        )
 
     def get_applicants_count(self, obj):
-        return obj.unlocks.count()
+        return obj.unlock_count
+
+    def get_unlock_quote(self, obj):
+        """Unlock price for tutors ({"unlocked", "points_needed", "future_points_needed"})."""
+        quotes = getattr(self, 'unlock_quotes', None)
+        if quotes is not None:
+            return quotes.get(obj.pk)
+        request = self.context.get('request')
+        if not request or not request.user.is_authenticated or request.user.user_type != 'tutor':
+            return None
+        return pricing.quote([obj], request.user).get(obj.pk)
 
     def get_can_unlock(self, obj):
         request = self.context.get('request')
@@ -287,11 +349,16 @@ class JobSerializer(serializers.ModelSerializer):
         if user.user_type != "tutor":
             return False
 
-        # Get all subject names from tutor's gigs (string field)
-        gig_subjects = user.gigs.values_list("subject", flat=True)
+        # Get all subject names from tutor's gigs (string field), once per request
+        if 'tutor_gig_subjects' not in self.context:
+            self.context['tutor_gig_subjects'] = set(user.gigs.values_list("subject", flat=True))
+        gig_subjects = self.context['tutor_gig_subjects']
 
         # Check if any of the job's subjects match tutor's gig subjects
-        return obj.subjects.filter(name__in=gig_subjects, is_active=True).exists()
+        return any(
+            subject.is_active and subject.name in gig_subjects
+            for subject in obj.subjects.all()
+        )
 
     def get_subject_details(self, obj):
         return [subject.name for subject in obj.subjects.all()]
@@ -366,6 +433,7 @@ class UserSettingsSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserSettings
         fields = '__all__'
+        read_only_fields = ['last_job_digest_at']
 
 # === ESCROW PAYMENT SERIALIZER ===
 
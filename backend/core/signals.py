@@ -0,0 +1,140 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, leaderboard, realtime
+from .models import ContactUnlock, CountryGroup, CountryGroupPoint, Gig, Job, Notification, UnlockPricingTier, User
+from .pricing import invalidate_pricing_table
+
+
+# --- Geocoding: keep latitude/longitude in step with the `location` text ---
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Job)
+def remember_loaded_location(sender, instance, **kwargs):
+    # Lets track_location_change compare without re-reading the row. A
+    # refresh_from_db() does not update it; at worst that costs one extra
+    # geocode (served from GeocodedLocation) after the next save.
+    if "location" in instance.__dict__:  # not deferred
+        instance._loaded_location = instance.location
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Job)
+def track_location_change(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Drop stale coordinates when the location text changes."""
+    # Saves limited to other fields (last_login, coordinates, ...) cannot move it
+    if raw or (update_fields is not None and "location" not in update_fields):
+        instance._location_changed = False
+        return
+
+    if instance._state.adding:
+        # New rows keep coordinates supplied by the caller; only geocode when missing.
+        instance._location_changed = instance.latitude is None
+    else:
+        if hasattr(instance, "_loaded_location"):
+            old_location = instance._loaded_location
+        else:
+            old_location = sender.objects.filter(pk=instance.pk).values_list("location", flat=True).first()
+        instance._location_changed = (instance.location or None) != (old_location or None)
+        if instance._location_changed:
+            instance.latitude = None
+            instance.longitude = None
+    instance._loaded_location = instance.location
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Job)
+def geocode_location_on_change(sender, instance, **kwargs):
+    if not (getattr(instance, "_location_changed", False) and instance.location):
+        return
+
+    from .tasks import geocode_job_location, geocode_user_location
+
+    task = geocode_job_location if sender is Job else geocode_user_location
+    pk = instance.pk
+    transaction.on_commit(lambda: task.delay(pk))
+
+
+# --- Unlock pricing: drop the cached pricing table when its rows change ---
+
+@receiver(post_save, sender=UnlockPricingTier)
+@receiver(post_delete, sender=UnlockPricingTier)
+@receiver(post_save, sender=CountryGroup)
+@receiver(post_delete, sender=CountryGroup)
+@receiver(post_save, sender=CountryGroupPoint)
+@receiver(post_delete, sender=CountryGroupPoint)
+def invalidate_pricing_on_change(sender, **kwargs):
+    # New version now and again after commit, so a table a concurrent reader
+    # cached from the rows as they were before the transaction is not used.
+    invalidate_pricing_table()
+    transaction.on_commit(invalidate_pricing_table)
+
+
+# --- Tutor leaderboard: re-score a tutor when their gigs change ---
+
+@receiver(post_init, sender=Gig)
+def remember_loaded_subject(sender, instance, **kwargs):
+    # Lets track_gig_subject see a subject change without re-reading the row
+    if "subject" in instance.__dict__:  # not deferred
+        instance._loaded_subject = instance.subject
+
+
+@receiver(pre_save, sender=Gig)
+def track_gig_subject(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._old_subject = None
+    # Saves limited to other fields (used_credits, ...) cannot move it
+    if raw or instance._state.adding or (update_fields is not None and "subject" not in update_fields):
+        return
+    if hasattr(instance, "_loaded_subject"):
+        instance._old_subject = instance._loaded_subject
+    else:
+        instance._old_subject = sender.objects.filter(pk=instance.pk).values_list("subject", flat=True).first()
+    instance._loaded_subject = instance.subject
+
+
+@receiver(post_save, sender=Gig)
+@receiver(post_delete, sender=Gig)
+def refresh_leaderboard_on_gig_change(sender, instance, **kwargs):
+    tutor_id = instance.tutor_id
+    subjects = [instance.subject, getattr(instance, "_old_subject", None)]
+    transaction.on_commit(lambda: leaderboard.refresh_tutor(tutor_id, subjects))
+
+
+# --- Chat: tell both sides' open websockets about a new contact unlock ---
+
+@receiver(post_save, sender=ContactUnlock)
+def push_contact_unlock(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    unlocker_id, target_id = instance.unlocker_id, instance.target_id
+
+    def push():
+        realtime.send_to_user(unlocker_id, {"type": "contact.unlocked", "user_id": target_id})
+        realtime.send_to_user(target_id, {"type": "contact.unlocked", "user_id": unlocker_id})
+
+    transaction.on_commit(push)
+
+
+# --- Notifications: unread badge and push over the recipient's websockets ---
+
+def notifications_created(notifications):
+    """Run on commit for new rows; Notification.objects.bulk_create calls it too."""
+    counters.incr_unread_notifications(n.to_user_id for n in notifications if not n.is_read)
+    realtime.push_notifications(notifications)
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        transaction.on_commit(lambda: notifications_created([instance]))
+    else:
+        # is_read may have changed: recount on the next badge read
+        counters.reset_unread_notifications(instance.to_user_id)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    counters.reset_unread_notifications(instance.to_user_id)
@@ -1,20 +1,72 @@
-from celery import shared_task
-from django.core.mail import EmailMultiAlternatives
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from smtplib import SMTPException, SMTPRecipientsRefused
+
+from celery import chain, shared_task
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import escape
+from itertools import islice
+from geopy.exc import GeocoderServiceError
+from django.db.models import Count, Q, Sum
 from core.models import User
-from core.models import Gig
+from core.models import ConversationParticipant, Gig, Job, Notification, UserSettings
+from core.geocoding import geocode_location
+from core import leaderboard, presence
 
-@shared_task
-def send_job_email(email, html_content, text_content):
+logger = logging.getLogger(__name__)
+
+JOB_EMAIL_SUBJECT = "New Job Matching Your Gig"
+# SMTP servers throttle with 4xx replies; back off 1, 2, 4, ... minutes
+JOB_EMAIL_RETRY_DELAY = 60
+
+def _job_email(email, html_content, text_content, connection=None, subject=JOB_EMAIL_SUBJECT):
     msg = EmailMultiAlternatives(
-        subject="New Job Matching Your Gig",
+        subject=subject,
         body=text_content,
         from_email=settings.DEFAULT_FROM_EMAIL,
         to=[email],
+        connection=connection,
     )
     msg.attach_alternative(html_content, "text/html")
-    msg.send()
+    return msg
+
+
+@shared_task
+def send_job_email(email, html_content, text_content):
+    # Superseded by send_job_email_batch; kept for tasks already queued
+    _job_email(email, html_content, text_content).send()
+
+
+@shared_task(bind=True, max_retries=5)
+def send_job_email_batch(self, recipients):
+    """
+    Send the job email to each of `recipients` (dicts with email,
+    html_content, text_content and optionally subject) over a single SMTP
+    connection. An address the server refuses is logged and skipped. Any
+    other SMTP or network error, typically a rate limit, retries the unsent
+    rest with exponential backoff, so nobody gets the same email twice.
+    Returns how many emails the server accepted.
+    """
+    done = sent = 0
+    try:
+        with get_connection() as connection:
+            for recipient in recipients:
+                try:
+                    sent += connection.send_messages([_job_email(connection=connection, **recipient)])
+                except SMTPRecipientsRefused as e:
+                    logger.warning(f"Job email to {recipient['email']} refused: {e.recipients}")
+                done += 1
+    except (SMTPException, OSError) as e:
+        remaining = recipients[done:]
+        logger.warning(f"Job email batch stopped after {done} of {len(recipients)}: {e}")
+        raise self.retry(
+            exc=e, args=[remaining], countdown=JOB_EMAIL_RETRY_DELAY * 2 ** self.request.retries,
+        )
+    return sent
 
 
 @shared_task
@@ -35,4 +87,225 @@ def reset_monthly_credits_spend_on_gigs():
     Scheduled to run on the 1st day of each month.
     """
     updated_count = Gig.objects.update(used_credits=0)
-    print(f"Reset used_credits for {updated_count} gigs.")
\ No newline at end of file
+    print(f"Reset used_credits for {updated_count} gigs.")
+    # update() skips the gig signals, so rebuild the leaderboard from scratch
+    leaderboard.rebuild()
+
+
+@shared_task(autoretry_for=(GeocoderServiceError,), retry_backoff=True, max_retries=5)
+def geocode_user_location(user_id):
+    """
+    Resolve a user's `location` into latitude/longitude.
+    Only writes if the location has not changed since the task was queued.
+    """
+    location = User.objects.filter(id=user_id).values_list("location", flat=True).first()
+    if not location:
+        return
+    coords = geocode_location(location)
+    latitude, longitude = coords if coords else (None, None)
+    User.objects.filter(id=user_id, location=location).update(latitude=latitude, longitude=longitude)
+
+
+@shared_task(autoretry_for=(GeocoderServiceError,), retry_backoff=True, max_retries=5)
+def geocode_job_location(job_id):
+    """Resolve a job's `location` into latitude/longitude (see geocode_user_location)."""
+    location = Job.objects.filter(id=job_id).values_list("location", flat=True).first()
+    if not location:
+        return
+    coords = geocode_location(location)
+    latitude, longitude = coords if coords else (None, None)
+    Job.objects.filter(id=job_id, location=location).update(latitude=latitude, longitude=longitude)
+
+
+@shared_task(autoretry_for=(GeocoderServiceError,), retry_backoff=True, max_retries=5)
+def geocode_search_location(location):
+    """Warm the geocode store for a location typed into a search box."""
+    geocode_location(location)
+
+
+@shared_task
+def send_chat_digests():
+    """
+    One notification per user who was sent chat messages while offline
+    (queued by core.presence), summarising their unread counters.
+    Users who have reconnected since are skipped.
+    """
+    user_ids = presence.pop_digest_users()
+    user_ids -= presence.online(user_ids)
+    if not user_ids:
+        return
+
+    totals = (
+        ConversationParticipant.objects.filter(user_id__in=user_ids, unread_count__gt=0)
+        .values("user_id")
+        .annotate(messages=Sum("unread_count"), conversations=Count("id"))
+    )
+    Notification.objects.bulk_create([
+        Notification(
+            from_user_id=row["user_id"],
+            to_user_id=row["user_id"],
+            message=(
+                f"You have {row['messages']} unread message{'s' if row['messages'] != 1 else ''} "
+                f"in {row['conversations']} conversation{'s' if row['conversations'] != 1 else ''}."
+            ),
+        )
+        for row in totals
+    ])
+
+
+JOB_NOTIFY_BATCH_SIZE = 500
+
+
+@shared_task
+def notify_tutors_of_new_job(job_id):
+    """
+    Tell tutors whose gigs match a new job's active subjects about it: an
+    in-app notification each, plus the job email for those with an address
+    who have not chosen a digest (see send_job_alert_digests) or turned
+    email notifications off. Tutors who turned job notifications off are
+    skipped. Tutors are streamed and their
+    notifications built and inserted JOB_NOTIFY_BATCH_SIZE at a time. Only
+    the email list grows with the number of matches (one small dict per
+    address, sharing the rendered body), since the staggered schedule in
+    schedule_job_emails needs every address in spend order.
+    """
+    from core.utils import schedule_job_emails
+
+    job = Job.objects.select_related("student").filter(pk=job_id).first()
+    if job is None:
+        return
+    subjects = list(job.subjects.filter(is_active=True).values_list("name", flat=True))
+    if not subjects:
+        return
+
+    tutors = (
+        User.objects.filter(user_type="tutor", gigs__subject__in=subjects)
+        .exclude(usersettings__job_notifications=False)
+        .distinct()
+        .annotate(total_points_spent=Sum("gigs__used_credits", filter=Q(gigs__subject__in=subjects)))
+        .order_by("-total_points_spent")
+        .values_list(
+            "id", "email", "usersettings__job_alert_frequency", "usersettings__email_notifications",
+        )
+        .iterator(chunk_size=JOB_NOTIFY_BATCH_SIZE)
+    )
+
+    message = f"New job posted matching your subjects: {', '.join(subjects)}"
+    verify_url = f"{settings.FRONTEND_SITE_URL}/jobs/{job.id}/"
+    html_content = f"""
+    <html><body style="font-family: Arial, sans-serif; padding: 40px;">
+    <h2>New Job Matching Your Gig!</h2>
+    <p>{escape(job.description)}</p>
+    <p>Location: {escape(job.location)}, Budget: {job.budget} USD</p>
+    <p>Subjects: {escape(', '.join(subjects))}</p>
+    <a href="{verify_url}">View Job & Apply</a>
+    </body></html>
+    """
+    text_content = f"New job posted: {job.description}\nView & apply here: {verify_url}"
+
+    tutor_data = []
+    while batch := list(islice(tutors, JOB_NOTIFY_BATCH_SIZE)):
+        Notification.objects.bulk_create(
+            [Notification(from_user=job.student, to_user_id=tutor_id, message=message) for tutor_id, *_ in batch],
+            batch_size=JOB_NOTIFY_BATCH_SIZE,
+        )
+        tutor_data.extend(
+            {"email": email, "html_content": html_content, "text_content": text_content}
+            for _, email, frequency, email_notifications in batch
+            if email and frequency in (None, "instant") and email_notifications is not False
+        )
+
+    schedule_job_emails(tutor_data)
+
+
+JOB_DIGEST_PERIODS = {"hourly": timedelta(hours=1), "daily": timedelta(days=1)}
+
+
+def _job_digest_email(email, jobs):
+    lines = [f"{job['description']} ({job['location']}, {job['budget']} USD)" for job in jobs]
+    urls = [f"{settings.FRONTEND_SITE_URL}/jobs/{job['id']}/" for job in jobs]
+    items = "".join(
+        f'<li><a href="{url}">{escape(line)}</a><br>Subjects: {escape(", ".join(job["subjects"]))}</li>'
+        for job, line, url in zip(jobs, lines, urls)
+    )
+    count = f"{len(jobs)} new job{'s' if len(jobs) != 1 else ''}"
+    return {
+        "email": email,
+        "subject": f"{count} matching your gigs",
+        "html_content": f"""
+    <html><body style="font-family: Arial, sans-serif; padding: 40px;">
+    <h2>{count} matching your gigs</h2>
+    <ul>{items}</ul>
+    </body></html>
+    """,
+        "text_content": "\n".join(f"- {line}\n  {url}" for line, url in zip(lines, urls)),
+    }
+
+
+@shared_task
+def send_job_alert_digests(frequency):
+    """
+    Email every tutor on the `frequency` ("hourly" or "daily") job alert
+    digest one list of the open jobs posted since their last digest that
+    match their gig subjects. Tutors who turned off email notifications are
+    skipped. Matching is done for all subscribers at once (their gig
+    subjects and the new job subjects are one query each), and the emails
+    are sent JOB_EMAIL_CHUNK_SIZE per task. A subscriber's watermark only
+    moves once their email has been sent (mark_job_digests_sent runs after
+    the batch succeeds), so a failed batch is picked up by the next digest.
+    """
+    now = timezone.now()
+    subscribers = dict(
+        UserSettings.objects.filter(
+            job_alert_frequency=frequency, job_notifications=True, email_notifications=True,
+            user__user_type="tutor", user__is_active=True,
+        ).exclude(user__email="").values_list("user_id", "last_job_digest_at")
+    )
+    if not subscribers:
+        return 0
+    since = {user_id: last or now - JOB_DIGEST_PERIODS[frequency] for user_id, last in subscribers.items()}
+
+    tutors_by_subject = defaultdict(set)
+    for tutor_id, subject in Gig.objects.filter(tutor_id__in=since).values_list("tutor_id", "subject").distinct():
+        tutors_by_subject[subject].add(tutor_id)
+
+    job_subjects = Job.subjects.through.objects.filter(
+        subject__is_active=True,
+        subject__name__in=list(tutors_by_subject),
+        job__status="Open",
+        job__created_at__gt=min(since.values()),
+        job__created_at__lte=now,
+    ).values_list(
+        "job_id", "subject__name", "job__created_at", "job__description", "job__location", "job__budget",
+    ).order_by("job__created_at", "job_id")
+
+    jobs = {}
+    digests = defaultdict(dict)  # tutor id -> {job id: job}, oldest job first
+    for job_id, subject, created_at, description, location, budget in job_subjects:
+        job = jobs.setdefault(job_id, {
+            "id": job_id, "description": description, "location": location, "budget": budget, "subjects": [],
+        })
+        job["subjects"].append(subject)
+        for tutor_id in tutors_by_subject[subject]:
+            if created_at > since[tutor_id]:
+                digests[tutor_id][job_id] = job
+
+    emails = dict(User.objects.filter(id__in=digests).values_list("id", "email"))
+    tutor_ids = list(digests)
+    recipients = [_job_digest_email(emails[tutor_id], list(digests[tutor_id].values())) for tutor_id in tutor_ids]
+    # Nothing new for the others, so their watermark can move now
+    UserSettings.objects.filter(user_id__in=set(since) - set(digests)).update(last_job_digest_at=now)
+
+    chunk_size = settings.JOB_EMAIL_CHUNK_SIZE
+    for i in range(0, len(recipients), chunk_size):
+        chain(
+            send_job_email_batch.s(recipients[i: i + chunk_size]),
+            mark_job_digests_sent.si(tutor_ids[i: i + chunk_size], now.isoformat()),
+        ).delay()
+    return len(recipients)
+
+
+@shared_task
+def mark_job_digests_sent(user_ids, sent_at):
+    """Move the digest watermark of `user_ids` to `sent_at` once their batch is out."""
+    UserSettings.objects.filter(user_id__in=user_ids).update(last_job_digest_at=parse_datetime(sent_at))
@@ -0,0 +1,12 @@
+"""Settings overrides shared by the core test modules (use with override_settings)."""
+
+from core.local_backends import IN_MEMORY_LAYER, LOCMEM_CACHE  # noqa: F401
+
+# Geocoding without network access: only these normalized locations resolve.
+STATIC_GEOCODER = {
+    'GEOCODER_BACKEND': 'core.geocoding.StaticGeocoder',
+    'GEOCODER_STATIC_LOCATIONS': {
+        'dhaka, bangladesh': (23.8103, 90.4125),
+        'chittagong, bangladesh': (22.3569, 91.7832),
+    },
+}
@@ -0,0 +1,388 @@
+from unittest import mock
+
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.chat import inbox, mark_read, message_history, messages_since, persist_message, serialize_messages, unread_summary
+from core.models import ContactUnlock, Conversation, ConversationParticipant, Message, MessageRead
+from core.routing import websocket_application
+from core.utils_encryption import decrypt_text
+
+from .helpers import IN_MEMORY_LAYER, LOCMEM_CACHE
+
+User = get_user_model()
+
+
+def make_conversation(size, unlocked=True):
+    users = [User.objects.create_user(username=f'user{i}', password='pw') for i in range(size)]
+    conversation = Conversation.objects.create()
+    ConversationParticipant.objects.bulk_create(
+        ConversationParticipant(conversation=conversation, user=user) for user in users
+    )
+    if unlocked:
+        ContactUnlock.objects.bulk_create(ContactUnlock(unlocker=user, target=users[0]) for user in users[1:])
+    return users, conversation
+
+
+class PersistMessageTests(TestCase):
+    def test_fixed_queries_regardless_of_participants(self):
+        for size in (2, 8):
+            users, conversation = make_conversation(size)
+            with self.assertNumQueries(7):
+                message, recipient_ids, locked_ids = persist_message(users[0].id, conversation.id, 'hello')
+            self.assertEqual(sorted(recipient_ids), sorted(u.id for u in users[1:]))
+            self.assertEqual(locked_ids, [])
+            self.assertEqual(decrypt_text(message.content), 'hello')
+            self.assertEqual(MessageRead.objects.filter(message=message, status='sent').count(), size - 1)
+            conversation.refresh_from_db()
+            self.assertEqual(conversation.last_message_id, message.id)
+            User.objects.all().delete()
+
+    def test_known_unlocks_skip_the_unlock_lookup(self):
+        users, conversation = make_conversation(3, unlocked=False)
+        with self.assertNumQueries(1):
+            message, _, locked_ids = persist_message(users[0].id, conversation.id, 'hi', unlocked_ids={users[1].id})
+        self.assertIsNone(message)
+        self.assertEqual(locked_ids, [users[2].id])
+
+    def test_locked_recipient_stores_nothing(self):
+        users, conversation = make_conversation(3, unlocked=False)
+        ContactUnlock.objects.create(unlocker=users[0], target=users[1])
+        message, _, locked_ids = persist_message(users[0].id, conversation.id, 'hello')
+        self.assertIsNone(message)
+        self.assertEqual(locked_ids, [users[2].id])
+        self.assertFalse(Message.objects.exists())
+
+    def test_non_participant_stores_nothing(self):
+        _, conversation = make_conversation(2)
+        outsider = User.objects.create_user(username='outsider', password='pw')
+        self.assertEqual(persist_message(outsider.id, conversation.id, 'hello'), (None, [], []))
+        self.assertFalse(Message.objects.exists())
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER, CACHES=LOCMEM_CACHE)
+class ChatConsumerMessageTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()  # presence and identity entries
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(
+            websocket_application, f'/ws/chat/{user.id}/?token={AccessToken.for_user(user)}'
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_message_reaches_sender_and_recipient(self):
+        from asgiref.sync import sync_to_async
+
+        (sender, recipient), conversation = await sync_to_async(make_conversation)(2)
+        sender_ws = await self.connect(sender)
+        recipient_ws = await self.connect(recipient)
+
+        await sender_ws.send_json_to({'type': 'chat.message', 'conversation_id': conversation.id, 'content': 'hi'})
+        echoed = await sender_ws.receive_json_from(timeout=5)
+        delivered = await recipient_ws.receive_json_from(timeout=5)
+
+        self.assertEqual(echoed, delivered)
+        self.assertEqual(echoed['message']['content'], 'hi')
+        self.assertEqual(echoed['message']['status'], 'sent')
+        self.assertEqual(echoed['message']['sender'], {'id': sender.id, 'username': sender.username})
+
+        await sender_ws.disconnect()
+        await recipient_ws.disconnect()
+
+    async def test_offline_recipient_is_queued_for_digest(self):
+        from asgiref.sync import sync_to_async
+        from core import presence
+
+        (sender, recipient), conversation = await sync_to_async(make_conversation)(2)
+        sender_ws = await self.connect(sender)
+
+        with mock.patch('core.consumers.ChatConsumer.chat_message') as pushed:
+            await sender_ws.send_json_to({'type': 'chat.message', 'conversation_id': conversation.id, 'content': 'hi'})
+            self.assertEqual((await sender_ws.receive_json_from(timeout=5))['message']['content'], 'hi')
+        pushed.assert_not_called()
+        self.assertEqual(await sync_to_async(presence.pop_digest_users)(), {recipient.id})
+
+        await sender_ws.send_json_to({'type': 'chat.presence', 'user_ids': [sender.id, recipient.id]})
+        self.assertEqual(await sender_ws.receive_json_from(timeout=5), {'type': 'chat.presence', 'online': [sender.id]})
+
+        await sender_ws.disconnect()
+
+    async def test_dashboard_open_when_message_arrives(self):
+        # Dashboards hold the same socket (and presence) as the Messages page, so
+        # the recipient gets no digest; the live message and the unread summary
+        # are what drive the dashboard's unread messages badge
+        from asgiref.sync import sync_to_async
+        from core import presence
+
+        (sender, recipient), conversation = await sync_to_async(make_conversation)(2)
+        sender_ws = await self.connect(sender)
+        dashboard_ws = await self.connect(recipient)
+
+        await sender_ws.send_json_to({'type': 'chat.message', 'conversation_id': conversation.id, 'content': 'hi'})
+        delivered = await dashboard_ws.receive_json_from(timeout=5)
+        self.assertEqual(delivered['type'], 'chat.message')
+        self.assertEqual(delivered['message']['sender']['id'], sender.id)
+        self.assertEqual(await sync_to_async(presence.pop_digest_users)(), set())
+
+        await dashboard_ws.send_json_to({'type': 'chat.unread_summary'})
+        summary = await dashboard_ws.receive_json_from(timeout=5)
+        self.assertEqual((summary['type'], summary['total']), ('chat.unread_summary', 1))
+
+        await sender_ws.disconnect()
+        await dashboard_ws.disconnect()
+
+    async def test_locked_contact_gets_unlock_prompt(self):
+        from asgiref.sync import sync_to_async
+
+        (sender, recipient), conversation = await sync_to_async(make_conversation)(2, unlocked=False)
+        sender_ws = await self.connect(sender)
+
+        await sender_ws.send_json_to({'type': 'chat.message', 'conversation_id': conversation.id, 'content': 'hi'})
+        response = await sender_ws.receive_json_from(timeout=5)
+        self.assertEqual(response['type'], 'chat.unlock')
+        self.assertEqual(response['tutor_id'], recipient.id)
+        self.assertFalse(await sync_to_async(Message.objects.exists)())
+
+        await sender_ws.disconnect()
+
+    async def test_read_sends_one_status_batch_per_sender(self):
+        from asgiref.sync import sync_to_async
+
+        (sender, reader), conversation = await sync_to_async(make_conversation)(2)
+        ids = [(await sync_to_async(persist_message)(sender.id, conversation.id, str(i)))[0].id for i in range(3)]
+        sender_ws = await self.connect(sender)
+        reader_ws = await self.connect(reader)
+
+        await reader_ws.send_json_to({'type': 'chat.read', 'conversation_id': conversation.id})
+        self.assertEqual((await sender_ws.receive_json_from(timeout=5))['type'], 'chat.read')
+        status = await sender_ws.receive_json_from(timeout=5)
+        self.assertEqual(status, {
+            'type': 'chat.message_status', 'conversation_id': conversation.id, 'message_ids': ids, 'status': 'seen',
+        })
+
+        # Nothing new to read: no status update at all
+        await reader_ws.send_json_to({'type': 'chat.read', 'conversation_id': conversation.id})
+        self.assertEqual((await sender_ws.receive_json_from(timeout=5))['type'], 'chat.read')
+        self.assertTrue(await sender_ws.receive_nothing(timeout=0.5))
+
+        await sender_ws.disconnect()
+        await reader_ws.disconnect()
+
+    async def test_offline_sender_sees_read_status_on_next_load(self):
+        from asgiref.sync import sync_to_async
+
+        (sender, reader), conversation = await sync_to_async(make_conversation)(2)
+        message_id = (await sync_to_async(persist_message)(sender.id, conversation.id, 'hi'))[0].id
+        reader_ws = await self.connect(reader)
+
+        with mock.patch('core.consumers.ChatConsumer.chat_message_status') as pushed:
+            await reader_ws.send_json_to({'type': 'chat.read', 'conversation_id': conversation.id})
+            self.assertTrue(await reader_ws.receive_nothing(timeout=0.5))
+        pushed.assert_not_called()
+
+        sender_ws = await self.connect(sender)
+        await sender_ws.send_json_to({'type': 'chat.get_messages', 'conversation_id': conversation.id})
+        page = await sender_ws.receive_json_from(timeout=5)
+        self.assertEqual([(m['id'], m['status']) for m in page['messages']], [(message_id, 'seen')])
+
+        await sender_ws.disconnect()
+        await reader_ws.disconnect()
+
+    async def test_unlock_during_session_opens_the_chat(self):
+        from asgiref.sync import sync_to_async
+
+        student = await sync_to_async(User.objects.create_user)(username='student', password='pw')
+        tutor = await sync_to_async(User.objects.create_user)(username='tutor', password='pw')
+        tutor_ws = await self.connect(tutor)
+
+        await tutor_ws.send_json_to({'type': 'chat.start_conversation', 'receiver_id': student.id})
+        self.assertEqual((await tutor_ws.receive_json_from(timeout=5))['type'], 'chat.unlock')
+
+        await sync_to_async(ContactUnlock.objects.create)(unlocker=student, target=tutor)
+        self.assertEqual(await tutor_ws.receive_json_from(timeout=5), {'type': 'contact.unlocked', 'user_id': student.id})
+
+        await tutor_ws.send_json_to({'type': 'chat.start_conversation', 'receiver_id': student.id})
+        self.assertEqual((await tutor_ws.receive_json_from(timeout=5))['type'], 'chat.conversation_started')
+
+        await tutor_ws.disconnect()
+
+
+class MessageHistoryTests(TestCase):
+    def setUp(self):
+        (self.alice, self.bob), self.conversation = make_conversation(2)
+        self.messages = [
+            Message.objects.create(conversation=self.conversation, sender=self.alice, content=str(i))
+            for i in range(7)
+        ]
+        # Same timestamp for a run of messages: the id breaks the tie
+        Message.objects.filter(pk__in=[m.pk for m in self.messages[2:5]]).update(timestamp=self.messages[2].timestamp)
+
+    def ids(self, messages):
+        return [m.id for m in messages]
+
+    def test_pages_backwards_without_gaps(self):
+        page, has_more = message_history(self.bob.id, self.conversation.id, limit=3)
+        self.assertEqual(self.ids(page), self.ids(self.messages[4:]))
+        self.assertTrue(has_more)
+
+        page, has_more = message_history(self.bob.id, self.conversation.id, before_id=page[0].id, limit=3)
+        self.assertEqual(self.ids(page), self.ids(self.messages[1:4]))
+        self.assertTrue(has_more)
+
+        with self.assertNumQueries(1):
+            page, has_more = message_history(self.bob.id, self.conversation.id, before_id=page[0].id, limit=3)
+        self.assertEqual(self.ids(page), self.ids(self.messages[:1]))
+        self.assertFalse(has_more)
+
+    def test_messages_since(self):
+        page, has_more = messages_since(self.bob.id, self.conversation.id, after_id=self.messages[3].id, limit=2)
+        self.assertEqual(self.ids(page), self.ids(self.messages[4:6]))
+        self.assertTrue(has_more)
+
+    def test_outsider_sees_nothing(self):
+        outsider = User.objects.create_user(username='outsider', password='pw')
+        self.assertEqual(message_history(outsider.id, self.conversation.id), ([], False))
+
+
+class SerializeMessagesTests(TestCase):
+    def test_batch_statuses_in_two_queries(self):
+        (alice, bob), conversation = make_conversation(2)
+        sent = [persist_message(alice.id, conversation.id, f'a{i}')[0] for i in range(4)]
+        reply = persist_message(bob.id, conversation.id, 'b')[0]
+        MessageRead.objects.filter(message=sent[0], user=bob).update(status='seen')
+        MessageRead.objects.filter(message=sent[1], user=bob).update(status='delivered')
+
+        messages = list(Message.objects.select_related('sender').order_by('id'))
+        with self.assertNumQueries(2):
+            payloads = serialize_messages(messages, alice.id)
+
+        self.assertEqual([p['content'] for p in payloads], ['a0', 'a1', 'a2', 'a3', 'b'])
+        self.assertEqual([p['status'] for p in payloads], ['seen', 'delivered', 'sent', 'sent', None])
+        self.assertEqual([p['is_read'] for p in payloads], [True, False, False, False, False])
+        self.assertEqual(payloads[-1]['sender'], {'id': bob.id, 'username': bob.username})
+        self.assertEqual(payloads[-1]['id'], reply.id)
+
+    def test_known_statuses_need_no_queries(self):
+        (alice, _), conversation = make_conversation(2)
+        message = persist_message(alice.id, conversation.id, 'hi')[0]
+        message.sender = alice
+        with self.assertNumQueries(0):
+            payload = serialize_messages([message], alice.id, statuses={message.id: 'sent'})[0]
+        self.assertEqual((payload['content'], payload['status']), ('hi', 'sent'))
+
+    def test_new_message_needs_no_sender_row_or_decryption(self):
+        (alice, _), conversation = make_conversation(2)
+        message = persist_message(alice.id, conversation.id, 'hi')[0]
+        with self.assertNumQueries(0), mock.patch('core.chat.decrypt_many') as decrypt:
+            payload = serialize_messages(
+                [message], alice.id, statuses={message.id: 'sent'}, contents=['hi'], sender=alice,
+            )[0]
+        decrypt.assert_not_called()
+        self.assertEqual(payload['sender'], {'id': alice.id, 'username': alice.username})
+
+
+class InboxTests(TestCase):
+    def setUp(self):
+        self.me = User.objects.create_user(username='me', password='pw')
+        self.conversations = []
+        for i in range(4):
+            other = User.objects.create_user(username=f'other{i}', password='pw')
+            conversation = Conversation.objects.create()
+            ConversationParticipant.objects.bulk_create([
+                ConversationParticipant(conversation=conversation, user=self.me),
+                ConversationParticipant(conversation=conversation, user=other),
+            ])
+            ContactUnlock.objects.create(unlocker=self.me, target=other)
+            self.conversations.append((conversation, other))
+
+    def test_most_recent_first_in_two_queries(self):
+        (first, first_other), (second, _), (third, third_other), (empty, _) = self.conversations
+        persist_message(first_other.id, first.id, 'old')
+        persist_message(self.me.id, second.id, 'mine')
+        persist_message(third_other.id, third.id, 'new')
+
+        with self.assertNumQueries(2):
+            page, has_more = inbox(self.me.id, limit=3)
+        self.assertTrue(has_more)
+        self.assertEqual([c['id'] for c in page], [third.id, second.id, first.id])
+        self.assertEqual(page[0]['last_message']['content'], 'new')
+        self.assertEqual(page[0]['last_message']['sender_username'], third_other.username)
+        self.assertEqual([c['has_unread'] for c in page], [True, False, True])
+        self.assertEqual(
+            page[0]['participants'],
+            [{'user__id': self.me.id, 'user__username': 'me'},
+             {'user__id': third_other.id, 'user__username': third_other.username}],
+        )
+
+        page, has_more = inbox(self.me.id, offset=3, limit=3)
+        self.assertFalse(has_more)
+        self.assertEqual([c['id'] for c in page], [empty.id])
+        self.assertIsNone(page[0]['last_message']['timestamp'])
+        self.assertFalse(page[0]['has_unread'])
+
+    def test_mark_read_clears_unread(self):
+        conversation, other = self.conversations[0]
+        message = persist_message(other.id, conversation.id, 'hi')[0]
+        self.assertTrue(mark_read(self.me.id, conversation.id))
+        page, _ = inbox(self.me.id, limit=1)
+        self.assertFalse(page[0]['has_unread'])
+        participant = ConversationParticipant.objects.get(conversation=conversation, user=self.me)
+        self.assertEqual(participant.last_read_message_id, message.id)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        (self.alice, self.bob, self.carol), self.conversation = make_conversation(3)
+        ContactUnlock.objects.bulk_create([
+            ContactUnlock(unlocker=self.bob, target=self.carol),
+        ])
+
+    def count(self, user):
+        return ConversationParticipant.objects.get(conversation=self.conversation, user=user).unread_count
+
+    def test_counts_follow_messages_and_reads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                persist_message(self.alice.id, self.conversation.id, str(i))
+            persist_message(self.bob.id, self.conversation.id, 'b')
+        self.assertEqual((self.count(self.alice), self.count(self.bob), self.count(self.carol)), (1, 3, 4))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(mark_read(self.carol.id, self.conversation.id))
+        self.assertEqual(self.count(self.carol), 0)
+        self.assertFalse(MessageRead.objects.filter(user=self.carol).exclude(status='seen').exists())
+        self.assertEqual(unread_summary(self.carol.id), ({}, 0))
+        self.assertEqual(unread_summary(self.bob.id), ({self.conversation.id: 3}, 3))
+
+    def test_cached_total_is_bumped_then_dropped_on_read(self):
+        self.assertEqual(unread_summary(self.bob.id)[1], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            persist_message(self.alice.id, self.conversation.id, 'hi')
+        with self.assertNumQueries(1):  # counts only; the total comes from the cache
+            self.assertEqual(unread_summary(self.bob.id), ({self.conversation.id: 1}, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mark_read(self.bob.id, self.conversation.id)
+        self.assertEqual(unread_summary(self.bob.id), ({}, 0))
+
+    def test_nothing_unread_skips_message_reads(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(mark_read(self.bob.id, self.conversation.id), {})
+        outsider = User.objects.create_user(username='outsider', password='pw')
+        self.assertIsNone(mark_read(outsider.id, self.conversation.id))
+
+    def test_mark_read_returns_only_transitioned_ids_by_sender(self):
+        first = persist_message(self.alice.id, self.conversation.id, 'a1')[0]
+        from_bob = persist_message(self.bob.id, self.conversation.id, 'b')[0]
+        self.assertEqual(mark_read(self.carol.id, self.conversation.id), {self.alice.id: [first.id], self.bob.id: [from_bob.id]})
+
+        second = persist_message(self.alice.id, self.conversation.id, 'a2')[0]
+        self.assertEqual(mark_read(self.carol.id, self.conversation.id), {self.alice.id: [second.id]})
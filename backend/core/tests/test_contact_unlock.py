@@ -0,0 +1,41 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from core.models import ContactUnlock, Credit
+
+User = get_user_model()
+
+URL = '/api/contact-unlock/unlock/'
+
+
+class UnlockContactTests(APITestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='pw', user_type='student')
+        self.tutor = User.objects.create_user(username='tutor', password='pw', user_type='tutor')
+        self.client.force_authenticate(self.student)
+
+    def test_unlock_charges_once_and_notifies_both_sides(self):
+        Credit.objects.create(user=self.student, balance=5)
+        with mock.patch('core.realtime.send_to_user') as send, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(URL, {'target_id': self.tutor.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Credit.objects.get(user=self.student).balance, 4)
+        send.assert_has_calls([
+            mock.call(self.student.id, {'type': 'contact.unlocked', 'user_id': self.tutor.id}),
+            mock.call(self.tutor.id, {'type': 'contact.unlocked', 'user_id': self.student.id}),
+        ])
+
+        response = self.client.post(URL, {'target_id': self.tutor.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Credit.objects.get(user=self.student).balance, 4)
+
+    def test_insufficient_points_never_creates_the_unlock(self):
+        Credit.objects.create(user=self.student, balance=0)
+        with mock.patch('core.realtime.send_to_user') as send, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(URL, {'target_id': self.tutor.id})
+        self.assertEqual(response.status_code, status.HTTP_402_PAYMENT_REQUIRED)
+        self.assertFalse(ContactUnlock.objects.exists())
+        send.assert_not_called()
@@ -0,0 +1,38 @@
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+
+from core.utils_encryption import (
+    PARALLEL_THRESHOLD, decrypt_many, decrypt_many_async, decrypt_text, encrypt_many, encrypt_text, get_cipher_suite,
+)
+
+OLD_KEY = 'old-secret-key-' * 3
+NEW_KEY = 'new-secret-key-' * 3
+
+
+class EncryptionTests(SimpleTestCase):
+    def test_cipher_is_built_once_per_key(self):
+        cipher = get_cipher_suite()
+        self.assertIs(get_cipher_suite(), cipher)
+        with override_settings(SECRET_KEY=NEW_KEY):
+            self.assertIsNot(get_cipher_suite(), cipher)
+
+    def test_bulk_round_trip_keeps_fallbacks(self):
+        texts = ['hello', '', None, 'wörld']
+        encrypted = encrypt_many(texts)
+        self.assertEqual(encrypted[1:3], ['', None])
+        self.assertEqual(decrypt_many(encrypted), texts)
+        self.assertEqual(decrypt_many(['legacy plain text']), ['legacy plain text'])
+        self.assertEqual(decrypt_text(encrypt_text('hi')), 'hi')
+
+    def test_rotated_key_still_decrypts(self):
+        with override_settings(SECRET_KEY=OLD_KEY):
+            token = encrypt_text('before rotation')
+        with override_settings(SECRET_KEY=NEW_KEY, SECRET_KEY_FALLBACKS=[OLD_KEY]):
+            self.assertEqual(decrypt_text(token), 'before rotation')
+        with override_settings(SECRET_KEY=NEW_KEY, SECRET_KEY_FALLBACKS=[]):
+            self.assertEqual(decrypt_text(token), token)
+
+    def test_async_matches_sync_for_large_lists(self):
+        texts = [f'message {i}' for i in range(PARALLEL_THRESHOLD * 3 + 1)]
+        self.assertEqual(async_to_sync(decrypt_many_async)(encrypt_many(texts)), texts)
+
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from core.geocoding import NOT_STORED, geocode_location, lookup_coordinates, normalize_location
+from core.models import GeocodedLocation
+from core.tasks import geocode_user_location
+
+from .helpers import LOCMEM_CACHE, STATIC_GEOCODER
+
+User = get_user_model()
+
+
+@override_settings(**STATIC_GEOCODER)
+class GeocodeStoreTests(TestCase):
+    def test_normalize_location(self):
+        self.assertEqual(normalize_location('  Dhaka ,  Bangladesh '), 'dhaka, bangladesh')
+        self.assertEqual(normalize_location(''), '')
+        self.assertEqual(normalize_location(None), '')
+
+    def test_geocode_location_stores_hits_and_misses(self):
+        self.assertEqual(geocode_location('Dhaka, Bangladesh'), (23.8103, 90.4125))
+        self.assertIsNone(geocode_location('Atlantis'))
+        self.assertEqual(GeocodedLocation.objects.count(), 2)
+        self.assertEqual(lookup_coordinates('dhaka,bangladesh'), (23.8103, 90.4125))
+        self.assertIsNone(lookup_coordinates('Atlantis', default=NOT_STORED))
+        self.assertIs(lookup_coordinates('Sylhet', default=NOT_STORED), NOT_STORED)
+
+    def test_location_change_queues_geocoding_and_clears_coordinates(self):
+        user = User.objects.create_user(username='tutor', password='pw', user_type='tutor')
+        User.objects.filter(pk=user.pk).update(latitude=1.0, longitude=1.0)
+        user.refresh_from_db()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.location = 'Dhaka, Bangladesh'
+            user.save()
+        self.assertEqual(len(callbacks), 1)
+        user.refresh_from_db()
+        self.assertIsNone(user.latitude)
+
+        geocode_user_location(user.pk)
+        user.refresh_from_db()
+        self.assertEqual((user.latitude, user.longitude), (23.8103, 90.4125))
+
+    def test_unrelated_save_does_not_queue_geocoding(self):
+        user = User.objects.create_user(username='tutor', password='pw', user_type='tutor', location='Dhaka, Bangladesh')
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.bio = 'Maths tutor'
+            user.save()
+        self.assertEqual(callbacks, [])
+
+    def test_saves_do_not_reread_the_location(self):
+        User.objects.create_user(username='tutor', password='pw', user_type='tutor', location='Dhaka, Bangladesh')
+        user = User.objects.get(username='tutor')
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            user.bio = 'Maths tutor'
+            user.save()
+        with self.captureOnCommitCallbacks() as callbacks, self.assertNumQueries(1):
+            user.location = 'Chittagong, Bangladesh'
+            user.save()
+        self.assertEqual(len(callbacks), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, **STATIC_GEOCODER)
+class TutorSearchGeocodingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.near = User.objects.create_user(username='near', password='pw', user_type='tutor', location='Dhaka, Bangladesh')
+        self.far = User.objects.create_user(username='far', password='pw', user_type='tutor', location='Chittagong, Bangladesh')
+        geocode_user_location(self.near.pk)
+        geocode_user_location(self.far.pk)
+
+    @patch('core.geocoding.get_geocoder')
+    def test_search_reads_stored_coordinates(self, mock_get_geocoder):
+        response = self.client.post('/api/tutors/search/', {'location': 'Dhaka, Bangladesh'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t['username'] for t in response.data['results']], ['near', 'far'])
+        mock_get_geocoder.assert_not_called()
+
+    @patch('core.geocoding.get_geocoder')
+    def test_unknown_search_location_is_geocoded_in_background(self, mock_get_geocoder):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/tutors/search/', {'location': 'Sylhet'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        mock_get_geocoder.assert_not_called()
+
+    def test_repeated_unknown_location_is_queued_once(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for location in ('Sylhet', ' sylhet ', 'SYLHET'):
+                self.client.post('/api/tutors/search/', {'location': location}, format='json')
+        self.assertEqual(len(callbacks), 1)
+
+    def test_stored_failed_lookup_is_not_queued_again(self):
+        geocode_location('Atlantis')
+        cache.clear()
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/tutors/search/', {'location': 'Atlantis'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(callbacks, [])
+
+    def test_search_pages_follow_distance_order(self):
+        response = self.client.post('/api/tutors/search/?page=2&page_size=1', {'location': 'Dhaka, Bangladesh'}, format='json')
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([t['username'] for t in response.data['results']], ['far'])
+
@@ -0,0 +1,79 @@
+from smtplib import SMTPRecipientsRefused, SMTPResponseException
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import SimpleTestCase, override_settings
+
+from core.tasks import JOB_EMAIL_RETRY_DELAY, send_job_email_batch
+from core.utils import schedule_job_emails
+
+
+def recipients(n):
+    return [
+        {'email': f'tutor{i}@example.com', 'html_content': '<p>job</p>', 'text_content': 'job'}
+        for i in range(n)
+    ]
+
+
+class ThrottledBackend(EmailBackend):
+    """Accepts two messages, then answers like a rate-limiting SMTP server."""
+
+    def send_messages(self, messages):
+        if len(mail.outbox) >= 2:
+            raise SMTPResponseException(421, b'Too many messages, slow down')
+        return super().send_messages(messages)
+
+
+class RefusingBackend(EmailBackend):
+    def send_messages(self, messages):
+        if messages[0].to == ['tutor1@example.com']:
+            raise SMTPRecipientsRefused({'tutor1@example.com': (550, b'No such user')})
+        return super().send_messages(messages)
+
+
+class SendJobEmailBatchTests(SimpleTestCase):
+    def test_whole_batch_uses_one_connection(self):
+        with mock.patch('core.tasks.get_connection', wraps=get_connection) as connect:
+            self.assertEqual(send_job_email_batch(recipients(50)), 50)
+        connect.assert_called_once()
+        self.assertEqual(len(mail.outbox), 50)
+        self.assertEqual(mail.outbox[7].to, ['tutor7@example.com'])
+        self.assertEqual(mail.outbox[7].alternatives, [('<p>job</p>', 'text/html')])
+
+    @override_settings(EMAIL_BACKEND='core.tests.test_job_email.ThrottledBackend')
+    def test_rate_limit_retries_only_unsent_recipients(self):
+        batch = recipients(5)
+        with mock.patch.object(send_job_email_batch, 'retry', side_effect=RuntimeError) as retry:
+            with self.assertRaises(RuntimeError), self.assertLogs('core.tasks', 'WARNING'):
+                send_job_email_batch(batch)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(retry.call_args.kwargs['args'], [batch[2:]])
+        self.assertEqual(retry.call_args.kwargs['countdown'], JOB_EMAIL_RETRY_DELAY)
+
+    @override_settings(EMAIL_BACKEND='core.tests.test_job_email.RefusingBackend')
+    def test_refused_address_is_skipped(self):
+        with self.assertLogs('core.tasks', 'WARNING'):
+            self.assertEqual(send_job_email_batch(recipients(3)), 2)
+        self.assertEqual([m.to for m in mail.outbox], [['tutor0@example.com'], ['tutor2@example.com']])
+
+
+@override_settings(JOB_EMAIL_BATCHES=[1, 2], JOB_EMAIL_DELAY=600, JOB_EMAIL_CHUNK_SIZE=10)
+class ScheduleJobEmailsTests(SimpleTestCase):
+    @mock.patch('core.utils.send_job_email_batch.apply_async')
+    def test_every_recipient_is_scheduled(self, apply_async):
+        data = recipients(25)
+        schedule_job_emails(data)
+
+        releases = [(len(call.kwargs['args'][0]), call.kwargs['countdown']) for call in apply_async.call_args_list]
+        self.assertEqual(releases, [(1, 0), (2, 600), (10, 1200), (10, 1200), (2, 1200)])
+        scheduled = [r for call in apply_async.call_args_list for r in call.kwargs['args'][0]]
+        self.assertEqual(scheduled, data)
+
+    @mock.patch('core.utils.send_job_email_batch.apply_async')
+    def test_small_list_stops_early(self, apply_async):
+        schedule_job_emails(recipients(2))
+        self.assertEqual([call.kwargs['countdown'] for call in apply_async.call_args_list], [0, 600])
+        schedule_job_emails([])
+        self.assertEqual(apply_async.call_count, 2)
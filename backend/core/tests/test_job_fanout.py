@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from core import tasks
+from core.models import Gig, Job, Notification, Subject, UserSettings
+from core.tasks import notify_tutors_of_new_job
+
+from .helpers import LOCMEM_CACHE
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class NewJobFanOutTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='pw', user_type='student')
+        self.job = Job.objects.create(student=self.student, description='Algebra help')
+        self.job.subjects.set([Subject.objects.create(name='Mathematics', is_active=True)])
+        self.tutors = []
+        for i, spent in enumerate([1, 9, 5]):
+            tutor = User.objects.create_user(
+                username=f'tutor{i}', password='pw', user_type='tutor', email=f'tutor{i}@example.com',
+            )
+            Gig.objects.create(tutor=tutor, subject='Mathematics', used_credits=spent)
+            self.tutors.append(tutor)
+
+        muted = User.objects.create_user(username='muted', password='pw', user_type='tutor', email='m@example.com')
+        Gig.objects.create(tutor=muted, subject='Mathematics', used_credits=100)
+        UserSettings.objects.create(user=muted, job_notifications=False)
+        other = User.objects.create_user(username='other', password='pw', user_type='tutor')
+        Gig.objects.create(tutor=other, subject='Chemistry')
+
+    @mock.patch('core.utils.schedule_job_emails')
+    def test_notifies_matching_tutors_in_batches(self, schedule_job_emails):
+        with mock.patch.object(tasks, 'JOB_NOTIFY_BATCH_SIZE', 2):
+            notify_tutors_of_new_job(self.job.id)
+
+        notified = Notification.objects.filter(from_user=self.student).values_list('to_user_id', flat=True)
+        self.assertCountEqual(notified, [tutor.id for tutor in self.tutors])
+
+        emails = [entry['email'] for entry in schedule_job_emails.call_args.args[0]]
+        self.assertEqual(emails, ['tutor1@example.com', 'tutor2@example.com', 'tutor0@example.com'])
+
+    @mock.patch('core.utils.schedule_job_emails')
+    def test_missing_job_is_ignored(self, schedule_job_emails):
+        notify_tutors_of_new_job(self.job.id + 1)
+        self.assertFalse(Notification.objects.exists())
+        schedule_job_emails.assert_not_called()
+
+    @mock.patch('core.utils.schedule_job_emails')
+    def test_digest_subscribers_get_no_instant_email(self, schedule_job_emails):
+        UserSettings.objects.create(user=self.tutors[1], job_alert_frequency='hourly')
+        notify_tutors_of_new_job(self.job.id)
+
+        self.assertTrue(Notification.objects.filter(to_user=self.tutors[1]).exists())
+        emails = [entry['email'] for entry in schedule_job_emails.call_args.args[0]]
+        self.assertEqual(emails, ['tutor2@example.com', 'tutor0@example.com'])
+
+    @mock.patch('core.utils.schedule_job_emails')
+    def test_email_opt_out_keeps_the_in_app_notification(self, schedule_job_emails):
+        UserSettings.objects.create(user=self.tutors[1], email_notifications=False)
+        notify_tutors_of_new_job(self.job.id)
+
+        self.assertTrue(Notification.objects.filter(to_user=self.tutors[1]).exists())
+        emails = [entry['email'] for entry in schedule_job_emails.call_args.args[0]]
+        self.assertEqual(emails, ['tutor2@example.com', 'tutor0@example.com'])
+
+    @mock.patch('core.utils.schedule_job_emails')
+    def test_job_text_is_escaped_in_the_email(self, schedule_job_emails):
+        Job.objects.filter(pk=self.job.pk).update(description='<script>x</script>', location='A & B')
+        notify_tutors_of_new_job(self.job.id)
+
+        html = schedule_job_emails.call_args.args[0][0]['html_content']
+        self.assertIn('&lt;script&gt;x&lt;/script&gt;', html)
+        self.assertIn('Location: A &amp; B', html)
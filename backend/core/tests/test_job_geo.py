@@ -0,0 +1,100 @@
+import math
+import random
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from core import geo
+from core.geo import bounding_box_q, haversine, haversine_many, nearest
+from core.models import Job
+from core.tasks import geocode_job_location
+
+from .helpers import STATIC_GEOCODER
+
+User = get_user_model()
+
+
+class BoundingBoxTests(TestCase):
+    def test_antimeridian_box_wraps(self):
+        q = bounding_box_q(0, 179.9, 50)
+        self.assertEqual(q.connector, 'AND')
+        self.assertIn('OR', str(q))
+
+    def test_polar_box_covers_all_longitudes(self):
+        self.assertNotIn('longitude', str(bounding_box_q(89.9, 0, 50)))
+
+
+class DistanceEngineTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.lats = [rng.uniform(-60, 60) for _ in range(200)] + [None]
+        self.lngs = [rng.uniform(-180, 180) for _ in range(200)] + [10.0]
+        self.priority = [rng.choice([0, -5, -10]) for _ in range(201)]
+
+    def expected(self):
+        distances = [
+            haversine(90.4, 23.8, lng, lat) if lat is not None else math.inf
+            for lat, lng in zip(self.lats, self.lngs)
+        ]
+        order = sorted(range(len(distances)), key=lambda i: (self.priority[i], distances[i], i))
+        return distances, order
+
+    def check_engine(self):
+        expected_distances, expected_order = self.expected()
+        distances = haversine_many(23.8, 90.4, self.lats, self.lngs)
+        for got, want in zip(distances, expected_distances):
+            self.assertAlmostEqual(got, want, places=6)
+
+        self.assertEqual(nearest(distances, k=15, priority=self.priority), expected_order[:15])
+        self.assertEqual(nearest(distances, priority=self.priority), expected_order)
+        self.assertEqual(nearest(distances, k=0), [])
+        self.assertEqual(nearest(distances, k=3), sorted(range(201), key=lambda i: (expected_distances[i], i))[:3])
+
+    @skipIf(geo.np is None, 'NumPy not installed')
+    def test_numpy_engine(self):
+        self.check_engine()
+
+    def test_pure_python_engine(self):
+        with patch.object(geo, 'np', None):
+            self.check_engine()
+
+
+@override_settings(**STATIC_GEOCODER)
+class JobGeocodingTests(TestCase):
+    def test_location_change_queues_geocoding(self):
+        student = User.objects.create_user(username='student', password='pw', user_type='student')
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = Job.objects.create(student=student, location='Dhaka, Bangladesh')
+        self.assertEqual(len(callbacks), 1)
+
+        geocode_job_location(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.latitude, job.longitude), (23.8103, 90.4125))
+
+
+class JobRadiusFilterTests(APITestCase):
+    def setUp(self):
+        student = User.objects.create_user(username='student', password='pw', user_type='student')
+        self.dhaka = Job.objects.create(student=student, location='Dhaka', latitude=23.8103, longitude=90.4125)
+        self.gazipur = Job.objects.create(student=student, location='Gazipur', latitude=23.9999, longitude=90.4203)
+        self.chittagong = Job.objects.create(student=student, location='Chittagong', latitude=22.3569, longitude=91.7832)
+        Job.objects.create(student=student, location='Unknown')
+
+    def test_radius_filter_orders_by_distance(self):
+        response = self.client.get('/api/jobs/', {'lat': 23.81, 'lng': 90.41, 'radius_km': 30})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([j['id'] for j in response.data['results']], [self.dhaka.id, self.gazipur.id])
+
+        response = self.client.get('/api/jobs/', {'lat': 23.81, 'lng': 90.41, 'radius_km': 300})
+        self.assertEqual(response.data['count'], 3)
+
+    def test_radius_filter_combines_with_other_filters(self):
+        response = self.client.get('/api/jobs/', {'lat': 23.81, 'lng': 90.41, 'radius_km': 30, 'location': 'Gazi'})
+        self.assertEqual([j['id'] for j in response.data['results']], [self.gazipur.id])
+
+    def test_invalid_coordinates_return_400(self):
+        response = self.client.get('/api/jobs/', {'lat': 'north', 'lng': 90.41})
+        self.assertEqual(response.status_code, 400)
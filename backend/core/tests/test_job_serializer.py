@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from core.models import Gig, Job, JobUnlock, Subject
+
+from .helpers import LOCMEM_CACHE
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class JobListQueryTests(APITestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(username='tutor', password='pw', user_type='tutor')
+        Gig.objects.create(tutor=self.tutor, title='Maths', subject='Mathematics')
+        student = User.objects.create_user(username='student', password='pw', user_type='student')
+        maths = Subject.objects.create(name='Mathematics', is_active=True)
+        physics = Subject.objects.create(name='Physics', is_active=True)
+        other = User.objects.create_user(username='other', password='pw', user_type='tutor')
+
+        for i in range(12):
+            job = Job.objects.create(student=student, location='Dhaka')
+            job.subjects.set([maths] if i % 2 else [physics])
+            if i % 3 == 0:
+                JobUnlock.objects.create(job=job, tutor=other, points_spent=10)
+                Job.objects.filter(pk=job.pk).update(unlock_count=1)
+        self.client.force_authenticate(self.tutor)
+
+    def get(self, url, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_job_list_queries_do_not_grow_with_page_size(self):
+        _, small_queries = self.get('/api/jobs/', 2)
+        response, large_queries = self.get('/api/jobs/', 12)
+        self.assertEqual(small_queries, large_queries)
+
+        jobs = {job['id']: job for job in response.data['results']}
+        for job in Job.objects.prefetch_related('subjects', 'unlocks'):
+            self.assertEqual(jobs[job.id]['applicants_count'], job.unlocks.count())
+            self.assertEqual(jobs[job.id]['can_unlock'], job.subjects.filter(name='Mathematics').exists())
+
+    def test_matched_jobs_queries_do_not_grow_with_page_size(self):
+        _, small_queries = self.get('/api/jobs/matched_jobs/', 2)
+        response, large_queries = self.get('/api/jobs/matched_jobs/', 12)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(response.data['count'], 6)
+        self.assertTrue(all(job['can_unlock'] for job in response.data['results']))
+
+    def test_inactive_subject_cannot_be_unlocked(self):
+        Subject.objects.filter(name='Mathematics').update(is_active=False)
+        response, _ = self.get('/api/jobs/', 12)
+        self.assertFalse(any(job['can_unlock'] for job in response.data['results']))
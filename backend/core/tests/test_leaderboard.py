@@ -0,0 +1,133 @@
+from unittest import mock, skipIf
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from redis.exceptions import RedisError
+from rest_framework.test import APITestCase
+
+from core import leaderboard
+from core.models import Credit, Gig, Job, Subject
+from core.tasks import reset_monthly_credits_spend_on_gigs
+
+try:
+    import fakeredis
+except ImportError:  # only needed for the Redis-backed tests
+    fakeredis = None
+
+from .helpers import LOCMEM_CACHE
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TopTutorsTests(TestCase):
+    def test_ranks_by_credits_spent_on_matching_gigs(self):
+        tutors = [User.objects.create_user(username=f'tutor{i}', password='pw', user_type='tutor') for i in range(3)]
+        Gig.objects.create(tutor=tutors[0], subject='Mathematics', used_credits=5)
+        Gig.objects.create(tutor=tutors[1], subject='Mathematics', used_credits=3)
+        Gig.objects.create(tutor=tutors[1], subject='Physics', used_credits=4)
+        Gig.objects.create(tutor=tutors[2], subject='Chemistry', used_credits=50)
+
+        self.assertEqual(leaderboard.top_tutors(['Mathematics']), [tutors[0].id, tutors[1].id])
+        self.assertEqual(leaderboard.top_tutors(['Mathematics', 'Physics']), [tutors[1].id, tutors[0].id])
+        self.assertEqual(leaderboard.top_tutors(['Mathematics', 'Physics'], limit=1), [tutors[1].id])
+        self.assertEqual(leaderboard.top_tutors([]), [])
+
+
+@skipIf(fakeredis is None, 'fakeredis not installed')
+@override_settings(CACHES=LOCMEM_CACHE)
+class RedisTopTutorsTests(TestCase):
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch('core.leaderboard._redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tutors = [User.objects.create_user(username=f'tutor{i}', password='pw', user_type='tutor') for i in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            Gig.objects.create(tutor=self.tutors[0], subject='Mathematics', used_credits=5)
+            Gig.objects.create(tutor=self.tutors[1], subject='Mathematics', used_credits=3)
+            Gig.objects.create(tutor=self.tutors[1], subject='Physics', used_credits=4)
+            Gig.objects.create(tutor=self.tutors[2], subject='Physics', used_credits=6)
+
+    def scores(self, subject):
+        return {int(member): score for member, score in self.redis.zrange(leaderboard._key(subject), 0, -1, withscores=True)}
+
+    def test_first_call_builds_the_sets(self):
+        self.redis.flushall()
+        self.assertEqual(leaderboard.top_tutors(['Mathematics']), [self.tutors[0].id, self.tutors[1].id])
+        self.assertTrue(self.redis.exists(leaderboard.BUILT_KEY))
+        self.assertFalse(self.redis.exists(leaderboard.BUILD_LOCK_KEY))
+        self.assertEqual(self.scores('Physics'), {self.tutors[1].id: 4, self.tutors[2].id: 6})
+
+    def test_multi_subject_union_and_gig_updates(self):
+        leaderboard.rebuild()
+        self.assertEqual(
+            leaderboard.top_tutors(['Mathematics', 'Physics']), [self.tutors[1].id, self.tutors[2].id, self.tutors[0].id],
+        )
+        self.assertEqual(leaderboard.top_tutors(['Physics', 'Mathematics'], limit=1), [self.tutors[1].id])
+        self.assertEqual(self.redis.keys('leaderboard:tmp:*'), [])
+
+        gig = Gig.objects.get(tutor=self.tutors[0])
+        gig.used_credits = 20
+        with self.captureOnCommitCallbacks(execute=True):
+            gig.save()
+        self.assertEqual(leaderboard.top_tutors(['Mathematics', 'Physics'], limit=1), [self.tutors[0].id])
+
+    def test_subject_change_moves_the_tutor_without_rereading_the_gig(self):
+        leaderboard.rebuild()
+        gig = Gig.objects.get(tutor=self.tutors[0])
+        with self.assertNumQueries(1):
+            gig.used_credits = 7
+            gig.save(update_fields=['used_credits'])
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            gig.subject = 'Physics'
+            gig.save()
+        self.assertEqual(self.scores('Mathematics'), {self.tutors[1].id: 3})
+        self.assertEqual(self.scores('Physics')[self.tutors[0].id], 7)
+
+    def test_monthly_reset_rebuilds_from_scratch(self):
+        leaderboard.rebuild()
+        self.redis.zadd(leaderboard._key('Retired subject'), {self.tutors[2].id: 9})
+        reset_monthly_credits_spend_on_gigs()
+        self.assertFalse(self.redis.exists(leaderboard._key('Retired subject')))
+        self.assertEqual(self.scores('Mathematics'), {self.tutors[0].id: 0, self.tutors[1].id: 0})
+
+    def test_concurrent_callers_rank_from_database_during_rebuild(self):
+        self.redis.delete(leaderboard.BUILT_KEY)
+        self.redis.set(leaderboard.BUILD_LOCK_KEY, 1)
+        with mock.patch('core.leaderboard.rebuild') as rebuild:
+            self.assertEqual(leaderboard.top_tutors(['Physics']), [self.tutors[2].id, self.tutors[1].id])
+        rebuild.assert_not_called()
+
+    def test_failed_rebuild_is_logged_and_retried_later(self):
+        leaderboard.rebuild()
+        with mock.patch.object(self.redis, 'pipeline', side_effect=RedisError('down')), \
+                self.assertLogs('core.leaderboard', 'WARNING'):
+            reset_monthly_credits_spend_on_gigs()
+        self.assertFalse(self.redis.exists(leaderboard.BUILT_KEY))
+        self.assertCountEqual(leaderboard.top_tutors(['Mathematics']), [self.tutors[0].id, self.tutors[1].id])
+        self.assertTrue(self.redis.exists(leaderboard.BUILT_KEY))
+        self.assertEqual(self.scores('Mathematics'), {self.tutors[0].id: 0, self.tutors[1].id: 0})
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FirstHourUnlockTests(APITestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(username='tutor', password='pw', user_type='tutor')
+        Credit.objects.create(user=self.tutor, balance=1000)
+        Gig.objects.create(tutor=self.tutor, subject='Mathematics')
+        student = User.objects.create_user(username='student', password='pw', user_type='student')
+        self.job = Job.objects.create(student=student)
+        self.job.subjects.set([Subject.objects.create(name='Mathematics', is_active=True)])
+        self.client.force_authenticate(self.tutor)
+
+    def test_tutor_outside_stored_shortlist_is_rejected(self):
+        Job.objects.filter(pk=self.job.pk).update(top_tutor_ids=[])
+        response = self.client.post(f'/api/jobs/{self.job.pk}/unlock/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_tutor_in_stored_shortlist_can_unlock(self):
+        Job.objects.filter(pk=self.job.pk).update(top_tutor_ids=[self.tutor.id])
+        response = self.client.post(f'/api/jobs/{self.job.pk}/unlock/')
+        self.assertEqual(response.status_code, 201)
@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from core.models import Notification
+
+from .helpers import LOCMEM_CACHE
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class UnreadNotificationCountTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user', password='pw')
+        self.other = User.objects.create_user(username='other', password='pw')
+        self.client.force_authenticate(self.user)
+
+    def notify(self, count, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.bulk_create(
+                Notification(from_user=self.other, to_user=user or self.user, message=str(i)) for i in range(count)
+            )
+
+    def unread_count(self):
+        return self.client.get('/api/notifications/unread-count/').data['unread_count']
+
+    def test_counter_follows_creates_and_mark_read(self):
+        self.notify(2)
+        self.assertEqual(self.unread_count(), 2)  # rebuilt from the database
+
+        self.notify(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(from_user=self.other, to_user=self.user, message='single')
+        self.notify(4, user=self.other)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread_count(), 6)
+
+        self.client.post('/api/notifications/mark-read/')
+        self.assertEqual(self.unread_count(), 0)
+
+    def test_deleting_an_unread_notification_recounts(self):
+        self.notify(2)
+        self.assertEqual(self.unread_count(), 2)
+        Notification.objects.filter(to_user=self.user).first().delete()
+        self.assertEqual(self.unread_count(), 1)
+
+    def test_unread_is_cursor_paginated(self):
+        self.notify(25)
+        first = self.client.get('/api/notifications/unread/').data
+        self.assertEqual(len(first['results']), 20)
+        second = self.client.get(first['next']).data
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        ids = [n['id'] for n in first['results'] + second['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import counters, presence
+from core.models import Notification
+from core.routing import websocket_application
+
+from .helpers import IN_MEMORY_LAYER, LOCMEM_CACHE
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class NotificationPushTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sender = User.objects.create_user(username='sender', password='pw')
+        self.online = User.objects.create_user(username='online', password='pw')
+        self.offline = User.objects.create_user(username='offline', password='pw')
+        presence.touch(self.online.id, 'tab')
+
+    def pushed(self, send):
+        return [(user_id, event['notification']['message']) for (user_id, event), _ in send.call_args_list]
+
+    def test_create_pushes_to_connected_recipient(self):
+        with mock.patch('core.realtime.send_to_user') as send, self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(from_user=self.sender, to_user=self.online, message='hello')
+            Notification.objects.create(from_user=self.sender, to_user=self.offline, message='missed')
+        self.assertEqual(self.pushed(send), [(self.online.id, 'hello')])
+        self.assertEqual(send.call_args.args[1]['type'], 'notification.new')
+
+    def test_bulk_create_pushes_too(self):
+        with mock.patch('core.realtime.send_to_user') as send, self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.bulk_create([
+                Notification(from_user=self.sender, to_user=user, message=f'for {user.username}')
+                for user in (self.online, self.offline)
+            ])
+        self.assertEqual(self.pushed(send), [(self.online.id, 'for online')])
+
+    def test_bulk_create_without_primary_keys_asks_for_a_refresh(self):
+        # MySQL's bulk insert returns no ids; a push with "id": null is useless
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                mock.patch('core.realtime.send_to_user') as send, self.captureOnCommitCallbacks(execute=True):
+            created = Notification.objects.bulk_create([
+                Notification(from_user=self.sender, to_user=user, message='job')
+                for user in (self.online, self.online, self.offline)
+            ])
+        self.assertIsNone(created[0].pk)
+        self.assertEqual(
+            [call.args for call in send.call_args_list],
+            [(self.online.id, {'type': 'notification.refresh'})],
+        )
+        self.assertEqual(counters.unread_notifications(self.online.id), 2)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER, CACHES=LOCMEM_CACHE)
+class NotificationSocketTests(TransactionTestCase):
+    async def test_connected_user_receives_notification(self):
+        await sync_to_async(cache.clear)()
+        user = await sync_to_async(User.objects.create_user)(username='tutor', password='pw')
+        communicator = WebsocketCommunicator(websocket_application, f'/ws/chat/{user.id}/?token={AccessToken.for_user(user)}')
+        self.assertTrue((await communicator.connect())[0])
+
+        await sync_to_async(Notification.objects.create)(from_user=user, to_user=user, message='Welcome!')
+        event = await communicator.receive_json_from(timeout=5)
+        self.assertEqual(event['type'], 'notification.new')
+        self.assertEqual(event['notification']['message'], 'Welcome!')
+        self.assertFalse(event['notification']['is_read'])
+
+        await communicator.disconnect()
@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from redis.exceptions import RedisError
+
+from core import presence
+from core.chat import persist_message
+from core.models import ContactUnlock, Conversation, ConversationParticipant, Notification
+from core.tasks import send_chat_digests
+
+from .helpers import LOCMEM_CACHE
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_connections_are_counted_per_user(self):
+        presence.touch(1, 'tab-a')
+        presence.touch(1, 'tab-b')
+        presence.touch(2, 'tab-c')
+        self.assertEqual(presence.online([1, 2, 3]), {1, 2})
+
+        presence.leave(1, 'tab-a')
+        self.assertEqual(presence.online([1]), {1})
+        presence.leave(1, 'tab-b')
+        self.assertEqual(presence.online([1, 2]), {2})
+
+    def test_missed_heartbeats_expire(self):
+        with mock.patch('core.presence.time.time', return_value=1000.0):
+            presence.touch(1, 'tab-a')
+        with mock.patch('core.presence.time.time', return_value=1000.0 + presence.TTL - 1):
+            self.assertEqual(presence.online([1]), {1})
+        with mock.patch('core.presence.time.time', return_value=1000.0 + presence.TTL + 1):
+            self.assertEqual(presence.online([1]), set())
+
+    def test_unreachable_redis_yields_no_digest_users(self):
+        conn = mock.Mock()
+        conn.pipeline.return_value.execute.side_effect = RedisError('connection refused')
+        with mock.patch('core.presence._redis', return_value=conn), self.assertLogs('core.presence', 'WARNING'):
+            self.assertEqual(presence.pop_digest_users(), set())
+            send_chat_digests()
+        self.assertFalse(Notification.objects.exists())
+
+    def test_digest_summarises_unread_for_users_still_offline(self):
+        alice, bob, carol = (User.objects.create_user(username=name, password='pw') for name in ('alice', 'bob', 'carol'))
+        for other in (bob, carol):
+            conversation = Conversation.objects.create()
+            ConversationParticipant.objects.bulk_create([
+                ConversationParticipant(conversation=conversation, user=alice),
+                ConversationParticipant(conversation=conversation, user=other),
+            ])
+            ContactUnlock.objects.create(unlocker=other, target=alice)
+            persist_message(alice.id, conversation.id, 'one')
+            persist_message(alice.id, conversation.id, 'two')
+
+        presence.defer_digest([bob.id, carol.id])
+        presence.touch(carol.id, 'tab')  # came back before the digest ran
+        send_chat_digests()
+
+        self.assertEqual(
+            list(Notification.objects.values_list('to_user', 'message')),
+            [(bob.id, 'You have 2 unread messages in 1 conversation.')],
+        )
+        self.assertEqual(presence.pop_digest_users(), set())
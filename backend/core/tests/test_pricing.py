@@ -0,0 +1,148 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core import pricing
+from core.models import CountryGroup, CountryGroupPoint, Job, JobUnlock, UnlockPricingTier
+from core.pricing import DEFAULT_POINTS, get_pricing_table, invalidate_pricing_table
+
+from .helpers import LOCMEM_CACHE
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PricingTableTests(TestCase):
+    def setUp(self):
+        invalidate_pricing_table()
+        self.addCleanup(invalidate_pricing_table)
+
+    def test_defaults_without_configuration(self):
+        table = get_pricing_table()
+        self.assertEqual(table.base_points_for_hourly(25), DEFAULT_POINTS)
+        self.assertEqual(table.points_for_country('Bangladesh'), DEFAULT_POINTS)
+
+    def test_tier_lookup_and_clamping(self):
+        UnlockPricingTier.objects.create(min_rate=Decimal('5'), max_rate=Decimal('10'), points=20)
+        UnlockPricingTier.objects.create(min_rate=Decimal('10.01'), max_rate=Decimal('20'), points=40)
+        UnlockPricingTier.objects.create(min_rate=Decimal('30'), max_rate=Decimal('50'), points=80)
+        table = get_pricing_table()
+
+        cases = {1: 20, 5: 20, 10: 20, 10.005: 20, 15: 40, 20: 40, 25: 20, 30: 80, 50: 80, 75: 80}
+        for rate, points in cases.items():
+            self.assertEqual(table.base_points_for_hourly(rate), points, rate)
+
+    def test_open_ended_top_tier(self):
+        UnlockPricingTier.objects.create(min_rate=Decimal('0'), max_rate=Decimal('10'), points=20)
+        UnlockPricingTier.objects.create(min_rate=Decimal('10.01'), max_rate=None, points=60)
+        self.assertEqual(get_pricing_table().base_points_for_hourly(1000), 60)
+
+    def test_country_points(self):
+        CountryGroupPoint.objects.create(group='G1', points=150)
+        CountryGroup.objects.create(name='Canada', group='G1')
+        CountryGroup.objects.create(name='Nepal', group='G9')
+        table = get_pricing_table()
+        self.assertEqual(table.points_for_country('Canada'), 150)
+        self.assertEqual(table.points_for_country('Nepal'), DEFAULT_POINTS)
+
+    def test_edit_in_another_process_drops_the_local_copy(self):
+        tier = UnlockPricingTier.objects.create(min_rate=Decimal('0'), max_rate=None, points=20)
+        self.assertEqual(get_pricing_table().base_points_for_hourly(5), 20)
+
+        UnlockPricingTier.objects.filter(pk=tier.pk).update(points=35)
+        self.assertEqual(get_pricing_table().base_points_for_hourly(5), 20)
+        # Another worker saved the tier: only the shared version changes
+        cache.set(pricing.VERSION_KEY, 'edited-elsewhere')
+        self.assertEqual(get_pricing_table().base_points_for_hourly(5), 35)
+
+    def test_hot_path_runs_no_queries(self):
+        get_pricing_table()
+        with self.assertNumQueries(0):
+            get_pricing_table().base_points_for_hourly(12)
+            get_pricing_table().points_for_country('Canada')
+
+    def test_admin_edits_invalidate_table(self):
+        tier = UnlockPricingTier.objects.create(min_rate=Decimal('0'), max_rate=None, points=20)
+        self.assertEqual(get_pricing_table().base_points_for_hourly(5), 20)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tier.points = 35
+            tier.save()
+        self.assertEqual(get_pricing_table().base_points_for_hourly(5), 35)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tier.delete()
+        self.assertEqual(get_pricing_table().base_points_for_hourly(5), DEFAULT_POINTS)
+
+
+def legacy_dynamic_price(base_price, unlock_count, idle_time, next_unlock=False):
+    """The per-block loop the views used before core.pricing."""
+    price = base_price
+    effective_unlocks = min(unlock_count + (1 if next_unlock else 0), 10)
+    if effective_unlocks > 0:
+        price = int(price * (1.1 ** effective_unlocks))
+    if unlock_count == 0 and idle_time > timedelta(hours=36):
+        five_hour_blocks = (idle_time - timedelta(hours=36)) // timedelta(hours=5)
+        for _ in range(int(five_hour_blocks)):
+            price = int(price * 0.95)
+    return max(price, int(base_price * 0.20))
+
+
+class PriceEngineTests(SimpleTestCase):
+    def test_matches_legacy_loop(self):
+        rng = random.Random(2024)
+        now = timezone.now()
+        for _ in range(5000):
+            base = rng.choice([rng.randint(0, 10), rng.randint(1, 2000)])
+            unlocks = rng.choice([0, 0, rng.randint(0, 15)])
+            idle = timedelta(minutes=rng.randint(0, 60 * 24 * 400))
+            for next_unlock in (False, True):
+                self.assertEqual(
+                    pricing.dynamic_price(base, unlocks, now - idle, now, next_unlock=next_unlock),
+                    legacy_dynamic_price(base, unlocks, idle, next_unlock=next_unlock),
+                    (base, unlocks, idle, next_unlock),
+                )
+
+    def test_decay_replay_is_bounded(self):
+        with patch('core.pricing._decay_step', wraps=pricing._decay_step) as step:
+            # the first value of the int(price * 0.95) chain at or below the floor
+            self.assertEqual(pricing.decay(1000, 10 ** 9, 200), 197)
+        self.assertLess(step.call_count, 40)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class QuoteTests(APITestCase):
+    def setUp(self):
+        invalidate_pricing_table()
+        self.addCleanup(invalidate_pricing_table)
+        self.tutor = User.objects.create_user(username='tutor', password='pw', user_type='tutor')
+        student = User.objects.create_user(username='student', password='pw', user_type='student')
+        self.jobs = [Job.objects.create(student=student, country='Nowhere') for _ in range(4)]
+        JobUnlock.objects.create(job=self.jobs[1], tutor=self.tutor, points_spent=100)
+        other = User.objects.create_user(username='other', password='pw', user_type='tutor')
+        JobUnlock.objects.create(job=self.jobs[2], tutor=other, points_spent=100)
+        Job.objects.filter(pk__in=[self.jobs[1].pk, self.jobs[2].pk]).update(unlock_count=1)
+
+    def test_quote_prices_a_page_in_one_query(self):
+        get_pricing_table()
+        jobs = list(Job.objects.filter(pk__in=[j.pk for j in self.jobs]))
+        with self.assertNumQueries(1):
+            quotes = pricing.quote(jobs, self.tutor)
+
+        self.assertEqual(quotes[self.jobs[0].pk], {'unlocked': False, 'points_needed': 100, 'future_points_needed': 110})
+        self.assertEqual(quotes[self.jobs[1].pk], {'unlocked': True, 'points_needed': 0, 'future_points_needed': 0})
+        self.assertEqual(quotes[self.jobs[2].pk], {'unlocked': False, 'points_needed': 110, 'future_points_needed': 121})
+
+    def test_job_list_includes_quotes_for_tutors(self):
+        self.client.force_authenticate(self.tutor)
+        response = self.client.get('/api/jobs/')
+        quotes = {job['id']: job['unlock_quote'] for job in response.data['results']}
+        self.assertTrue(quotes[self.jobs[1].pk]['unlocked'])
+        self.assertEqual(quotes[self.jobs[2].pk]['points_needed'], 110)
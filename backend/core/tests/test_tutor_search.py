@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from core.models import ContactUnlock, Credit, Gig
+
+User = get_user_model()
+
+
+class TutorSearchQueryCountTests(APITestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='pw', user_type='student')
+        for i in range(25):
+            tutor = User.objects.create_user(username=f'tutor{i}', password='pw', user_type='tutor')
+            Gig.objects.create(tutor=tutor, title='Maths', description='', subject='Mathematics')
+            Credit.objects.create(user=tutor, balance=i)
+            if i % 2:
+                ContactUnlock.objects.create(unlocker=self.student, target=tutor)
+        self.client.force_authenticate(self.student)
+
+    def search(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(f'/api/tutors/search/?page_size={page_size}', {'subject': 'math'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        small, small_queries = self.search(5)
+        large, large_queries = self.search(25)
+        self.assertLessEqual(small_queries, 6)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(large.data['count'], 25)
+
+    def test_results_sorted_by_points_with_unlocked_flags(self):
+        response, _ = self.search(5)
+        results = response.data['results']
+        self.assertEqual([t['username'] for t in results], [f'tutor{i}' for i in range(24, 19, -1)])
+        self.assertEqual([t['unlocked'] for t in results], [False, True, False, True, False])
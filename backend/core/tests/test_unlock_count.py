@@ -0,0 +1,53 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from core.models import Credit, Gig, Job, JobUnlock, Subject
+
+from .helpers import LOCMEM_CACHE
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class UnlockCountTests(APITestCase):
+    def setUp(self):
+        self.tutor = User.objects.create_user(username='tutor', password='pw', user_type='tutor')
+        Credit.objects.create(user=self.tutor, balance=1000)
+        Gig.objects.create(tutor=self.tutor, title='Maths', subject='Mathematics')
+        student = User.objects.create_user(username='student', password='pw', user_type='student')
+        self.job = Job.objects.create(student=student)
+        self.job.subjects.set([Subject.objects.create(name='Mathematics', is_active=True)])
+        self.client.force_authenticate(self.tutor)
+
+    def test_unlock_increments_counter(self):
+        response = self.client.post(f'/api/jobs/{self.job.pk}/unlock/')
+        self.assertEqual(response.status_code, 201)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.unlock_count, 1)
+
+        response = self.client.get(f'/api/jobs/{self.job.pk}/')
+        self.assertEqual(response.data['applicants_count'], 1)
+
+
+class ReconcileUnlockCountsTests(TestCase):
+    def test_reconcile_fixes_drift(self):
+        student = User.objects.create_user(username='student', password='pw', user_type='student')
+        tutor = User.objects.create_user(username='tutor', password='pw', user_type='tutor')
+        drifted = Job.objects.create(student=student, unlock_count=5)
+        JobUnlock.objects.create(job=drifted, tutor=tutor, points_spent=10)
+        correct = Job.objects.create(student=student, unlock_count=0)
+
+        out = StringIO()
+        call_command('reconcile_unlock_counts', '--dry-run', stdout=out)
+        self.assertIn('Found 1 jobs', out.getvalue())
+        drifted.refresh_from_db()
+        self.assertEqual(drifted.unlock_count, 5)
+
+        call_command('reconcile_unlock_counts', stdout=StringIO())
+        drifted.refresh_from_db()
+        correct.refresh_from_db()
+        self.assertEqual((drifted.unlock_count, correct.unlock_count), (1, 0))
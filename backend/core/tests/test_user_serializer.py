@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from core.models import ContactUnlock
+from core.serializers import UserSerializer
+
+User = get_user_model()
+
+
+class UserListSerializerTests(APITestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='pw', user_type='student')
+        self.tutors = [
+            User.objects.create_user(username=f'tutor{i}', password='pw', user_type='tutor')
+            for i in range(12)
+        ]
+        ContactUnlock.objects.create(unlocker=self.student, target=self.tutors[3])
+        self.client.force_authenticate(self.student)
+
+    def list_tutors(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/tutors/', {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_tutor_list_queries_do_not_grow_with_page_size(self):
+        _, small_queries = self.list_tutors(2)
+        response, large_queries = self.list_tutors(12)
+        self.assertEqual(small_queries, large_queries)
+        unlocked = {t['username'] for t in response.data['results'] if t['unlocked']}
+        self.assertEqual(unlocked, {'tutor3'})
+
+    def test_single_user_still_resolves_unlocked(self):
+        request = type('Request', (), {'user': self.student})()
+        self.assertTrue(UserSerializer(self.tutors[3], context={'request': request}).data['unlocked'])
+        self.assertFalse(UserSerializer(self.tutors[4], context={'request': request}).data['unlocked'])
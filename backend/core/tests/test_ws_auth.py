@@ -0,0 +1,54 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core.middleware import IDENTITY_CACHE_TIMEOUT, WebSocketUser, get_identity
+
+from .helpers import LOCMEM_CACHE
+
+User = get_user_model()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class WebSocketIdentityTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pw', user_type='tutor')
+
+    def test_identity_is_cached_per_token(self):
+        token = str(AccessToken.for_user(self.user))
+        with CaptureQueriesContext(connection) as first:
+            identity = async_to_sync(get_identity)(token)
+        self.assertIsInstance(identity, WebSocketUser)
+        self.assertEqual((identity.id, identity.username, identity.user_type), (self.user.id, 'alice', 'tutor'))
+        self.assertEqual(len(first), 1)
+
+        with CaptureQueriesContext(connection) as again:
+            self.assertEqual(async_to_sync(get_identity)(token).id, self.user.id)
+        self.assertEqual(len(again), 0)
+
+    def test_rejects_bad_and_non_access_tokens(self):
+        self.assertIsNone(async_to_sync(get_identity)('not-a-token'))
+        self.assertIsNone(async_to_sync(get_identity)(str(RefreshToken.for_user(self.user))))
+
+        token = str(AccessToken.for_user(self.user))
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(async_to_sync(get_identity)(token))
+
+    def test_deactivation_applies_once_the_cached_identity_expires(self):
+        token = str(AccessToken.for_user(self.user))
+        with mock.patch('core.middleware.cache.set', wraps=cache.set) as cache_set:
+            async_to_sync(get_identity)(token)
+        self.assertEqual(cache_set.call_args.kwargs['timeout'], IDENTITY_CACHE_TIMEOUT)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNotNone(async_to_sync(get_identity)(token))
+        cache.clear()  # the cached identity has expired
+        self.assertIsNone(async_to_sync(get_identity)(token))
@@ -1,28 +1,31 @@
 import logging
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
-from core.tasks import send_job_email, expire_single_user_premium
+from core.tasks import send_job_email_batch, expire_single_user_premium
 
 logger = logging.getLogger(__name__)
 
-JOB_EMAIL_DELAY = 20 * 60  # 20 minutes in seconds
-BATCHES = [1, 2, 3, 4]     # tutors per batch
-
 def schedule_job_emails(tutor_data):
-    sent_count = 0
+    """
+    Queue the job email for every entry of `tutor_data`, best tutors first.
+    Releases follow settings.JOB_EMAIL_BATCHES, JOB_EMAIL_DELAY seconds
+    apart, and whoever is left goes out in one final release. Releases are
+    split into tasks of at most JOB_EMAIL_CHUNK_SIZE recipients.
+    """
+    chunk_size = settings.JOB_EMAIL_CHUNK_SIZE
+    sizes = list(settings.JOB_EMAIL_BATCHES) + [len(tutor_data)]
+    start = 0
     delay_seconds = 0
 
-    for batch_size in BATCHES:
-        batch = tutor_data[sent_count: sent_count + batch_size]
-        for tutor in batch:
-            send_job_email.apply_async(
-                args=[tutor['email'], tutor['html_content'], tutor['text_content']],
-                countdown=delay_seconds
-            )
-            print(f"Scheduled email to {tutor['email']} in {delay_seconds} seconds")
-        sent_count += batch_size
-        delay_seconds += JOB_EMAIL_DELAY
-        if sent_count >= len(tutor_data):
+    for batch_size in sizes:
+        batch = tutor_data[start: start + batch_size]
+        for i in range(0, len(batch), chunk_size):
+            send_job_email_batch.apply_async(args=[batch[i: i + chunk_size]], countdown=delay_seconds)
+        logger.info(f"Scheduled {len(batch)} job emails in {delay_seconds} seconds")
+        start += batch_size
+        delay_seconds += settings.JOB_EMAIL_DELAY
+        if start >= len(tutor_data):
             break
 
 
@@ -1,23 +1,44 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
+import asyncio
 import base64
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from django.conf import settings
 
 # In a real scenario, use settings.SECRET_KEY.
 # For simplicity and reproducibility, we derive a key or use a fixed one if SECRET_KEY is not suitable directly (Fernet requires 32 url-safe base64 bytes).
 # Let's derive a key from SECRET_KEY.
 
-def get_cipher_suite():
-    key = settings.SECRET_KEY
+# Lists at least this long are decrypted off the event loop by decrypt_many_async
+PARALLEL_THRESHOLD = 50
+DECRYPT_WORKERS = 4
+_pool = ThreadPoolExecutor(max_workers=DECRYPT_WORKERS, thread_name_prefix="decrypt")
+
+
+def _fernet_key(secret):
     # Pad or truncate to 32 bytes
-    if len(key) < 32:
-        key = key.ljust(32, '0')
+    if len(secret) < 32:
+        secret = secret.ljust(32, '0')
     else:
-        key = key[:32]
+        secret = secret[:32]
 
     # Fernet requires a url-safe base64-encoded 32-byte key.
     # We can just base64 encode the 32-byte string.
-    encoded_key = base64.urlsafe_b64encode(key.encode('utf-8'))
-    return Fernet(encoded_key)
+    return base64.urlsafe_b64encode(secret.encode('utf-8'))
+
+
+@lru_cache(maxsize=4)
+def _cipher(secrets):
+    return MultiFernet([Fernet(_fernet_key(secret)) for secret in secrets])
+
+
+def get_cipher_suite():
+    """
+    Cipher for the current SECRET_KEY, built once per key set. Encrypts with
+    SECRET_KEY and also decrypts text written under any SECRET_KEY_FALLBACKS,
+    so the key can be rotated without losing old messages.
+    """
+    return _cipher((settings.SECRET_KEY, *getattr(settings, "SECRET_KEY_FALLBACKS", ())))
 
 def encrypt_text(text):
     if not text:
@@ -30,6 +51,53 @@ def encrypt_text(text):
         print(f"Encryption error: {e}")
         return text # Fallback or raise
 
+def encrypt_many(texts):
+    """encrypt_text for a list, in one pass; same fallbacks per item."""
+    cipher_suite = get_cipher_suite()
+    results = []
+    for text in texts:
+        if not text:
+            results.append(text)
+            continue
+        try:
+            results.append(cipher_suite.encrypt(text.encode('utf-8')).decode('utf-8'))
+        except Exception as e:
+            print(f"Encryption error: {e}")
+            results.append(text)
+    return results
+
+def decrypt_many(texts):
+    """decrypt_text for a list, in one pass; same fallbacks per item."""
+    cipher_suite = get_cipher_suite()
+    results = []
+    for text in texts:
+        if not text:
+            results.append(text)
+            continue
+        try:
+            results.append(cipher_suite.decrypt(text.encode('utf-8')).decode('utf-8'))
+        except Exception:
+            results.append(text)
+    return results
+
+async def decrypt_many_async(texts):
+    """
+    decrypt_many for async callers. Short lists are decrypted inline; long
+    ones (e.g. a history page) are split across a small thread pool so
+    neither the event loop nor the thread running ORM calls waits on them.
+    """
+    texts = list(texts)
+    if len(texts) < PARALLEL_THRESHOLD:
+        return decrypt_many(texts)
+
+    loop = asyncio.get_running_loop()
+    size = -(-len(texts) // DECRYPT_WORKERS)
+    chunks = await asyncio.gather(*(
+        loop.run_in_executor(_pool, decrypt_many, texts[i:i + size])
+        for i in range(0, len(texts), size)
+    ))
+    return [text for chunk in chunks for text in chunk]
+
 def decrypt_text(text):
     if not text:
         return text
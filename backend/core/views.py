@@ -3,12 +3,12 @@ import os
 import subprocess
 import json
 import random
+import math
 import time
 from django.db.models import Avg
-from geopy.exc import GeocoderUnavailable, GeocoderTimedOut
-from geopy.geocoders import Nominatim
 from rest_framework.views import APIView
-from django.db.models import Sum, Q
+from django.db.models import Q, F, Exists, OuterRef
+from django.db.models.functions import Coalesce
 from django.core.mail import send_mail
 from django.utils import timezone
 from datetime import datetime, timedelta
@@ -42,7 +42,7 @@ from core.modules.auth import ( SendOTPView, ResetPasswordView,
 
 from urllib.parse import urlencode
 from .models import (
-    CountryGroup, CountryGroupPoint, UnlockPricingTier, User, Gig, Credit, Job, Application, Notification, UserSettings, Review, Subject, EscrowPayment,
+    User, Gig, Credit, Job, Application, Notification, UserSettings, Review, Subject, EscrowPayment,
     Order, Payment, ContactUnlock, JobUnlock, Question, Answer, CoinGift, Coupon, TutorApplication,
 )
 from .serializers import (
@@ -57,7 +57,12 @@ from .serializers import (
 from .views_admin import AdminDashboardStatsView, AdminUserViewSet, AdminJobViewSet
 from .payments import SSLCommerzPayment
 from .permissions import IsOwnerOrReadOnly
-from .pagination import StandardResultsSetPagination
+from .pagination import NotificationCursorPagination, StandardResultsSetPagination
+from .filters import GeoRadiusFilter
+from .geo import haversine_many, nearest
+from . import counters, leaderboard, pricing
+from .geocoding import NOT_STORED, lookup_coordinates, queue_search_geocode
+from .tasks import notify_tutors_of_new_job
 
 __all__ = [
     "SendOTPView",
@@ -127,65 +132,70 @@ class TutorViewSet(viewsets.ModelViewSet):
         input_location = request.data.get("location", "").strip()
         subject_query = request.data.get("subject", "").strip().lower()
 
-        geolocator = Nominatim(user_agent="your_app_name")
+        # Coordinates come from the geocode store only; places never looked
+        # up are geocoded in the background so the next search can use them.
+        # Stored failures are not retried.
         input_lat, input_lon = None, None
-
         if input_location:
-            try:
-                loc = geolocator.geocode(input_location)
-                if loc:
-                    input_lat, input_lon = loc.latitude, loc.longitude
-            except (GeocoderUnavailable, GeocoderTimedOut):
-                pass
+            coords = lookup_coordinates(input_location, default=NOT_STORED)
+            if coords is NOT_STORED:
+                queue_search_geocode(input_location)
+            elif coords:
+                input_lat, input_lon = coords
 
-        # All tutors (no location exclusion!)
+        # All tutors (no location exclusion!), filtered and scored in one query.
         tutors = User.objects.filter(user_type="tutor")
-        matched_tutors = []
-
-        for tutor in tutors:
-            try:
-                # Check if tutor has relevant subject
-                gigs_qs = Gig.objects.filter(tutor=tutor)
-                if subject_query:
-                    gigs_qs = gigs_qs.filter(subject__icontains=subject_query)
-
-                if subject_query and not gigs_qs.exists():
-                    continue  # Skip tutor if no relevant subject match
-
-                credit_count = getattr(tutor, "credit_count", 0)
-
-                distance_km = None
-                if input_lat is not None and input_lon is not None and tutor.location:
-                    try:
-                        tutor_loc = geolocator.geocode(tutor.location)
-                        if tutor_loc:
-                            tutor_lat, tutor_lon = tutor_loc.latitude, tutor_loc.longitude
-                            distance_km = haversine(input_lon, input_lat, tutor_lon, tutor_lat)
-                    except Exception:
-                        pass  # Location geocode failed, skip distance
-
-                matched_tutors.append((tutor, credit_count, distance_km))
-            except Exception:
-                continue
-
-        # Sort: by points DESC, then distance ASC (None distances go last)
-        matched_tutors.sort(
-            key=lambda x: (-x[1], x[2] if x[2] is not None else float('inf'))
+        if subject_query:
+            tutors = tutors.filter(Exists(
+                Gig.objects.filter(tutor=OuterRef("pk"), subject__icontains=subject_query)
+            ))
+        rows = list(
+            tutors.annotate(points=Coalesce("credit__balance", 0))
+            .values_list("pk", "points", "latitude", "longitude")
         )
 
-        combined_tutors = [t[0] for t in matched_tutors]
-        
-        page = self.paginate_queryset(combined_tutors)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+        # Sort: by points DESC, then distance ASC (unknown distances go last).
+        # Distances are computed in one batch and only the rows up to the
+        # requested page are ranked.
+        points = [-row[1] for row in rows]
+        if input_lat is not None:
+            distances = haversine_many(input_lat, input_lon, [row[2] for row in rows], [row[3] for row in rows])
+        else:
+            distances = [math.inf] * len(rows)
 
-        serializer = self.get_serializer(combined_tutors, many=True)
+        order = nearest(distances, k=self._ranking_depth(request), priority=points)
+        ranked = set(order)
+        order += [i for i in range(len(rows)) if i not in ranked]
+        tutor_ids = [rows[i][0] for i in order]
+
+        page_ids = self.paginate_queryset(tutor_ids)
+        if page_ids is None:
+            page_ids = tutor_ids
+
+        # Load only the tutors being returned; UserListSerializer batches the rest.
+        by_id = User.objects.in_bulk(page_ids)
+        tutors_page = [by_id[pk] for pk in page_ids if pk in by_id]
+        serializer = self.get_serializer(tutors_page, many=True)
+
+        if self.paginator is not None:
+            return self.get_paginated_response(serializer.data)
         return Response({
-            "count": len(combined_tutors),
+            "count": len(tutor_ids),
             "results": serializer.data
         })
 
+    def _ranking_depth(self, request):
+        """Number of leading results the requested page needs in order (None = all)."""
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        page_size = paginator.get_page_size(request)
+        try:
+            page_number = int(request.query_params.get(paginator.page_query_param, 1))
+        except (TypeError, ValueError):
+            return None
+        return page_number * page_size if page_size and page_number > 0 else None
+
 class StudentViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     queryset = User.objects.filter(user_type='student')
@@ -203,7 +213,7 @@ class StudentViewSet(viewsets.ModelViewSet):
 
         # Include student's posted jobs in the response
         from .serializers import JobSerializer
-        jobs = Job.objects.filter(student=student).order_by('-created_at')
+        jobs = JobSerializer.setup_eager_loading(Job.objects.filter(student=student)).order_by('-created_at')
         data['jobs'] = JobSerializer(jobs, many=True, context={'request': request}).data
 
         return Response(data)
@@ -650,27 +660,6 @@ class UserViewSet(viewsets.ModelViewSet):
             'profile_picture_url': request.build_absolute_uri(user.profile_picture.url)
         }, status=200)
 
-# --- Utility ---
-import math
-
-def haversine(lon1, lat1, lon2, lat2):
-    """
-    Calculate the great-circle distance between two points
-    on the Earth specified by longitude and latitude in decimal degrees.
-    Returns distance in kilometers.
-    """
-    R = 6371  # Earth radius in km
-
-    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
-
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-
-    return R * c
-
 class UserCreditBalanceView(APIView):
     permission_classes = [IsAuthenticated]
     def get(self, request, user_id):
@@ -731,8 +720,6 @@ class CreditUpdateByUserPostView(APIView):
             }, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderUnavailable, GeocoderTimedOut
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -1009,7 +996,9 @@ class JobViewSet(viewsets.ModelViewSet):
     serializer_class = JobSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [filters.SearchFilter]
+    # GeoRadiusFilter handles ?lat=&lng=&radius_km= and must run last so it
+    # orders the already-filtered rows by distance.
+    filter_backends = [filters.SearchFilter, GeoRadiusFilter]
     search_fields = ['description', 'location', 'subjects__name']
 
     def get_permissions(self):
@@ -1017,23 +1006,8 @@ class JobViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return super().get_permissions()
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        
-        # If get_queryset returns a list (e.g. from geo-search), filter_backends won't work automatically.
-        if not isinstance(queryset, list):
-            queryset = self.filter_queryset(queryset)
-
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-
     def get_queryset(self):
-        queryset = Job.objects.all()
+        queryset = JobSerializer.setup_eager_loading(Job.objects.all())
         
         # New: Filter by Type (Online, Offline, Assignment)
         job_type = self.request.query_params.get('type')
@@ -1046,27 +1020,12 @@ class JobViewSet(viewsets.ModelViewSet):
         
         subject = self.request.query_params.get('subject', None)
         location = self.request.query_params.get('location', None)
-        lat = self.request.query_params.get('lat')
-        lng = self.request.query_params.get('lng')
-        radius_km = float(self.request.query_params.get('radius_km', 20))
 
         if subject:
             queryset = queryset.filter(subjects__name__icontains=subject)
         if location:
             queryset = queryset.filter(location__icontains=location)
 
-        if lat and lng:
-            lat, lng = float(lat), float(lng)
-            jobs_in_radius = []
-            for job in queryset:
-                if job.latitude is not None and job.longitude is not None:
-                    distance = haversine(lat, lng, job.latitude, job.longitude)
-                    if distance <= radius_km:
-                        job._distance = distance
-                        jobs_in_radius.append(job)
-            jobs_in_radius.sort(key=lambda j: getattr(j, '_distance', 0))
-            return jobs_in_radius
-
         return queryset.order_by('-created_at')
     
     @action(detail=False, methods=['GET'], permission_classes=[IsAuthenticated])
@@ -1082,7 +1041,7 @@ class JobViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        queryset = Job.objects.filter(student=user).order_by('-created_at')
+        queryset = JobSerializer.setup_eager_loading(Job.objects.filter(student=user)).order_by('-created_at')
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -1105,59 +1064,13 @@ class JobViewSet(viewsets.ModelViewSet):
         # -------------------------------
         active_job_subjects = job.subjects.filter(is_active=True).values_list("name", flat=True)
 
-        # print(f"Active job subjects for job {job.id}: {list(active_job_subjects)}")
-        # Tutors who have active gigs with subjects matching the active job subjects
-        tutors = User.objects.filter(
-            user_type="tutor",
-            gigs__subject__in=active_job_subjects
-        ).distinct().annotate(
-            total_points_spent=Sum(
-                'gigs__used_credits',
-                filter=Q(gigs__subject__in=active_job_subjects)
-            )
-        ).order_by('-total_points_spent')
-
-        tutor_data = []
-        notifications = []
-
-        for tutor in tutors:
-            if tutor.email:
-                verify_url = f"{settings.FRONTEND_SITE_URL}/jobs/{job.id}/"
-                html_content = f"""
-                <html><body style="font-family: Arial, sans-serif; padding: 40px;">
-                <h2>New Job Matching Your Gig!</h2>
-                <p>{job.description}</p>
-                <p>Location: {job.location}, Budget: {job.budget} USD</p>
-                <p>Subjects: {', '.join(active_job_subjects)}</p>
-                <a href="{verify_url}">View Job & Apply</a>
-                </body></html>
-                """
-                text_content = f"New job posted: {job.description}\nView & apply here: {verify_url}"
-
-                # collect for bulk email
-                tutor_data.append({
-                    'email': tutor.email,
-                    'html_content': html_content,
-                    'text_content': text_content
-                })
-
-            # create in-app notification
-            notifications.append(Notification(
-                from_user=user,
-                to_user=tutor,
-                message=f"New job posted matching your subjects: {', '.join(active_job_subjects)}"
-            ))
-
-        # -------------------------------
-        # Save all notifications at once
-        # -------------------------------
-        if notifications:
-            Notification.objects.bulk_create(notifications)
+        # Fix the first-hour unlock shortlist now so unlock() needs no aggregation
+        job.top_tutor_ids = leaderboard.top_tutors(active_job_subjects)
+        job.save(update_fields=["top_tutor_ids"])
 
-        # -------------------------------
-        # Send emails in batches
-        # -------------------------------
-        schedule_job_emails(tutor_data)
+        # Notifications and emails for matching tutors are sent by a task,
+        # so the student gets a response as soon as the job is saved
+        transaction.on_commit(lambda: notify_tutors_of_new_job.delay(job.id))
 
     @action(detail=False, methods=['GET'], permission_classes=[IsAuthenticated])
     def matched_jobs(self, request):
@@ -1178,7 +1091,9 @@ class JobViewSet(viewsets.ModelViewSet):
             return Response([], status=status.HTTP_200_OK)
 
         # Step 3: Get jobs with those subjects
-        jobs = Job.objects.filter(subjects__name__in=gig_subject_names).distinct().order_by("-created_at")
+        jobs = JobSerializer.setup_eager_loading(
+            Job.objects.filter(subjects__name__in=gig_subject_names).distinct()
+        ).order_by("-created_at")
 
         # Step 4: Paginate & serialize
         page = self.paginate_queryset(jobs)
@@ -1204,22 +1119,13 @@ class JobViewSet(viewsets.ModelViewSet):
         # First-hour top 10 restriction
         # -------------------------
         if timezone.now() <= job.created_at + timedelta(hours=1):
-            active_job_subjects = job.subjects.filter(is_active=True).values_list("name", flat=True)
-            top_tutors = (
-                User.objects.filter(
-                    user_type="tutor",
-                    gigs__subject__in=active_job_subjects
-                )
-                .distinct()
-                .annotate(
-                    total_points_spent=Sum(
-                        'gigs__used_credits',
-                        filter=Q(gigs__subject__in=active_job_subjects)
-                    )
+            top_tutor_ids = job.top_tutor_ids
+            if top_tutor_ids is None:
+                # Jobs posted before the shortlist was stored
+                top_tutor_ids = leaderboard.top_tutors(
+                    job.subjects.filter(is_active=True).values_list("name", flat=True)
                 )
-                .order_by('-total_points_spent')[:10]
-            )
-            if tutor not in top_tutors:
+            if tutor.id not in top_tutor_ids:
                 return Response(
                     {"detail": "Only the top tutors can unlock this job for the first hour."},
                     status=status.HTTP_403_FORBIDDEN,
@@ -1252,6 +1158,7 @@ class JobViewSet(viewsets.ModelViewSet):
 
             # Save job unlock
             unlock_obj = JobUnlock.objects.create(job=job, tutor=tutor, points_spent=points)
+            Job.objects.filter(pk=job.pk).update(unlock_count=F('unlock_count') + 1)
 
             # Also unlock contact: tutor -> student (job poster)
             ContactUnlock.objects.get_or_create(
@@ -1273,149 +1180,20 @@ class JobViewSet(viewsets.ModelViewSet):
         except Job.DoesNotExist:
             return Response({"detail": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        unlocked = JobUnlock.objects.filter(job=job, tutor=tutor).exists()
-        points_needed = 0
-        future_points_needed = 0
-
-        if not unlocked:
-            points_needed = self.calculate_unlock_points(job, tutor)
-            future_points_needed = self.calculate_next_unlock_points(job, tutor)  # 👈 new
-
-        return Response({
-            "unlocked": unlocked,
-            "points_needed": points_needed,
-            "future_points_needed": future_points_needed
-        }, status=status.HTTP_200_OK)
+        return Response(pricing.quote([job], tutor)[job.pk], status=status.HTTP_200_OK)
 
     # ---------------------------
     # Helper Methods
     # ---------------------------
     def calculate_unlock_points(self, job: Job, tutor: User) -> int:
         """
-        Full calculation pipeline:
+        Full calculation pipeline (see core.pricing):
         1. Use budget → normalize hourly → tier → base points
         2. If no budget, fallback to country points
         3. Apply bidding (10% increase per unlock, max 10 unlocks)
         4. Apply decay (after 36h idle, -5% per 5h, min 20% of base)
         """
-        # Step 1: Base points
-        if job.budget and job.total_hours:
-            hourly_rate = self.normalize_hourly_rate(job)
-            base_points = self.get_base_points_for_hourly(hourly_rate)
-        else:
-            base_points = self.get_country_group_points(job.country)
-
-        # Step 2 + 3: Dynamic pricing
-        final_points = self.calculate_dynamic_price(job, base_points)
-
-        return max(final_points, 1)
-
-    def normalize_hourly_rate(self, job: Job) -> float:
-        """
-        Convert any job budget type (Per Hour, Per Day, Per Week, etc.) to hourly.
-        """
-        total_hours = job.total_hours or 1
-        budget = float(job.budget or 0)
-
-        if job.budget_type == "Per Hour":
-            return budget
-        return budget / total_hours
-
-    def get_base_points_for_hourly(self, hourly_rate: float) -> int:
-        """
-        Find unlock tier based on hourly rate.
-        If not in range → clamp to lowest or highest tier.
-        """
-        tiers = UnlockPricingTier.objects.order_by('min_rate')
-        if not tiers.exists():
-            return 100  # fallback if no tiers defined
-
-        # Match tier
-        tier = tiers.filter(min_rate__lte=hourly_rate).filter(
-            Q(max_rate__gte=hourly_rate) | Q(max_rate__isnull=True)
-        ).first()
-        if tier:
-            return tier.points
-
-        lowest_tier = tiers.first()
-        highest_tier = tiers.last()
-
-        if hourly_rate < lowest_tier.min_rate:
-            return lowest_tier.points
-        if highest_tier.max_rate and hourly_rate > highest_tier.max_rate:
-            return highest_tier.points
-
-        return lowest_tier.points
-
-    def get_country_group_points(self, country: str) -> int:
-        group_obj = CountryGroup.objects.filter(name=country).first()
-        if not group_obj:
-            return 100
-        group_point_obj = CountryGroupPoint.objects.filter(group=group_obj.group).first()
-        return group_point_obj.points if group_point_obj else 100
-
-    def calculate_dynamic_price(self, job: Job, base_price: int) -> int:
-        """
-        Apply bidding increase & decay decrease.
-        """
-        price = base_price
-        unlock_count = job.unlocks.count()
-
-        # 1. Increment per unlock (10% each, cap at 10)
-        effective_unlocks = min(unlock_count, 10)
-        if effective_unlocks > 0:
-            price = int(price * (1.1 ** effective_unlocks))
-
-        # 2. Decay if idle for 36h
-        if unlock_count == 0 and job.created_at:
-            now = timezone.now()
-            idle_time = now - job.created_at
-
-            if idle_time > timedelta(hours=36):
-                five_hour_blocks = (idle_time - timedelta(hours=36)) // timedelta(hours=5)
-                for _ in range(int(five_hour_blocks)):
-                    price = int(price * 0.95)
-
-        # 3. Floor = 20% of base
-        min_price = int(base_price * 0.20)
-        return max(price, min_price)
-    
-    def calculate_next_unlock_points(self, job: Job, tutor: User) -> int:
-        """
-        Return the points needed for the immediate next unlock attempt,
-        using the same base price and dynamic pricing logic.
-        """
-        # Step 1: Determine base points (same as calculate_unlock_points)
-        if job.budget and job.total_hours:
-            hourly_rate = self.normalize_hourly_rate(job)
-            base_points = self.get_base_points_for_hourly(hourly_rate)
-        else:
-            base_points = self.get_country_group_points(job.country)
-
-        # Step 2: Dynamic price for NEXT unlock
-        current_unlock_count = job.unlocks.count()
-        # simulate next unlock → add 1
-        next_unlock_count = current_unlock_count + 1
-
-        price = base_points
-
-        # 1. Increment per unlock (10% each, cap at 10)
-        effective_unlocks = min(next_unlock_count, 10)
-        if effective_unlocks > 0:
-            price = int(price * (1.1 ** effective_unlocks))
-
-        # 2. Decay if idle for 36h
-        if current_unlock_count == 0 and job.created_at:
-            now = timezone.now()
-            idle_time = now - job.created_at
-            if idle_time > timedelta(hours=36):
-                five_hour_blocks = (idle_time - timedelta(hours=36)) // timedelta(hours=5)
-                for _ in range(int(five_hour_blocks)):
-                    price = int(price * 0.95)
-
-        # 3. Floor = 20% of base
-        min_price = int(base_points * 0.20)
-        return max(price, min_price)
+        return pricing.unlock_points(job, job.unlock_count)
 
     @action(detail=True, methods=['GET'], permission_classes=[IsAuthenticated])
     def applicants(self, request, pk=None):
@@ -1649,15 +1427,21 @@ class NotificationViewSet(viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     permission_classes = [IsAuthenticated]
 
-    @action(detail=False, methods=['get'], url_path='unread')
+    @action(detail=False, methods=['get'], url_path='unread', pagination_class=NotificationCursorPagination)
     def unread(self, request):
         unread_notifications = self.queryset.filter(to_user=request.user, is_read=False)
-        serializer = self.get_serializer(unread_notifications, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(unread_notifications)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({'unread_count': counters.unread_notifications(request.user.id)})
 
     @action(detail=False, methods=['post'], url_path='mark-read')
     def mark_read(self, request):
         updated_count = self.queryset.filter(to_user=request.user, is_read=False).update(is_read=True)
+        counters.reset_unread_notifications(request.user.id)
         return Response({'marked_read_count': updated_count})
 
     @action(detail=False, methods=['get'], url_path='latest')
@@ -1736,7 +1520,7 @@ class UserSettingsViewSet(viewsets.ModelViewSet):
         return Response({'status': 'privacy settings updated'})
 
 # --- ReviewViewSet (with trust_score update hook) ---
-from core.utils import schedule_job_emails, schedule_premium_expiry, update_trust_score, process_referral_bonus
+from core.utils import schedule_premium_expiry, update_trust_score, process_referral_bonus
 class ReviewViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = ReviewSerializer
@@ -2363,25 +2147,24 @@ class ContactUnlockViewSet(viewsets.ViewSet):
         if request.user.id == target_user.id:
             return Response({'detail': 'You cannot unlock yourself.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if already unlocked
-        unlock, created = ContactUnlock.objects.get_or_create(
-            unlocker=request.user, target=target_user
-        )
-        if not created:
-            return Response({'detail': 'Contact already unlocked.'}, status=status.HTTP_200_OK)
+        # The credit row lock serializes this user's unlocks, so the unlock only
+        # ever exists once it has been paid for (open chats are told about it)
+        with transaction.atomic():
+            credit = Credit.objects.select_for_update().filter(user=request.user).first()
 
-        # 🧾 Deduct 1 credit (only if newly unlocking)
-        try:
-            credit = Credit.objects.get(user=request.user)
-            if credit.balance >= 1:
-                credit.balance -= 1
-                credit.save()
-            else:
-                unlock.delete()  # rollback unlock if not enough points
+            # Check if already unlocked
+            if ContactUnlock.objects.filter(unlocker=request.user, target=target_user).exists():
+                return Response({'detail': 'Contact already unlocked.'}, status=status.HTTP_200_OK)
+
+            # 🧾 Deduct 1 credit (only if newly unlocking)
+            if credit is None:
+                return Response({'detail': 'Credit record not found'}, status=status.HTTP_400_BAD_REQUEST)
+            if credit.balance < 1:
                 return Response({'detail': 'Insufficient points'}, status=status.HTTP_402_PAYMENT_REQUIRED)
-        except Credit.DoesNotExist:
-            unlock.delete()
-            return Response({'detail': 'Credit record not found'}, status=status.HTTP_400_BAD_REQUEST)
+            credit.balance -= 1
+            credit.save(update_fields=['balance'])
+
+            unlock = ContactUnlock.objects.create(unlocker=request.user, target=target_user)
 
         serializer = ContactUnlockSerializer(unlock, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -2801,7 +2584,7 @@ class PublicUserProfileView(generics.RetrieveAPIView):
             data['gigs'] = GigSerializer(gigs, many=True).data
         elif user.user_type == 'student':
             from .serializers import JobSerializer
-            jobs = Job.objects.filter(student=user).order_by('-created_at')
+            jobs = JobSerializer.setup_eager_loading(Job.objects.filter(student=user)).order_by('-created_at')
             data['jobs'] = JobSerializer(jobs, many=True, context={'request': request}).data
 
         return Response(data)
@@ -1,9 +1,11 @@
 import axios from 'axios';
 
 export default class ChatSocket {
-  constructor(userId, onMessage) {
+  constructor(userId, onMessage, onReconnect) {
     this.userId = userId;
     this.onMessage = onMessage;
+    this.onReconnect = onReconnect; // called when a dropped connection is re-established
+    this.hasConnected = false;
     this.host = `${process.env.REACT_APP_WEBSOCKET_PROTOCOL}://${process.env.REACT_APP_WEBSOCKET_URL}`; // adjust if needed
     this.reconnectDelay = 1000;
     this.maxReconnectDelay = 16000;
@@ -13,6 +15,8 @@ export default class ChatSocket {
     this.connecting = false;
     this.shouldReconnect = true;
     this.tokenRefreshAttempted = false; // to avoid multiple refresh tries
+    this.heartbeatInterval = 30000; // keeps this connection in the server's presence registry
+    this.heartbeatTimer = null;
 
     this.connect();
   }
@@ -63,6 +67,12 @@ export default class ChatSocket {
         const msg = this.messageQueue.shift();
         this.send(msg);
       }
+
+      clearInterval(this.heartbeatTimer);
+      this.heartbeatTimer = setInterval(() => this.send({ type: 'chat.heartbeat' }), this.heartbeatInterval);
+
+      if (this.hasConnected && this.onReconnect) this.onReconnect();
+      this.hasConnected = true;
     };
 
     this.socket.onmessage = (event) => {
@@ -79,6 +89,7 @@ export default class ChatSocket {
 
       this.connected = false;
       this.connecting = false;
+      clearInterval(this.heartbeatTimer);
 
       if (event.code === 403) {
         console.warn("[ChatSocket] Connection refused, likely token expired");
@@ -128,3 +139,36 @@ export default class ChatSocket {
     }
   }
 }
+
+// One connection per user per tab, shared by every component that listens
+// (the Messages page, dashboard notification pushes). The socket closes when
+// the last subscriber unsubscribes.
+const sharedSockets = new Map();
+
+export function subscribeChatSocket(userId, onMessage, onReconnect) {
+  const key = String(userId);
+  let entry = sharedSockets.get(key);
+  if (!entry) {
+    const listeners = new Set();
+    const socket = new ChatSocket(
+      userId,
+      (data) => listeners.forEach((listener) => listener.onMessage?.(data)),
+      () => listeners.forEach((listener) => listener.onReconnect?.())
+    );
+    entry = { socket, listeners };
+    sharedSockets.set(key, entry);
+  }
+
+  const listener = { onMessage, onReconnect };
+  entry.listeners.add(listener);
+  return {
+    socket: entry.socket,
+    unsubscribe: () => {
+      entry.listeners.delete(listener);
+      if (entry.listeners.size === 0) {
+        entry.socket.close();
+        sharedSockets.delete(key);
+      }
+    },
+  };
+}
@@ -0,0 +1,23 @@
+import { useEffect, useRef } from 'react';
+import { subscribeChatSocket } from './ChatSocket';
+
+// Calls onNotification for every notification.new pushed over the user's websocket,
+// so pages can keep their notification list current without refetching it.
+// notification.refresh means new notifications arrived without ids (a bulk insert
+// on MySQL), so onRefresh should refetch the list and the badge.
+// Listens on the shared chat socket rather than opening a connection of its own.
+export default function useNotificationPush(userId, onNotification, onRefresh) {
+  const handlerRef = useRef(onNotification);
+  handlerRef.current = onNotification;
+  const refreshRef = useRef(onRefresh);
+  refreshRef.current = onRefresh;
+
+  useEffect(() => {
+    if (!userId) return undefined;
+    const { unsubscribe } = subscribeChatSocket(userId, (data) => {
+      if (data.type === 'notification.new') handlerRef.current?.(data.notification);
+      else if (data.type === 'notification.refresh') refreshRef.current?.();
+    });
+    return unsubscribe;
+  }, [userId]);
+}
@@ -0,0 +1,28 @@
+import { useEffect, useState } from 'react';
+import { subscribeChatSocket } from './ChatSocket';
+
+// Unread chat message count for pages other than Messages. Holding the shared
+// socket marks the user online, so the server pushes new messages here instead
+// of sending an email digest; this keeps a badge in step with them.
+export default function useUnreadMessages(userId) {
+  const [unreadCount, setUnreadCount] = useState(0);
+
+  useEffect(() => {
+    if (!userId) return undefined;
+    const { socket, unsubscribe } = subscribeChatSocket(
+      userId,
+      (data) => {
+        if (data.type === 'chat.unread_summary') {
+          setUnreadCount(data.total || 0);
+        } else if (data.type === 'chat.message' && data.message?.sender?.id !== userId) {
+          setUnreadCount((count) => count + 1);
+        }
+      },
+      () => socket.send({ type: 'chat.unread_summary' })
+    );
+    socket.send({ type: 'chat.unread_summary' });
+    return unsubscribe;
+  }, [userId]);
+
+  return unreadCount;
+}
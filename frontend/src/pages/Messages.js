@@ -2,7 +2,7 @@
 import React, { useEffect, useState, useRef, useCallback } from 'react';
 import { Link, useLocation } from 'react-router-dom';
 import Navbar from '../components/Navbar';
-import ChatSocket from '../components/ChatSocket';
+import { subscribeChatSocket } from '../components/ChatSocket';
 import UnlockContactModal from '../components/UnlockContactModal';
 import BuyCreditsModal from '../components/BuyCreditsModal';
 import UnlockJobModal from '../components/UnlockJobModal';
@@ -13,8 +13,10 @@ export default function WhatsAppLikeMessaging() {
   const [unlockJobUserId, setUnlockJobUserId] = useState(null);
   const [user, setUser] = useState(null);
   const [conversations, setConversations] = useState([]);
+  const [hasMoreConversations, setHasMoreConversations] = useState(false);
   const [activeConversation, setActiveConversation] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [hasMoreMessages, setHasMoreMessages] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [searchResults, setSearchResults] = useState([]);
   const [newMessage, setNewMessage] = useState('');
@@ -29,6 +31,8 @@ export default function WhatsAppLikeMessaging() {
   const messageContainerRef = useRef(null);
   const typingTimeoutRef = useRef(null);
   const handleWSMessageRef = useRef(null);
+  const handleReconnectRef = useRef(null);
+  const keepScrollRef = useRef(false);
 
   const location = useLocation();
   const usernameFromQuery = new URLSearchParams(location.search).get('username');
@@ -119,12 +123,48 @@ export default function WhatsAppLikeMessaging() {
             setShowUnlockModal(true);
           }
           break;
+        case 'contact.unlocked':
+          // Paid elsewhere (e.g. another tab): the prompt for this contact is moot
+          if (Number(unlockTutorId) === data.user_id) setShowUnlockModal(false);
+          if (Number(unlockJobUserId) === data.user_id) setShowUnlockJobModal(false);
+          break;
         case 'chat.conversations':
-          setConversations(data.conversations);
+          if (data.offset) {
+            // Next inbox page requested via "Load more conversations"
+            setConversations((prev) => {
+              const seen = new Set(prev.map((c) => c.id));
+              return [...prev, ...data.conversations.filter((c) => !seen.has(c.id))];
+            });
+          } else {
+            setConversations(data.conversations);
+          }
+          setHasMoreConversations(data.has_more);
           setIsLoading(false);
           break;
         case 'chat.messages':
-          setMessages(data.messages);
+          if (data.conversation_id !== activeConversation?.id) break;
+          if (data.before_id) {
+            // Older page requested via "Load earlier messages"
+            keepScrollRef.current = true;
+            setMessages((prev) => [...data.messages, ...prev]);
+          } else {
+            setMessages(data.messages);
+          }
+          setHasMoreMessages(data.has_more);
+          break;
+        case 'chat.messages_since':
+          if (data.conversation_id !== activeConversation?.id) break;
+          setMessages((prev) => {
+            const known = new Set(prev.map((m) => m.id));
+            return [...prev, ...data.messages.filter((m) => !known.has(m.id))];
+          });
+          if (data.has_more && data.messages.length) {
+            sendMessageWS({
+              type: 'chat.get_messages_since',
+              conversation_id: data.conversation_id,
+              after_id: data.messages[data.messages.length - 1].id,
+            });
+          }
           break;
         case 'chat.typing':
           setPartnerTyping(data.is_typing);
@@ -148,6 +188,14 @@ export default function WhatsAppLikeMessaging() {
           setShowMobileSidebar(false);
           break;
         }
+        case 'chat.unread_summary':
+          setConversations((prev) =>
+            prev.map((conv) => {
+              const count = data.conversations[conv.id] || 0;
+              return { ...conv, unread_count: count, has_unread: count > 0 };
+            })
+          );
+          break;
         case 'chat.read':
           setConversations((prev) =>
             prev.map((conv) =>
@@ -155,10 +203,11 @@ export default function WhatsAppLikeMessaging() {
             )
           );
           break;
-        case 'chat.message_status':
+        case 'chat.message_status': {
+          const changed = new Set(data.message_ids.map(Number));
           setMessages((prev) =>
             prev.map((msg) =>
-              Number(msg.id) === Number(data.message_id)
+              changed.has(Number(msg.id))
                 ? {
                     ...msg,
                     status: data.status,
@@ -168,6 +217,7 @@ export default function WhatsAppLikeMessaging() {
             )
           );
           break;
+        }
         case 'chat.search_results':
           setSearchResults(data.results);
           setIsLoading(false);
@@ -183,13 +233,28 @@ export default function WhatsAppLikeMessaging() {
           break;
       }
     },
-    [activeConversation, conversations, sendMessageWS, user, usernameFromQuery, startConversation]
+    [activeConversation, conversations, sendMessageWS, user, usernameFromQuery, startConversation, unlockTutorId, unlockJobUserId]
   );
 
   useEffect(() => {
     handleWSMessageRef.current = handleWSMessage;
   }, [handleWSMessage]);
 
+  // After a dropped connection, fetch only what the open conversation missed
+  useEffect(() => {
+    handleReconnectRef.current = () => {
+      // Unread badges may have changed while we were away
+      sendMessageWS({ type: 'chat.unread_summary' });
+      if (!activeConversation) return;
+      const last = messages[messages.length - 1];
+      if (last) {
+        sendMessageWS({ type: 'chat.get_messages_since', conversation_id: activeConversation.id, after_id: last.id });
+      } else {
+        sendMessageWS({ type: 'chat.get_messages', conversation_id: activeConversation.id });
+      }
+    };
+  }, [activeConversation, messages, sendMessageWS]);
+
   useEffect(() => {
     const userStr = localStorage.getItem('user');
     if (userStr) setUser(JSON.parse(userStr));
@@ -197,7 +262,11 @@ export default function WhatsAppLikeMessaging() {
 
   useEffect(() => {
     if (!user || socketRef.current) return;
-    const ws = new ChatSocket(user.user_id, (data) => handleWSMessageRef.current?.(data));
+    const { socket: ws, unsubscribe } = subscribeChatSocket(
+      user.user_id,
+      (data) => handleWSMessageRef.current?.(data),
+      () => handleReconnectRef.current?.()
+    );
     socketRef.current = ws;
     const onOpen = () => {
       setIsLoading(true);
@@ -207,10 +276,12 @@ export default function WhatsAppLikeMessaging() {
         sendMessageWS({ type: 'chat.search_user', keyword: usernameFromQuery });
       }
     };
-    ws.socket.addEventListener('open', onOpen);
+    // The shared socket may already be open if another component subscribed first
+    if (ws.connected) onOpen();
+    else ws.socket.addEventListener('open', onOpen);
     return () => {
       ws.socket.removeEventListener('open', onOpen);
-      ws.close();
+      unsubscribe();
       socketRef.current = null;
       clearTimeout(typingTimeoutRef.current);
     };
@@ -218,11 +289,24 @@ export default function WhatsAppLikeMessaging() {
 
   useEffect(() => {
     const container = messageContainerRef.current;
+    if (keepScrollRef.current) {
+      keepScrollRef.current = false;
+      return;
+    }
     if (container) {
       container.scrollTop = container.scrollHeight;
     }
   }, [messages, partnerTyping]);
 
+  const loadEarlierMessages = useCallback(() => {
+    if (!activeConversation || !messages.length) return;
+    sendMessageWS({ type: 'chat.get_messages', conversation_id: activeConversation.id, before_id: messages[0].id });
+  }, [activeConversation, messages, sendMessageWS]);
+
+  const loadMoreConversations = useCallback(() => {
+    sendMessageWS({ type: 'chat.get_conversations', offset: conversations.length });
+  }, [conversations, sendMessageWS]);
+
   const sendMessage = useCallback(() => {
     if (!newMessage.trim() || !activeConversation) return;
     sendMessageWS({
@@ -254,6 +338,8 @@ export default function WhatsAppLikeMessaging() {
   const selectConversation = useCallback(
     (conv) => {
       setActiveConversation(conv);
+      setMessages([]);
+      setHasMoreMessages(false);
       sendMessageWS({ type: 'chat.get_messages', conversation_id: conv.id });
       sendMessageWS({ type: 'chat.read', conversation_id: conv.id });
       setConversations((prev) =>
@@ -368,7 +454,8 @@ export default function WhatsAppLikeMessaging() {
                   <p className="text-sm text-gray-500 dark:text-gray-400">Search for users above to start chatting</p>
                 </div>
               ) : (
-                conversations.map((conv) => {
+                <>
+                {conversations.map((conv) => {
                   const other = getOtherUser(conv);
                   const lastMsg = conv.last_message?.content || 'No messages yet';
                   const hasUnread = conv.has_unread && activeConversation?.id !== conv.id;
@@ -411,7 +498,18 @@ export default function WhatsAppLikeMessaging() {
                       </div>
                     </div>
                   );
-                })
+                })}
+                {hasMoreConversations && (
+                  <div className="flex justify-center py-3">
+                    <button
+                      onClick={loadMoreConversations}
+                      className="text-xs font-medium text-primary-600 dark:text-primary-400 hover:underline"
+                    >
+                      Load more conversations
+                    </button>
+                  </div>
+                )}
+                </>
               )}
             </div>
           </div>
@@ -479,6 +577,16 @@ export default function WhatsAppLikeMessaging() {
                 style={{ backgroundImage: 'radial-gradient(rgba(0,0,0,0.05) 1px, transparent 1px)', backgroundSize: '20px 20px' }}
               >
                 <div className="max-w-3xl mx-auto space-y-4">
+                  {hasMoreMessages && (
+                    <div className="flex justify-center">
+                      <button
+                        onClick={loadEarlierMessages}
+                        className="text-xs font-medium text-primary-600 dark:text-primary-400 hover:underline"
+                      >
+                        Load earlier messages
+                      </button>
+                    </div>
+                  )}
                   {messages.map((msg, index) => {
                     const isSelf = msg.sender.id === user?.user_id;
                     const showDate = index === 0 || 
@@ -13,6 +13,8 @@ import InsufficientCreditsModal from '../components/Dashboard/Student/Insufficie
 import { creditAPI, jobAPI, notificationAPI } from '../utils/apiService';
 import { Link } from 'react-router-dom';
 import Pagination from '../components/Pagination'; // Use the new generic Pagination
+import useNotificationPush from '../components/useNotificationPush';
+import useUnreadMessages from '../components/useUnreadMessages';
 import { MapPin, Calendar, Wallet, BookOpen, MessageCircle } from 'lucide-react';
 
 const studentAPI = {
@@ -123,6 +125,23 @@ const StudentDashboard = () => {
   const [currentPage, setCurrentPage] = useState(1);
   const jobsPerPage = 6;
 
+  const loadNotifications = async () => {
+    try {
+      const [res, countRes] = await Promise.all([
+        notificationAPI.getLatestNotifications(),
+        notificationAPI.getUnreadNotificationCount(),
+      ]);
+      setNotifications(res.data || []);
+      setUnreadNotificationCount(countRes.data?.unread_count || 0);
+    } catch {}
+  };
+
+  useNotificationPush(user?.id, (notification) => {
+    setNotifications((prev) => [notification, ...prev]);
+    setUnreadNotificationCount((count) => count + 1);
+  }, loadNotifications);
+  const unreadMessagesCount = useUnreadMessages(user?.id);
+
   useEffect(() => {
     const storedUser = JSON.parse(localStorage.getItem('user'));
     if (storedUser?.user_type === 'student') setUser(storedUser);
@@ -136,16 +155,6 @@ const StudentDashboard = () => {
   useEffect(() => {
     if (!user?.id) return;
 
-    const loadNotifications = async () => {
-      try {
-        const res = await notificationAPI.getLatestNotifications();
-        const allNotifications = res.data || [];
-        setNotifications(allNotifications);
-        const unreadCount = allNotifications.filter(n => !n.is_read).length;
-        setUnreadNotificationCount(unreadCount);
-      } catch {}
-    };
-
     const loadDashboardData = async () => {
       setIsLoading(true);
       try {
@@ -243,7 +252,7 @@ const StudentDashboard = () => {
           showNotifications={showNotifications}
           onToggleNotifications={handleToggleNotifications}
           onMarkNotificationsRead={handleMarkNotificationsRead}
-          unreadMessagesCount={0}
+          unreadMessagesCount={unreadMessagesCount}
         />
 
         {/* Stats Section */}
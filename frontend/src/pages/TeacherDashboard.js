@@ -6,6 +6,8 @@ import Navbar from '../components/Navbar';
 import Footer from '../components/Footer';
 import { creditAPI, gigApi, notificationAPI, jobAPI } from '../utils/apiService';
 import Pagination from '../components/Pagination';
+import useNotificationPush from '../components/useNotificationPush';
+import useUnreadMessages from '../components/useUnreadMessages';
 import NotificationDropdown from '../components/Dashboard/Student/NotificationDropdown';
 import {
   MapPin,
@@ -551,6 +553,12 @@ const TeacherDashboard = () => {
   const [showNotifications, setShowNotifications] = useState(false);
   const [showEasterEgg, setShowEasterEgg] = useState(false);
 
+  useNotificationPush(user?.id, (notification) => {
+    setNotifications((prev) => [notification, ...prev]);
+    setUnreadNotificationCount((count) => count + 1);
+  }, () => fetchNotifications());
+  const unreadMessagesCount = useUnreadMessages(user?.id);
+
   const [dashboardData, setDashboardData] = useState({
     myGigs: [],
     matchedJobs: [],
@@ -586,10 +594,13 @@ const TeacherDashboard = () => {
 
   const fetchNotifications = async () => {
     try {
-      const response = await notificationAPI.getNotifications({ page: 1, page_size: 5 });
+      const [response, countResponse] = await Promise.all([
+        notificationAPI.getNotifications({ page: 1, page_size: 5 }),
+        notificationAPI.getUnreadNotificationCount(),
+      ]);
       const notifs = response.data?.results || response.data || [];
       setNotifications(notifs);
-      setUnreadNotificationCount(notifs.filter(n => !n.is_read).length);
+      setUnreadNotificationCount(countResponse.data?.unread_count || 0);
     } catch (error) {
       console.error("Failed to fetch notifications:", error);
       // Set empty array on error to prevent UI issues
@@ -767,6 +778,9 @@ const TeacherDashboard = () => {
               aria-label="Messages"
             >
               <MessageCircle className="w-6 h-6" />
+              {unreadMessagesCount > 0 && (
+                <span className="absolute top-0 right-0 block h-2 w-2 rounded-full ring-2 ring-white bg-red-500" />
+              )}
             </button>
 
             <div className="h-6 w-px bg-gray-200 mx-2 hidden sm:block"></div>
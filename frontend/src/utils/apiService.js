@@ -264,7 +264,10 @@ export const messageAPI = {
 // Notification API calls
 export const notificationAPI = {
   getNotifications: (params) => apiService.get('/api/notifications/', { params }),
-  getUnreadNotifications: () => apiService.get('/api/notifications/unread/'),
+  // Cursor-paginated: { next, previous, results }; pass params.cursor to page
+  getUnreadNotifications: (params) => apiService.get('/api/notifications/unread/', { params }),
+  // { unread_count } from the server's cached counter, for the badge
+  getUnreadNotificationCount: () => apiService.get('/api/notifications/unread-count/'),
   markAsRead: (id) => apiService.post(`/api/notifications/${id}/mark-read/`),
   markAllAsRead: () => apiService.post('/api/notifications/mark-all-read/'),
   deleteNotification: (id) => apiService.delete(`/api/notifications/${id}/`),